@@ -69,6 +69,8 @@ class Action(object):
     permissions = ()
     schema = {'type': 'object'}
     schema_alias = None
+    # Top level resource keys the action reads, None if unknown.
+    resource_fields = None
 
     def __init__(self, data=None, manager=None, log_dir=None):
         self.data = data or {}
@@ -78,6 +80,10 @@ class Action(object):
     def get_permissions(self):
         return self.permissions
 
+    def get_resource_fields(self):
+        """Top level resource keys the action reads, or None if unknown."""
+        return self.resource_fields
+
     def validate(self):
         return self
 
@@ -20,12 +20,20 @@ from six.moves import cPickle as pickle
 
 import os
 import logging
+import sqlite3
+import threading
 import time
 
 log = logging.getLogger('custodian.cache')
 
 CACHE_NOTIFY = False
 
+# sqlite cache connections shared by all managers of a process, by
+# process id and cache path, as [connection, lock, reference count]
+# with the lock serializing their use.
+SQL_CONNECTIONS = {}
+SQL_CONNECTIONS_LOCK = threading.Lock()
+
 
 def factory(config):
 
@@ -45,7 +53,7 @@ def factory(config):
             CACHE_NOTIFY = True
         return InMemoryCache()
 
-    return FileCacheManager(config)
+    return SqlKvCache(config)
 
 
 class NullCache(object):
@@ -65,6 +73,9 @@ class NullCache(object):
     def size(self):
         return 0
 
+    def take_stats(self):
+        return {}
+
 
 class InMemoryCache(object):
     # Running in a temporary environment, so keep as a cache.
@@ -86,6 +97,9 @@ class InMemoryCache(object):
     def size(self):
         return sum(map(len, self.data.values()))
 
+    def take_stats(self):
+        return {}
+
 
 class FileCacheManager(object):
 
@@ -136,3 +150,343 @@ class FileCacheManager(object):
 
     def size(self):
         return os.path.exists(self.cache_path) and os.path.getsize(self.cache_path) or 0
+
+
+class SqlKvCache(object):
+    """On disk cache using sqlite as an indexed key value store.
+
+    Entries are read and written individually, expire individually
+    after the configured cache period, and the least recently used
+    entries are evicted once the stored values exceed max_size bytes.
+    Writes are transactional so the cache file can be shared by
+    concurrent processes (ie. c7n-org workers), within a process a
+    single connection is shared and expired entries are removed once
+    when it's opened. The total size of stored values is kept in a
+    meta table updated with each write, so writes don't scan the cache.
+    """
+
+    max_size = int(os.environ.get('C7N_CACHE_MAX_SIZE', 1024 * 1024 * 512))
+
+    create_table = """
+    create table if not exists c7n_cache (
+        key blob primary key,
+        value blob,
+        size integer,
+        create_time real,
+        access_time real
+    )"""
+
+    create_meta_table = """
+    create table if not exists c7n_cache_meta (
+        id integer primary key check (id = 0),
+        total integer
+    )"""
+
+    def __init__(self, config):
+        self.config = config
+        self.cache_period = config.cache_period
+        self.cache_path = os.path.abspath(
+            os.path.expanduser(
+                os.path.expandvars(
+                    config.cache)))
+        self.conn = None
+        self.lock = threading.Lock()
+        self.stats = self.new_stats()
+
+    @staticmethod
+    def new_stats():
+        return {'hits': 0, 'misses': 0, 'bytes_read': 0, 'bytes_written': 0}
+
+    def take_stats(self):
+        """Return the stats accumulated since the last call."""
+        stats, self.stats = self.stats, self.new_stats()
+        return stats
+
+    def load(self):
+        if self.conn is not None:
+            return True
+        key = (os.getpid(), self.cache_path)
+        with SQL_CONNECTIONS_LOCK:
+            if key not in SQL_CONNECTIONS:
+                try:
+                    SQL_CONNECTIONS[key] = [self._connect(), threading.Lock(), 0]
+                except (sqlite3.Error, OSError) as e:
+                    log.warning("Could not open cache %s err: %s" % (self.cache_path, e))
+                    return False
+                log.debug("Using cache file %s" % self.cache_path)
+            entry = SQL_CONNECTIONS[key]
+            entry[2] += 1
+            self.conn, self.lock = entry[0], entry[1]
+        return True
+
+    def _connect(self):
+        directory = os.path.dirname(self.cache_path)
+        if not os.path.exists(directory):
+            log.info('Generating Cache directory: %s.' % directory)
+            os.makedirs(directory)
+        try:
+            conn = self._open()
+        except sqlite3.OperationalError:
+            # ie. locked by another process, the file is a valid cache
+            raise
+        except sqlite3.DatabaseError:
+            # Likely a cache file from the previous pickle based format.
+            log.info("Replacing incompatible cache file %s" % self.cache_path)
+            os.remove(self.cache_path)
+            conn = self._open()
+        with conn:
+            expired = conn.execute(
+                'select coalesce(sum(size), 0) from c7n_cache where create_time < ?',
+                (self._expire_time(),)).fetchone()[0]
+            conn.execute(
+                'delete from c7n_cache where create_time < ?', (self._expire_time(),))
+            self._add_total(conn, -expired)
+        return conn
+
+    def _open(self):
+        conn = sqlite3.connect(self.cache_path, timeout=60, check_same_thread=False)
+        try:
+            conn.execute('pragma journal_mode=wal')
+            conn.execute(self.create_table)
+            conn.execute(
+                'create index if not exists c7n_cache_access on c7n_cache(access_time)')
+            conn.execute(self.create_meta_table)
+            with conn:
+                # caches written before the meta table existed are sized once
+                conn.execute(
+                    'insert or ignore into c7n_cache_meta '
+                    'select 0, coalesce(sum(size), 0) from c7n_cache')
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    def _expire_time(self):
+        return time.time() - self.cache_period * 60
+
+    def get(self, key):
+        if self.conn is None:
+            return None
+        k = pickle.dumps(key, protocol=2)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                'select value from c7n_cache where key = ? and create_time >= ?',
+                (k, self._expire_time())).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self.conn.execute(
+                'update c7n_cache set access_time = ? where key = ?', (time.time(), k))
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            log.warning("Could not load cache entry %s err: %s" % (self.cache_path, e))
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self.stats['bytes_read'] += len(row[0])
+        return value
+
+    def save(self, key, data):
+        if self.conn is None and not self.load():
+            return
+        k = pickle.dumps(key, protocol=2)
+        try:
+            v = pickle.dumps(data, protocol=2)
+            now = time.time()
+            with self.lock, self.conn:
+                row = self.conn.execute(
+                    'select size from c7n_cache where key = ?', (k,)).fetchone()
+                self.conn.execute(
+                    'insert or replace into c7n_cache values (?, ?, ?, ?, ?)',
+                    (k, sqlite3.Binary(v), len(v), now, now))
+                total = self._add_total(self.conn, len(v) - (row and row[0] or 0))
+                if total > self.max_size:
+                    self._evict(total)
+        except Exception as e:
+            log.warning("Could not save cache %s err: %s" % (self.cache_path, e))
+            return
+        self.stats['bytes_written'] += len(v)
+
+    @staticmethod
+    def _add_total(conn, delta):
+        conn.execute('update c7n_cache_meta set total = total + ? where id = 0', (delta,))
+        return conn.execute('select total from c7n_cache_meta where id = 0').fetchone()[0]
+
+    def _evict(self, total):
+        evicted = 0
+        for k, size in self.conn.execute(
+                'select key, size from c7n_cache order by access_time').fetchall():
+            if total - evicted <= self.max_size:
+                break
+            self.conn.execute('delete from c7n_cache where key = ?', (k,))
+            evicted += size
+        self._add_total(self.conn, -evicted)
+
+    def size(self):
+        if self.conn is None:
+            return 0
+        with self.lock:
+            return self.conn.execute(
+                'select total from c7n_cache_meta where id = 0').fetchone()[0]
+
+    def close(self):
+        """Release the connection, closed once no cache of the process uses it."""
+        if self.conn is None:
+            return
+        key = (os.getpid(), self.cache_path)
+        with SQL_CONNECTIONS_LOCK:
+            entry = SQL_CONNECTIONS.get(key)
+            if entry is not None and entry[0] is self.conn:
+                entry[2] -= 1
+                if not entry[2]:
+                    del SQL_CONNECTIONS[key]
+                    self.conn.close()
+        self.conn = None
+
+
+class ResourceSnapshot(object):
+    """Run scoped snapshot of fetched and augmented resources.
+
+    Policies in a single run frequently target the same resource types,
+    while activated a snapshot lets the first policy's fetch and augment
+    of a given (account, region, resource, source, query) serve every
+    other policy in the run.
+
+    Stored resources are never handed out directly, each lookup returns
+    fresh shallow copies so annotations (``c7n:*`` keys) added by one
+    policy's filters or actions are not visible to another policy.
+
+    Usage:
+
+    .. code-block:: python
+
+       with ResourceSnapshot():
+           for p in policies:
+               p()
+    """
+
+    _active = None
+
+    def __init__(self):
+        self.data = {}
+        # run wide hints for loaders, ie. what other policies will fetch
+        self.hints = {}
+        self.indexes = {}
+        self.key_locks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def active(cls):
+        return cls._active
+
+    def __enter__(self):
+        ResourceSnapshot._active = self
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        ResourceSnapshot._active = None
+        log.debug("Resource snapshot hits:%d misses:%d", self.hits, self.misses)
+        self.data.clear()
+        self.hints.clear()
+        self.indexes.clear()
+        self.key_locks.clear()
+
+    def get(self, key, loader):
+        """Return a view of the resources for key, calling loader on a miss.
+
+        Concurrent lookups of the same key wait on a single load.
+        """
+        k = pickle.dumps(key)
+        with self.lock:
+            key_lock = self.key_locks.setdefault(k, threading.Lock())
+        with key_lock:
+            if k in self.data:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.data[k] = (key, [self.copy(r) for r in loader()])
+            return [self.copy(r) for r in self.data[k][1]]
+
+    def peek(self, key):
+        """Return a view of the resources for key, or None if not loaded."""
+        k = pickle.dumps(key)
+        with self.lock:
+            if k not in self.data:
+                return None
+            self.hits += 1
+            return [self.copy(r) for r in self.data[k][1]]
+
+    def lookup(self, key, id_key, ids):
+        """Return views of the resources with the given ids for key.
+
+        Resources are looked up via an index built once per entry, returns
+        None if the resources for key have not been loaded in the snapshot.
+        """
+        k = pickle.dumps(key)
+        with self.lock:
+            if k not in self.data:
+                return None
+            index = self.indexes.get(k)
+            if index is None:
+                index = self.indexes[k] = {
+                    r[id_key]: r for r in self.data[k][1]}
+            self.hits += 1
+        return [self.copy(index[i]) for i in ids if i in index]
+
+    def get_many(self, keys, loader):
+        """Return values for many keys, calling loader once for all misses.
+
+        The loader is passed the list of missing keys and returns a list
+        of values in the same order, where a value of None is not stored.
+        """
+        pkeys = [pickle.dumps(k) for k in keys]
+        with self.lock:
+            missing = [idx for idx, k in enumerate(pkeys) if k not in self.data]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            values = loader([keys[idx] for idx in missing])
+            with self.lock:
+                for idx, value in zip(missing, values):
+                    if value is not None:
+                        self.data[pkeys[idx]] = (
+                            keys[idx], [self.copy(v) for v in value])
+        results = []
+        with self.lock:
+            for k in pkeys:
+                if k in self.data:
+                    results.append([self.copy(v) for v in self.data[k][1]])
+                else:
+                    results.append(None)
+        return results
+
+    def invalidate(self, key, ignore=('source', 'q', 'fields')):
+        """Drop snapshot entries for the resource type identified by key.
+
+        By default entries match regardless of source, query and
+        augmented fields, as actions change the underlying resources
+        for all of them.
+        """
+        match = {k: v for k, v in key.items() if k not in ignore}
+        with self.lock:
+            for k, (entry_key, _) in list(self.data.items()):
+                if all(entry_key.get(mk) == mv for mk, mv in match.items()):
+                    del self.data[k]
+                    self.indexes.pop(k, None)
+
+    def size(self):
+        return sum(len(resources) for _, resources in self.data.values())
+
+    @staticmethod
+    def copy(resource):
+        if isinstance(resource, dict):
+            return dict(resource)
+        return resource
+
+
+def get_snapshot():
+    """Return the currently active run scoped snapshot if any."""
+    return ResourceSnapshot.active()
@@ -241,6 +241,23 @@ def setup_parser():
         "--skip-validation",
         action="store_true",
         help="Skips validation of policies (assumes you've run the validate command seperately).")
+    run.add_argument(
+        "--stream", action="store_true",
+        help="Stream resources through augment and filters a page at a time "
+        "to bound memory use, bypasses the resource cache")
+    run.add_argument(
+        "--policy-concurrency", type=int, default=1,
+        help="Number of policies to execute concurrently, policies are grouped "
+        "by region and resource type (default %(default)i)")
+    run.add_argument(
+        "--region-concurrency", type=int, default=1,
+        help="Number of regions to execute concurrently when running against "
+        "multiple regions, log output is kept in region order (default %(default)i)")
+    run.add_argument(
+        "--service-concurrency", type=int, default=2,
+        help="With policy concurrency, number of resource types to execute concurrently "
+        "against the same service in a region, to stay within its api rate limits "
+        "(default %(default)i)")
 
     metrics_help = ("Emit metrics to provider metrics. Specify 'aws', 'gcp', or 'azure'. "
             "For more details on aws metrics options, see: "
@@ -253,7 +270,8 @@ def setup_parser():
     run.add_argument(
         "--trace",
         dest="tracer",
-        help=argparse.SUPPRESS,
+        help="Trace policy execution, 'file://trace.json' records spans to a local "
+        "chrome trace event file, 'xray' uses aws x-ray",
         default=None, nargs="?", const="default")
 
     schema_desc = ("Browse the available vocabularies (resources, filters, modes, and "
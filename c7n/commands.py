@@ -13,9 +13,11 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from collections import Counter, defaultdict
+import contextlib
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent import futures
 from datetime import timedelta, datetime
-from functools import wraps
+from functools import partial, wraps
 import inspect
 import logging
 import os
@@ -27,10 +29,15 @@ import six
 import yaml
 from yaml.constructor import ConstructorError
 
+from c7n.cache import ResourceSnapshot
 from c7n.exceptions import ClientError, PolicyValidationError
+from c7n.executor import executor
+from c7n.output import OrderedLogBuffer, TraceRecorder
 from c7n.provider import clouds
-from c7n.policy import Policy, PolicyCollection, load as policy_load
+from c7n.policy import (
+    Policy, PolicyCollection, ServerlessExecutionMode, load as policy_load)
 from c7n.schema import ElementSchema, StructureParser, generate
+from c7n.tags import TAG_TYPES_HINT, get_universal_tag_types
 from c7n.utils import dumps, load_file, local_session, SafeLoader, yaml_dump
 from c7n.config import Bag, Config
 from c7n import provider
@@ -233,9 +240,9 @@ def validate(options):
             errors.append(e)
             continue
 
-        load_resources(structure.get_resource_types(data))
-        schm = schema.generate()
-        errors += schema.validate(data, schm)
+        rtypes = structure.get_resource_types(data)
+        load_resources(rtypes, structure.get_element_types(data))
+        errors += schema.validate(data, resource_types=rtypes)
         conf_policy_names = {
             p.get('name', 'unknown') for p in data.get('policies', ())}
         dupes = conf_policy_names.intersection(used_policy_names)
@@ -280,20 +287,162 @@ def run(options, policies):
             log.exception("Unable to assume role %s", options.assume_role)
             sys.exit(1)
 
-    for policy in policies:
-        try:
-            policy()
-        except Exception:
-            exit_code = 2
-            if options.debug:
-                raise
-            log.exception(
-                "Error while executing policy %s, continuing" % (
-                    policy.name))
+    # Share fetched and augmented resources across policies in this run.
+    with ResourceSnapshot() as snapshot:
+        snapshot.hints[TAG_TYPES_HINT] = get_universal_tag_types(policies)
+        if getattr(options, 'policy_concurrency', 1) > 1 and not options.dryrun:
+            serverless = [p for p in policies if isinstance(
+                p.get_execution_mode(), ServerlessExecutionMode)]
+            if serverless:
+                exit_code = _provision_policies(options, serverless)
+                policies = [p for p in policies if p not in serverless]
+        regions = OrderedDict()
+        for p in policies:
+            regions.setdefault(p.options.region, []).append(p)
+        if getattr(options, 'region_concurrency', 1) > 1 and len(regions) > 1:
+            exit_code = max(exit_code, _run_regions_concurrent(options, regions))
+        else:
+            exit_code = max(exit_code, _run_policies(options, policies))
+    TraceRecorder.flush()
     if exit_code != 0:
         sys.exit(exit_code)
 
 
+# Default maximum number of resource type groups concurrently executing
+# against the same service in a region, to stay within api rate limits.
+SERVICE_CONCURRENCY = 2
+
+
+def _run_policy(options, policy):
+    try:
+        policy()
+    except Exception:
+        if options.debug:
+            raise
+        log.exception(
+            "Error while executing policy %s, continuing" % (
+                policy.name))
+        return 2
+    return 0
+
+
+def _run_policy_group(options, group, log_scope=None):
+    exit_code = 0
+    with log_scope() if log_scope else _null_scope():
+        for policy in group:
+            exit_code = max(exit_code, _run_policy(options, policy))
+    return exit_code
+
+
+@contextlib.contextmanager
+def _null_scope():
+    yield
+
+
+def _run_policies(options, policies, log_scope=None):
+    if getattr(options, 'policy_concurrency', 1) > 1:
+        return _run_policies_concurrent(options, policies, log_scope)
+    return _run_policy_group(options, policies, log_scope)
+
+
+def _run_regions_concurrent(options, regions):
+    """Execute each region's policies concurrently with other regions.
+
+    Regions are independent, so up to `region_concurrency` regions
+    execute at once, each on its own worker thread and thus with its
+    own thread local sessions. Within a region policies execute as
+    they would for a single region run, so global concurrency is
+    bounded by region_concurrency * policy_concurrency.
+
+    Log output is released in region order, the exit code is the
+    maximum of the regions' exit codes.
+    """
+    exit_code = 0
+    log.debug("Executing %d regions with concurrency:%d",
+              len(regions), options.region_concurrency)
+
+    with OrderedLogBuffer(list(regions)) as log_buffer:
+        def run_region(region, policies):
+            try:
+                return _run_policies(
+                    options, policies, partial(log_buffer.capture, region))
+            finally:
+                log_buffer.finish(region)
+
+        with executor('thread', max_workers=options.region_concurrency) as w:
+            results = [w.submit(run_region, r, p) for r, p in regions.items()]
+            for f in futures.as_completed(results):
+                exit_code = max(exit_code, f.result())
+    return exit_code
+
+
+def _run_policies_concurrent(options, policies, log_scope=None):
+    """Execute policies on a worker pool.
+
+    Policies are grouped by region and resource type, policies within
+    a group run serially in their declared order on a single worker so
+    they share fetched resources. At most `service_concurrency` groups
+    targeting a given service in a region run at any one time.
+    """
+    service_concurrency = getattr(options, 'service_concurrency', None) or SERVICE_CONCURRENCY
+    groups = OrderedDict()
+    for p in policies:
+        groups.setdefault((p.options.region, p.resource_type), []).append(p)
+
+    pending = deque(groups.values())
+    running = {}
+    active = Counter()
+    exit_code = 0
+
+    log.debug("Executing %d policies in %d groups with concurrency:%d",
+              len(policies), len(groups), options.policy_concurrency)
+
+    with executor('thread', max_workers=options.policy_concurrency) as w:
+        while pending or running:
+            for group in list(pending):
+                if len(running) >= options.policy_concurrency:
+                    break
+                service = _policy_service(group[0])
+                if active[service] >= service_concurrency:
+                    continue
+                pending.remove(group)
+                active[service] += 1
+                running[w.submit(
+                    _run_policy_group, options, group, log_scope)] = service
+            done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+            for f in done:
+                active[running.pop(f)] -= 1
+                exit_code = max(exit_code, f.result())
+    return exit_code
+
+
+def _provision_policies(options, policies):
+    """Provision serverless policies on a worker pool.
+
+    Function deployments are independent of each other, so unlike pull
+    mode policies they aren't grouped by region or resource type. Code
+    archives are shared via the custodian archive cache, and functions
+    whose code and configuration are unchanged aren't updated.
+    """
+    exit_code = 0
+    t = time.time()
+    log.debug("Provisioning %d policies with concurrency:%d",
+              len(policies), options.policy_concurrency)
+
+    with executor('thread', max_workers=options.policy_concurrency) as w:
+        results = [w.submit(_run_policy, options, p) for p in policies]
+        for f in futures.as_completed(results):
+            exit_code = max(exit_code, f.result())
+
+    log.info("Provisioned %d policies time:%0.2f", len(policies), time.time() - t)
+    return exit_code
+
+
+def _policy_service(policy):
+    service = getattr(policy.resource_manager.resource_type, 'service', None)
+    return (policy.options.region, service or policy.resource_type)
+
+
 @policy_command
 def report(options, policies):
     from c7n.reports import report as do_report
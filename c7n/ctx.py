@@ -45,6 +45,8 @@ class ExecutionContext(object):
         self.output = None
         self.api_stats = None
         self.sys_stats = None
+        self.augment_stats = {}
+        self.cache_stats = {}
 
         # A few tests patch on metrics flush
         # For backward compatibility, accept both 'metrics' and 'metrics_enabled' params (PR #4361)
@@ -77,6 +79,21 @@ class ExecutionContext(object):
         self.start_time = time.time()
         self.execution_id = str(uuid.uuid4())
 
+    def record_augment_stats(self, service, stats):
+        """Accumulate resource augment api call stats for a service."""
+        totals = self.augment_stats.setdefault(
+            service, {'calls': 0, 'throttles': 0, 'duration': 0.0})
+        for k in ('calls', 'throttles', 'duration'):
+            totals[k] += stats[k]
+        totals['concurrency'] = stats['concurrency']
+        totals['rate'] = totals['duration'] and round(
+            totals['calls'] / totals['duration'], 2) or 0
+
+    def record_cache_stats(self, stats):
+        """Accumulate resource cache hit, miss and byte counts."""
+        for k, v in stats.items():
+            self.cache_stats[k] = self.cache_stats.get(k, 0) + v
+
     @property
     def log_dir(self):
         return self.output.root_dir
@@ -124,7 +141,9 @@ class ExecutionContext(object):
         if os.environ.get('C7N_TEST_RUN'):
             reset_session_cache()
 
-    def get_metadata(self, include=('sys-stats', 'api-stats', 'metrics')):
+    def get_metadata(self, include=(
+            'sys-stats', 'api-stats', 'api-ops', 'metrics', 'augment-stats',
+            'cache-stats')):
         t = time.time()
         md = {
             'policy': self.policy.data,
@@ -141,6 +160,14 @@ class ExecutionContext(object):
             md['sys-stats'] = self.sys_stats.get_metadata()
         if 'api-stats' in include and self.api_stats:
             md['api-stats'] = self.api_stats.get_metadata()
+        if 'api-ops' in include and self.api_stats:
+            ops = self.api_stats.get_operation_stats()
+            if ops:
+                md['api-ops'] = ops
         if 'metrics' in include and self.metrics:
             md['metrics'] = self.metrics.get_metadata()
+        if 'augment-stats' in include and self.augment_stats:
+            md['augment-stats'] = self.augment_stats
+        if 'cache-stats' in include and self.cache_stats:
+            md['cache-stats'] = self.cache_stats
         return md
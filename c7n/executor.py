@@ -13,12 +13,50 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from concurrent.futures import (
-    ProcessPoolExecutor, ThreadPoolExecutor)
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor
 
+from c7n.exceptions import ClientError
 from c7n.registry import PluginRegistry
 
 import threading
+import time
+
+
+_thread_owner = threading.local()
+
+
+def get_thread_owner():
+    """Return the ident of the thread whose work the current thread executes.
+
+    Work submitted to a thread pool is owned by the submitting thread's
+    owner, ie. a filter's worker threads are owned by the thread
+    executing the policy. Other threads own their work.
+    """
+    return getattr(_thread_owner, 'ident', None) or threading.current_thread().ident
+
+
+def set_thread_owner(owner):
+    """Set the owner of the current thread's work, returns the previous owner."""
+    previous = getattr(_thread_owner, 'ident', None)
+    _thread_owner.ident = owner
+    return previous
+
+
+def _run_owned(owner, func, *args, **kw):
+    previous = set_thread_owner(owner)
+    try:
+        return func(*args, **kw)
+    finally:
+        set_thread_owner(previous)
+
+
+class ThreadPoolExecutor(futures.ThreadPoolExecutor):
+    """Thread pool whose work is owned by the submitting thread's owner."""
+
+    def submit(self, func, *args, **kw):
+        return super(ThreadPoolExecutor, self).submit(
+            _run_owned, get_thread_owner(), func, *args, **kw)
 
 
 class ExecutorRegistry(PluginRegistry):
@@ -105,5 +143,57 @@ class MainThreadFuture(object):
         return fn(self)
 
 
+class AdaptiveConcurrency(object):
+    """Adapt the number of concurrent api calls to observed throttling.
+
+    Concurrency grows additively with each successful call and is
+    halved whenever a call fails with one of the throttle error codes
+    (additive increase, multiplicative decrease). Callers should use
+    a worker pool sized to `maximum` and make each api call via
+    `call`, which blocks while the current limit is reached.
+    """
+
+    def __init__(self, throttle_codes, initial=3, minimum=1, maximum=12):
+        self.throttle_codes = throttle_codes
+        self.minimum = minimum
+        self.maximum = max(initial, maximum)
+        self.limit = float(initial)
+        self.active = 0
+        self.calls = 0
+        self.throttles = 0
+        self.start = time.time()
+        self.cond = threading.Condition()
+
+    def call(self, func, *args, **kw):
+        with self.cond:
+            while self.active >= int(self.limit):
+                self.cond.wait()
+            self.active += 1
+        throttled = False
+        try:
+            return func(*args, **kw)
+        except ClientError as e:
+            throttled = e.response['Error']['Code'] in self.throttle_codes
+            raise
+        finally:
+            with self.cond:
+                self.active -= 1
+                self.calls += 1
+                if throttled:
+                    self.throttles += 1
+                    self.limit = max(self.minimum, self.limit / 2)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                self.cond.notify_all()
+
+    def get_stats(self):
+        elapsed = time.time() - self.start
+        return {
+            'calls': self.calls,
+            'throttles': self.throttles,
+            'duration': elapsed,
+            'concurrency': int(self.limit)}
+
+
 executors = ExecutorRegistry('executor')
 executors.load_plugins()
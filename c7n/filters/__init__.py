@@ -15,6 +15,10 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 from .core import (
     ANNOTATION_KEY,
+    COST_MEMORY,
+    COST_BATCH_API,
+    COST_RELATED,
+    COST_API,
     FilterValidationError,
     OPERATORS,
     FilterRegistry,
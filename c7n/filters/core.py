@@ -22,6 +22,7 @@ from datetime import timedelta
 import fnmatch
 import logging
 import operator
+import os
 import re
 import sys
 
@@ -36,7 +37,7 @@ from c7n.exceptions import PolicyValidationError
 from c7n.executor import ThreadPoolExecutor
 from c7n.registry import PluginRegistry
 from c7n.resolver import ValuesFrom
-from c7n.utils import set_annotation, type_schema, parse_cidr
+from c7n.utils import set_annotation, type_schema, parse_cidr, overrides
 
 
 class FilterValidationError(Exception):
@@ -109,6 +110,38 @@ OPERATORS = {
     'intersect': intersect}
 
 
+# Estimated cost classes of evaluating a filter, used to order the
+# filters of an and block such that cheaper filters run first.
+COST_MEMORY = 0  # in memory evaluation of resource data
+COST_BATCH_API = 1  # api calls over batches of resources
+COST_RELATED = 2  # fetch of related resources
+COST_API = 3  # api calls per resource
+
+
+def order_filters(filters):
+    """Order filters by estimated cost and observed selectivity.
+
+    Filters without a cost estimate may depend on the filters preceding
+    them, so they retain their position and bound reordering.
+    """
+    ordered = []
+    segment = []
+    for f in filters:
+        cost = getattr(f, 'get_cost', lambda: None)()
+        if cost is None:
+            ordered.extend(sorted(segment, key=_filter_rank))
+            ordered.append(f)
+            segment = []
+        else:
+            segment.append(f)
+    ordered.extend(sorted(segment, key=_filter_rank))
+    return ordered
+
+
+def _filter_rank(f):
+    return f.get_cost(), f.get_selectivity()
+
+
 VALUE_TYPES = [
     'age', 'integer', 'expiration', 'normalize', 'size',
     'cidr', 'cidr_size', 'swap', 'resource_count', 'expr',
@@ -178,9 +211,19 @@ class Filter(object):
     metrics = ()
     permissions = ()
     schema = {'type': 'object'}
+    # Whether the filter must see the entire resource population, as
+    # opposed to being applied independently to pages of resources.
+    full_set = False
     # schema aliases get hoisted into a jsonschema definition
     # location, and then referenced inline.
     schema_alias = None
+    # Estimated evaluation cost class, filters without one are not
+    # reordered.
+    cost = None
+    # Resources seen and passed by the filter, across process calls.
+    seen = passed = 0
+    # Top level resource keys the filter reads, None if unknown.
+    resource_fields = None
 
     def __init__(self, data, manager=None):
         self.data = data
@@ -197,6 +240,38 @@ class Filter(object):
         """ Bulk process resources and return filtered set."""
         return list(filter(self, resources))
 
+    def get_cost(self):
+        """Estimated cost class of evaluating the filter, or None if unknown.
+        """
+        return self.cost
+
+    def get_resource_fields(self):
+        """Top level resource keys the filter reads, or None if unknown.
+
+        Resource managers use these to skip augmenting fields a policy
+        never references.
+        """
+        return self.resource_fields
+
+    def get_selectivity(self):
+        """Observed ratio of resources passing the filter."""
+        if not self.seen:
+            return 1.0
+        return self.passed / float(self.seen)
+
+    def record_selectivity(self, seen, passed):
+        self.seen += seen
+        self.passed += passed
+
+    def compile_plan(self):
+        """Compile the filter into an evaluation plan.
+
+        Returns a tuple of (cost, match) where match returns the list of
+        keys to annotate onto a matching resource or None if the resource
+        doesn't match, or None if the filter can't be compiled.
+        """
+        return None
+
     def get_block_operator(self):
         """Determine the immediate parent boolean operator for a filter"""
         # Top level operator is `and`
@@ -227,6 +302,29 @@ class Filter(object):
                 r_matched.append(k)
 
 
+def get_key_field(key):
+    """Top level resource key read by a value filter key expression.
+
+    Returns None if the expression doesn't start with a field reference.
+    """
+    if not key:
+        return None
+    if key.startswith('tag:'):
+        return 'Tags'
+    try:
+        node = jmespath.compile(key).parsed
+    except jmespath.exceptions.JMESPathError:
+        # keys like c7n:MatchedFilters are looked up verbatim
+        return key
+    while node['type'] in (
+            'subexpression', 'index_expression', 'projection',
+            'value_projection', 'filter_projection', 'flatten'):
+        node = node['children'][0]
+    if node['type'] == 'field':
+        return node['value']
+    return None
+
+
 def intersect_list(a, b):
     if b is None:
         return a
@@ -247,15 +345,96 @@ class BooleanGroupFilter(Filter):
         self.filters = registry.parse(list(self.data.values())[0], manager)
         self.manager = manager
 
+    @property
+    def full_set(self):
+        return any(f.full_set for f in self.filters)
+
     def validate(self):
         for f in self.filters:
             f.validate()
         return self
 
+    def get_cost(self):
+        if self.full_set:
+            return None
+        costs = [getattr(f, 'get_cost', lambda: None)() for f in self.filters]
+        if None in costs:
+            return None
+        return max(costs or [COST_MEMORY])
+
+    def get_resource_fields(self):
+        fields = set()
+        for f in self.filters:
+            f_fields = f.get_resource_fields()
+            if f_fields is None:
+                return None
+            fields.update(f_fields)
+        return fields
+
+    def process_filter(self, f, resources, event=None):
+        """Process resources with a child filter, tracing its execution."""
+        tracer = getattr(getattr(self.manager, 'ctx', None), 'tracer', None)
+        if tracer is None:
+            return f.process(resources, event)
+        with tracer.subsegment("filter:%s" % f.type):
+            return f.process(resources, event)
+
+    def compile_plan(self):
+        plans = []
+        for f in self.filters:
+            plan = getattr(f, 'compile_plan', None)
+            plan = plan and plan()
+            if plan is None:
+                return None
+            plans.append(plan)
+        return sum(cost for cost, _ in plans), self.compile_match(plans)
+
+    def compile_match(self, plans):
+        raise NotImplementedError("subclass responsibility")
+
+    def process_plan(self, resources):
+        """Process resources via a compiled plan if the filter tree allows.
+
+        Returns None if the tree has filters that can't be compiled.
+        """
+        if not resources:
+            return resources
+        plan = self.compile_plan()
+        if plan is None:
+            return None
+        match = plan[1]
+        results = []
+        for r in resources:
+            keys = match(r)
+            if keys is None:
+                continue
+            if keys:
+                set_annotation(r, ANNOTATION_KEY, keys)
+            results.append(r)
+        return results
+
+
+def match_all(plans):
+    """Match all plans, evaluating cheaper plans first."""
+    order = sorted(range(len(plans)), key=lambda idx: plans[idx][0])
+
+    def match(r):
+        matched = [None] * len(plans)
+        for idx in order:
+            keys = plans[idx][1](r)
+            if keys is None:
+                return None
+            matched[idx] = keys
+        return [k for keys in matched for k in keys]
+    return match
+
 
 class Or(BooleanGroupFilter):
 
     def process(self, resources, event=None):
+        results = self.process_plan(resources)
+        if results is not None:
+            return results
         if self.manager:
             return self.process_set(resources, event)
         return super(Or, self).process(resources, event)
@@ -273,18 +452,42 @@ class Or(BooleanGroupFilter):
         results = set()
         for f in self.filters:
             results = results.union([
-                r[resource_type.id] for r in f.process(resources, event)])
+                r[resource_type.id] for r in self.process_filter(f, resources, event)])
         return [resource_map[r_id] for r_id in results]
 
+    def compile_match(self, plans):
+        # all children are evaluated, as each annotates its matches.
+        def match(r):
+            matched = None
+            for _, child in plans:
+                keys = child(r)
+                if keys is not None:
+                    matched = (matched or []) + keys
+            return matched
+        return match
+
 
 class And(BooleanGroupFilter):
 
+    def compile_match(self, plans):
+        return match_all(plans)
+
+    def get_filters(self):
+        if not self.manager or not self.manager.data.get('filter-reorder', False):
+            return self.filters
+        return order_filters(self.filters)
+
     def process(self, resources, events=None):
+        results = self.process_plan(resources)
+        if results is not None:
+            return results
         if self.manager:
             sweeper = AnnotationSweeper(self.manager.get_model().id, resources)
 
-        for f in self.filters:
-            resources = f.process(resources, events)
+        for f in self.get_filters():
+            rcount = len(resources)
+            resources = self.process_filter(f, resources, events)
+            f.record_selectivity(rcount, len(resources))
             if not resources:
                 break
 
@@ -296,7 +499,15 @@ class And(BooleanGroupFilter):
 
 class Not(BooleanGroupFilter):
 
+    def compile_match(self, plans):
+        # annotations of a not block are always discarded.
+        match = match_all(plans)
+        return lambda r: [] if match(r) is None else None
+
     def process(self, resources, event=None):
+        results = self.process_plan(resources)
+        if results is not None:
+            return results
         if self.manager:
             return self.process_set(resources, event)
         return super(Not, self).process(resources, event)
@@ -317,7 +528,7 @@ class Not(BooleanGroupFilter):
         sweeper = AnnotationSweeper(resource_type.id, resources)
 
         for f in self.filters:
-            resources = f.process(resources, event)
+            resources = self.process_filter(f, resources, event)
             if not resources:
                 break
 
@@ -371,6 +582,7 @@ class ValueFilter(Filter):
     """
     expr = None
     op = v = vtype = None
+    _matcher = None
 
     schema = {
         'type': 'object',
@@ -397,6 +609,10 @@ class ValueFilter(Filter):
         super(ValueFilter, self).__init__(data, manager)
         self.expr = {}
 
+    @property
+    def full_set(self):
+        return self.data.get('value_type') == 'resource_count'
+
     def _validate_resource_count(self):
         """ Specific validation for `resource_count` type
 
@@ -498,6 +714,9 @@ class ValueFilter(Filter):
                 return resources
             return []
 
+        # recompile per run, as relative (age/expiration) sentinels are
+        # resolved against the current time.
+        self._matcher = None
         return super(ValueFilter, self).process(resources, event)
 
     def get_resource_value(self, k, i):
@@ -530,7 +749,22 @@ class ValueFilter(Filter):
             r = regex.get_resource_value(r)
         return r
 
-    def match(self, i):
+    def get_resource_fields(self):
+        # subclasses evaluate keys against data other than the resource.
+        if type(self) is not ValueFilter:
+            return self.resource_fields
+        if len(self.data) == 1 and 'type' not in self.data:
+            [key] = self.data.keys()
+        else:
+            key = self.data.get('key')
+        if self.data.get('value_type') == 'resource_count':
+            return ()
+        field = get_key_field(key)
+        if field is None:
+            return None
+        return (field,)
+
+    def _initialize(self):
         if self.v is None and len(self.data) == 1:
             [(self.k, self.v)] = self.data.items()
         elif self.v is None and not hasattr(self, 'content_initialized'):
@@ -544,6 +778,14 @@ class ValueFilter(Filter):
             self.content_initialized = True
             self.vtype = self.data.get('value_type')
 
+    def match(self, i):
+        if self._matcher is None:
+            self._matcher = self.compile()
+        return self._matcher(i)
+
+    def _match(self, i):
+        self._initialize()
+
         if i is None:
             return False
 
@@ -579,6 +821,196 @@ class ValueFilter(Filter):
 
         return False
 
+    def compile(self):
+        """Compile the filter into a function matching a single resource.
+
+        The key expression, regexes, and sentinel value conversions are
+        resolved once instead of per resource. Subclasses customizing value
+        extraction or conversion fall back to per resource evaluation.
+        """
+        self._initialize()
+        if (overrides(self, ValueFilter, 'get_resource_value') or
+                overrides(self, ValueFilter, 'process_value_type')):
+            return self._match
+
+        sentinel, op_name = self.v, self.op
+        get_value = self._compile_value(self.k)
+        convert = self._compile_value_type(sentinel)
+        op = self._compile_op(op_name, sentinel)
+        empty_default = op_name in ('in', 'not-in')
+
+        def match(i):
+            if i is None:
+                return False
+            r = get_value(i)
+            if empty_default and r is None:
+                r = ()
+            if convert is not None:
+                v, r = convert(r, i)
+            else:
+                v = sentinel
+            if r is None and v == 'absent':
+                return True
+            elif r is not None and v == 'present':
+                return True
+            elif v == 'not-null' and r:
+                return True
+            elif v == 'empty' and not r:
+                return True
+            elif op is not None:
+                try:
+                    return op(r, v)
+                except TypeError:
+                    return False
+            return r == sentinel
+        return match
+
+    def get_cost(self):
+        # Subclasses may make api calls, and filters on annotations
+        # depend on the filters that set them.
+        if 'type' in self.data:
+            key = self.data.get('key')
+        else:
+            key = next(iter(self.data), None)
+        if (type(self) is not ValueFilter or self.full_set or
+                str(key).startswith('c7n')):
+            return self.cost
+        return COST_MEMORY
+
+    def compile_plan(self):
+        if type(self) is not ValueFilter or self.full_set:
+            return None
+        match = self.compile()
+        annotation = [self.k]
+        return self.get_compiled_cost(), lambda r: match(r) and annotation or None
+
+    def get_compiled_cost(self):
+        """Estimate the relative cost of matching a resource."""
+        cost = 1
+        if not self.k.startswith('tag:') and not self.k.isalnum():
+            cost += 1
+        if 'value_regex' in self.data:
+            cost += 2
+        if self.op in ('regex', 'regex-case', 'glob'):
+            cost += 1
+        if self.vtype in ('date', 'age', 'expiration', 'cidr', 'version', 'expr'):
+            cost += 2
+        return cost
+
+    def _compile_value(self, k):
+        if k.startswith('tag:'):
+            tk = k.split(':', 1)[1]
+
+            def get_value(i):
+                if 'Tags' in i:
+                    for t in i.get("Tags", []):
+                        if t.get('Key') == tk:
+                            return t.get('Value')
+                elif 'labels' in i:
+                    return i.get('labels', {}).get(tk, None)
+                elif 'tags' in i:
+                    return i.get('tags', {}).get(tk, None)
+        else:
+            if k not in self.expr:
+                try:
+                    self.expr[k] = jmespath.compile(k)
+                except jmespath.exceptions.JMESPathError:
+                    # only resources with the literal key can match
+                    pass
+            expr = self.expr.get(k)
+
+            def get_value(i):
+                if k in i:
+                    return i.get(k)
+                elif expr is None:
+                    return jmespath.compile(k).search(i)
+                return expr.search(i)
+
+        if 'value_regex' not in self.data:
+            return get_value
+        regex = ValueRegex(self.data['value_regex'])
+        return lambda i: regex.get_resource_value(get_value(i))
+
+    def _compile_value_type(self, sentinel):
+        vtype = self.vtype
+        if vtype is None:
+            return
+        elif vtype == 'expr':
+            get_sentinel = self._compile_value(sentinel)
+            return lambda value, i: (get_sentinel(i), value)
+        elif vtype == 'date':
+            sentinel = parse_date(sentinel)
+            return lambda value, i: (sentinel, parse_date(value))
+        elif vtype in ('age', 'expiration'):
+            if not isinstance(sentinel, datetime.datetime):
+                delta = timedelta(sentinel)
+                now = datetime.datetime.now(tz=tzutc())
+                sentinel = vtype == 'age' and now - delta or now + delta
+
+            def convert(value, i):
+                value = parse_date(value)
+                if value is None:
+                    value = 0
+                if vtype == 'age':
+                    return value, sentinel
+                return sentinel, value
+            return convert
+        elif vtype == 'cidr':
+            s = parse_cidr(sentinel)
+
+            def convert(value, i):
+                v = parse_cidr(value)
+                if (isinstance(s, ipaddress._BaseAddress) and
+                        isinstance(v, ipaddress._BaseNetwork)):
+                    return v, s
+                return s, v
+            return convert
+        elif vtype == 'version':
+            sentinel = ComparableVersion(sentinel)
+            return lambda value, i: (sentinel, ComparableVersion(value))
+        return lambda value, i: self.process_value_type(sentinel, value, i)
+
+    def _compile_op(self, op_name, sentinel):
+        if not op_name:
+            return
+        op = OPERATORS[op_name]
+        # Only specialize operators when value conversion leaves the
+        # sentinel as is.
+        if self.vtype not in (
+                None, 'normalize', 'integer', 'size', 'unique_size', 'cidr_size'):
+            return op
+        if op_name in ('regex', 'regex-case', 'glob'):
+            if not isinstance(sentinel, six.string_types):
+                return op
+            if op_name == 'glob':
+                pattern = re.compile(fnmatch.translate(os.path.normcase(sentinel)))
+                normcase = os.path.normcase
+            else:
+                pattern = re.compile(
+                    sentinel, op_name == 'regex' and re.IGNORECASE or 0)
+                normcase = None
+
+            def pattern_match(value, v):
+                if not isinstance(value, six.string_types):
+                    return False
+                return bool(pattern.match(normcase and normcase(value) or value))
+            return pattern_match
+        elif op_name in ('in', 'ni', 'not-in') and isinstance(sentinel, list):
+            try:
+                members = frozenset(sentinel)
+            except TypeError:
+                return op
+            negate = op_name != 'in'
+
+            def member_match(value, v):
+                try:
+                    found = value in members
+                except TypeError:
+                    found = value in sentinel
+                return found != negate
+            return member_match
+        return op
+
     def process_value_type(self, sentinel, value, resource):
         if self.vtype == 'normalize' and isinstance(value, six.string_types):
             return sentinel, value.strip().lower()
@@ -701,6 +1133,7 @@ class EventFilter(ValueFilter):
 
     schema = type_schema('event', rinherit=ValueFilter.schema)
     schema_alias = True
+    resource_fields = ()
 
     def validate(self):
         if 'mode' not in self.manager.data:
@@ -772,12 +1205,13 @@ class ValueRegex(object):
 
     def __init__(self, expr):
         self.expr = expr
+        self.regex = re.compile(expr)
 
     def get_resource_value(self, resource):
         if resource is None:
             return resource
         try:
-            capture = re.match(self.expr, resource)
+            capture = self.regex.match(resource)
         except (ValueError, TypeError):
             return None
         if capture is None:  # regex didn't capture anything
@@ -16,7 +16,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import itertools
 
 from c7n.utils import local_session, chunks, type_schema
-from .core import Filter
+from .core import Filter, COST_BATCH_API
 from c7n.manager import resources
 
 
@@ -30,6 +30,7 @@ class HealthEventFilter(Filter):
     Custodian also supports responding to phd events via a lambda execution mode.
     """
     schema_alias = True
+    cost = COST_BATCH_API
     schema = type_schema(
         'health-event',
         types={'type': 'array', 'items': {'type': 'string'}},
@@ -19,8 +19,9 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from concurrent.futures import as_completed
 from datetime import datetime, timedelta
 
+from c7n.cache import get_snapshot
 from c7n.exceptions import PolicyValidationError
-from c7n.filters.core import Filter, OPERATORS
+from c7n.filters.core import Filter, OPERATORS, COST_BATCH_API
 from c7n.utils import local_session, type_schema, chunks
 
 
@@ -31,8 +32,8 @@ class MetricsFilter(Filter):
 
     Docs on cloud watch metrics
 
-    - GetMetricStatistics
-      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricStatistics.html
+    - GetMetricData
+      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricData.html
 
     - Supported Metrics
       https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/aws-services-cloudwatch-metrics.html
@@ -99,10 +100,12 @@ class MetricsFilter(Filter):
            'missing-value': {'type': 'number'},
            'required': ('value', 'name')})
     schema_alias = True
-    permissions = ("cloudwatch:GetMetricStatistics",)
+    cost = COST_BATCH_API
+    permissions = ("cloudwatch:GetMetricData",)
 
     MAX_QUERY_POINTS = 50850
     MAX_RESULT_POINTS = 1440
+    MAX_DATA_QUERIES = 500
 
     # Default per service, for overloaded services like ec2
     # we do type specific default namespace annotation
@@ -140,7 +143,9 @@ class MetricsFilter(Filter):
         duration = timedelta(days)
 
         self.metric = self.data['name']
-        self.end = datetime.utcnow()
+        # Align the query window to the minute, so identical queries from
+        # filters in the same run share results.
+        self.end = datetime.utcnow().replace(second=0, microsecond=0)
         self.start = self.end - duration
         self.period = int(self.data.get('period', duration.total_seconds()))
         self.statistics = self.data.get('statistics', 'Average')
@@ -155,22 +160,68 @@ class MetricsFilter(Filter):
                 ns = self.DEFAULT_NAMESPACE[self.model.service]
         self.namespace = ns
 
-        self.log.debug("Querying metrics for %d", len(resources))
-        matched = []
-        with self.executor_factory(max_workers=3) as w:
-            futures = []
-            for resource_set in chunks(resources, 50):
-                futures.append(
-                    w.submit(self.process_resource_set, resource_set))
+        # Note this annotation cache is policy scoped, not across
+        # policies, still the lack of full qualification on the key
+        # means multiple filters within a policy using the same metric
+        # across different periods or dimensions would be problematic.
+        key = "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
+
+        # Resources sharing dimensions share a query.
+        queries = {}
+        for r in resources:
+            if key in r.get('c7n.metrics', {}):
+                continue
+            # if we overload dimensions with multiple resources we get
+            # the statistics/average over those resources.
+            dimensions = self.get_dimensions(r)
+            # Merge in any filter specified metrics, get_dimensions is
+            # commonly overridden so we can't do it there.
+            dimensions.extend(self.get_user_dimensions())
+            queries.setdefault(
+                tuple(sorted((d['Name'], d['Value']) for d in dimensions)), [])
 
-            for f in as_completed(futures):
-                if f.exception():
-                    self.log.warning(
-                        "CW Retrieval error: %s" % f.exception())
+        self.log.debug(
+            "Querying metrics for %d resources with %d queries",
+            len(resources), len(queries))
+        datapoints = dict(zip(queries, self.get_datapoints(list(queries))))
+
+        matched = []
+        for r in resources:
+            collected_metrics = r.setdefault('c7n.metrics', {})
+            if key not in collected_metrics:
+                dimensions = self.get_dimensions(r)
+                dimensions.extend(self.get_user_dimensions())
+                points = datapoints.get(
+                    tuple(sorted((d['Name'], d['Value']) for d in dimensions)))
+                if points is None:
                     continue
-                matched.extend(f.result())
+                collected_metrics[key] = list(points)
+            if self.match(r, collected_metrics[key]):
+                matched.append(r)
         return matched
 
+    def match(self, r, datapoints):
+        # In certain cases CloudWatch reports no data for a metric.
+        # If the policy specifies a fill value for missing data, add
+        # that here before testing for matches. Otherwise, skip
+        # matching entirely.
+        if len(datapoints) == 0:
+            if 'missing-value' not in self.data:
+                return False
+            datapoints.append({
+                'Timestamp': self.start,
+                self.statistics: self.data['missing-value'],
+                'c7n:detail': 'Fill value for missing data'
+            })
+
+        if self.data.get('percent-attr'):
+            rvalue = r[self.data.get('percent-attr')]
+            if self.data.get('attr-multiplier'):
+                rvalue = rvalue * self.data['attr-multiplier']
+            percent = (datapoints[0][self.statistics] / rvalue * 100)
+            return self.op(percent, self.value)
+        return self.op(datapoints[0][self.statistics], self.value)
+
     def get_dimensions(self, resource):
         return [{'Name': self.model.dimension,
                  'Value': resource[self.model.dimension]}]
@@ -183,59 +234,71 @@ class MetricsFilter(Filter):
             dims.append({'Name': k, 'Value': v})
         return dims
 
-    def process_resource_set(self, resource_set):
+    def get_datapoints(self, queries):
+        """Get the datapoints of each dimension query.
+
+        Results are shared with other metric filters in the same run, and
+        are None for queries that failed.
+        """
+        keys = [{
+            'account_id': self.manager.config.account_id,
+            'region': self.manager.config.region,
+            'namespace': self.namespace,
+            'metric': self.metric,
+            'statistic': self.statistics,
+            'period': self.period,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'dimensions': q} for q in queries]
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return self.fetch_datapoints(keys)
+        return snapshot.get_many(keys, self.fetch_datapoints)
+
+    def fetch_datapoints(self, keys):
+        results = {}
+        with self.executor_factory(max_workers=3) as w:
+            futures = {}
+            for key_set in chunks(keys, self.MAX_DATA_QUERIES):
+                futures[w.submit(self.process_query_set, key_set)] = key_set
+            for f in as_completed(futures):
+                if f.exception():
+                    self.log.warning(
+                        "CW Retrieval error: %s" % f.exception())
+                    continue
+                for k, points in zip(futures[f], f.result()):
+                    results[id(k)] = points
+        return [results.get(id(k)) for k in keys]
+
+    def process_query_set(self, key_set):
         client = local_session(
             self.manager.session_factory).client('cloudwatch')
-
-        matched = []
-        for r in resource_set:
-            # if we overload dimensions with multiple resources we get
-            # the statistics/average over those resources.
-            dimensions = self.get_dimensions(r)
-            # Merge in any filter specified metrics, get_dimensions is
-            # commonly overridden so we can't do it there.
-            dimensions.extend(self.get_user_dimensions())
-
-            collected_metrics = r.setdefault('c7n.metrics', {})
-            # Note this annotation cache is policy scoped, not across
-            # policies, still the lack of full qualification on the key
-            # means multiple filters within a policy using the same metric
-            # across different periods or dimensions would be problematic.
-            key = "%s.%s.%s" % (self.namespace, self.metric, self.statistics)
-            if key not in collected_metrics:
-                collected_metrics[key] = client.get_metric_statistics(
-                    Namespace=self.namespace,
-                    MetricName=self.metric,
-                    Statistics=[self.statistics],
-                    StartTime=self.start,
-                    EndTime=self.end,
-                    Period=self.period,
-                    Dimensions=dimensions)['Datapoints']
-
-            # In certain cases CloudWatch reports no data for a metric.
-            # If the policy specifies a fill value for missing data, add
-            # that here before testing for matches. Otherwise, skip
-            # matching entirely.
-            if len(collected_metrics[key]) == 0:
-                if 'missing-value' not in self.data:
-                    continue
-                collected_metrics[key].append({
-                    'Timestamp': self.start,
-                    self.statistics: self.data['missing-value'],
-                    'c7n:detail': 'Fill value for missing data'
-                })
-
-            if self.data.get('percent-attr'):
-                rvalue = r[self.data.get('percent-attr')]
-                if self.data.get('attr-multiplier'):
-                    rvalue = rvalue * self.data['attr-multiplier']
-                percent = (collected_metrics[key][0][self.statistics] /
-                           rvalue * 100)
-                if self.op(percent, self.value):
-                    matched.append(r)
-            elif self.op(collected_metrics[key][0][self.statistics], self.value):
-                matched.append(r)
-        return matched
+        queries = []
+        for idx, k in enumerate(key_set):
+            queries.append({
+                'Id': 'm%d' % idx,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': k['namespace'],
+                        'MetricName': k['metric'],
+                        'Dimensions': [
+                            {'Name': n, 'Value': v} for n, v in k['dimensions']]},
+                    'Period': k['period'],
+                    'Stat': k['statistic']},
+                'ReturnData': True})
+        params = dict(
+            MetricDataQueries=queries, StartTime=self.start, EndTime=self.end)
+        datapoints = [[] for k in key_set]
+        while True:
+            response = client.get_metric_data(**params)
+            for result in response['MetricDataResults']:
+                points = datapoints[int(result['Id'][1:])]
+                for ts, v in zip(result['Timestamps'], result['Values']):
+                    points.append({'Timestamp': ts, self.statistics: v})
+            if not response.get('NextToken'):
+                break
+            params['NextToken'] = response['NextToken']
+        return datapoints
 
 
 class ShieldMetrics(MetricsFilter):
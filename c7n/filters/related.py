@@ -17,17 +17,20 @@ import importlib
 
 import jmespath
 
-from .core import ValueFilter, OPERATORS
+from .core import ValueFilter, OPERATORS, COST_RELATED
 
 
 class RelatedResourceFilter(ValueFilter):
 
     schema_alias = False
+    cost = COST_RELATED
 
     RelatedResource = None
     RelatedIdsExpression = None
     AnnotationKey = None
     FetchThreshold = 10
+    # resource_count here counts related resources per resource
+    full_set = False
 
     def get_permissions(self):
         return self.get_resource_manager().get_permissions()
@@ -51,15 +54,8 @@ class RelatedResourceFilter(ValueFilter):
             "[].%s" % self.RelatedIdsExpression, resources))
 
     def get_related(self, resources):
-        resource_manager = self.get_resource_manager()
-        related_ids = self.get_related_ids(resources)
-        model = resource_manager.get_model()
-        if len(related_ids) < self.FetchThreshold:
-            related = resource_manager.get_resources(list(related_ids))
-        else:
-            related = resource_manager.resources()
-        return {r[model.id]: r for r in related
-                if r[model.id] in related_ids}
+        return self.get_resource_manager().get_resource_index(
+            self.get_related_ids(resources), self.FetchThreshold)
 
     def get_resource_manager(self):
         mod_path, class_name = self.RelatedResource.rsplit('.', 1)
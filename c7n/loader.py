@@ -12,11 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-try:
-    from functools import lru_cache
-except ImportError:
-    from backports.functools_lru_cache import lru_cache
-
 import logging
 import os
 
@@ -76,13 +71,10 @@ class SchemaValidator(object):
         self.schema = v.schema
         return self.validator
 
-    @lru_cache(maxsize=32)
     def _gen_schema(self, resource_types):
         if schema is None:
             raise RuntimeError("missing jsonschema dependency")
-        rt_schema = schema.generate(resource_types)
-        schema.JsonSchemaValidator.check_schema(rt_schema)
-        return schema.JsonSchemaValidator(rt_schema)
+        return schema.get_validator(resource_types)
 
 
 class PolicyLoader(object):
@@ -126,7 +118,8 @@ class PolicyLoader(object):
         # track policy resource types and only load if needed.
         rtypes = set(self.structure.get_resource_types(policy_data))
 
-        missing = load_resources(list(rtypes))
+        missing = load_resources(
+            list(rtypes), self.structure.get_element_types(policy_data))
         if missing:
             self._handle_missing_resources(policy_data, missing)
 
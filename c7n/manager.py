@@ -14,6 +14,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from collections import deque
+from itertools import chain
 import logging
 
 from c7n import cache
@@ -74,6 +75,20 @@ class ResourceManager(object):
     def resources(self):
         raise NotImplementedError("")
 
+    def get_resource_index(self, ids, fetch_threshold=None):
+        """Return a mapping of resource id to resource for the given ids.
+
+        Resources are described by id, or fully fetched when there are at
+        least `fetch_threshold` ids.
+        """
+        ids = set(ids)
+        model = self.get_model()
+        if fetch_threshold is None or len(ids) < fetch_threshold:
+            related = self.get_resources(list(ids))
+        else:
+            related = self.resources()
+        return {r[model.id]: r for r in related if r[model.id] in ids}
+
     def get_resource_manager(self, resource_type, data=None):
         """get a resource manager or a given resource type.
 
@@ -102,13 +117,15 @@ class ResourceManager(object):
         if event and event.get('debug', False):
             self.log.info(
                 "Filtering resources with %s", self.filters)
-        for f in self.filters:
+        for f in self.get_filters():
             if not resources:
                 break
             rcount = len(resources)
+            resources = self.resolve_fields(resources, f.get_resource_fields())
 
             with self.ctx.tracer.subsegment("filter:%s" % f.type):
                 resources = f.process(resources, event)
+            f.record_selectivity(rcount, len(resources))
 
             if event and event.get('debug', False):
                 self.log.debug(
@@ -117,6 +134,48 @@ class ResourceManager(object):
             original, len(resources), self.__class__.__name__.lower()))
         return resources
 
+    def get_filters(self):
+        """Policy filters in evaluation order.
+
+        Filters are evaluated as written, unless the policy enables
+        reordering with `filter-reorder: true` to evaluate cheaper ones
+        first.
+        """
+        from c7n.filters.core import order_filters
+        if not self.data.get('filter-reorder', False):
+            return self.filters
+        return order_filters(self.filters)
+
+    def get_resource_fields(self):
+        """Top level resource keys referenced by the policy.
+
+        Returns None, meaning resources should be fully described, if
+        any filter or action doesn't declare the keys it reads, or when
+        the manager serves another policy's related resource lookups.
+        """
+        policy = getattr(self.ctx, 'policy', None)
+        if policy is None or self.data != policy.data:
+            return None
+        elements = list(chain(getattr(self, 'filters', ()), getattr(self, 'actions', ())))
+        # policies without filters or actions are resource inventories
+        if not elements:
+            return None
+        fields = set()
+        for el in elements:
+            el_fields = el.get_resource_fields()
+            if el_fields is None:
+                return None
+            fields.update(el_fields)
+        return fields
+
+    def resolve_fields(self, resources, fields):
+        """Fetch the given resource fields where not yet described.
+
+        Resources narrowed to the policy's fields are resolved before
+        each filter and action, fields of None resolves all of them.
+        """
+        return resources
+
     def get_model(self):
         """Returns the resource meta-model.
         """
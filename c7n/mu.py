@@ -27,6 +27,7 @@ import json
 import logging
 import os
 import shutil
+import threading
 import time
 import tempfile
 import zipfile
@@ -127,62 +128,14 @@ class PythonPackageArchive(object):
         files, including compiled modules. You'll have to add such files
         manually using :py:meth:`add_file`.
         """
-        for module_name in modules:
-            module = importlib.import_module(module_name)
-
-            if hasattr(module, '__path__'):
-                # https://docs.python.org/3/reference/import.html#module-path
-                for directory in module.__path__:
-                    self.add_directory(directory, ignore)
-                if getattr(module, '__file__', None) is None:
-
-                    # Likely a namespace package. Try to add *.pth files so
-                    # submodules are importable under Python 2.7.
-
-                    sitedir = os.path.abspath(os.path.join(list(module.__path__)[0], os.pardir))
-                    for filename in os.listdir(sitedir):
-                        s = filename.startswith
-                        e = filename.endswith
-                        if s(module_name) and e('-nspkg.pth'):
-                            self.add_file(os.path.join(sitedir, filename))
-
-            elif hasattr(module, '__file__'):
-                # https://docs.python.org/3/reference/import.html#__file__
-                path = module.__file__
-
-                if path.endswith('.pyc'):
-                    _path = path[:-1]
-                    if not os.path.isfile(_path):
-                        raise ValueError(
-                            'Could not find a *.py source file behind ' + path)
-                    path = _path
-
-                if not path.endswith('.py'):
-                    raise ValueError(
-                        'We need a *.py source file instead of ' + path)
-
-                self.add_file(path)
+        for src, dest in module_files(modules, ignore):
+            self.add_file(src, dest)
 
     def add_directory(self, path, ignore=None):
         """Add ``*.py`` files under the directory ``path`` to the archive.
         """
-        for root, dirs, files in os.walk(path):
-            arc_prefix = os.path.relpath(root, os.path.dirname(path))
-            # py3 remove pyc cache dirs.
-            if '__pycache__' in dirs:
-                dirs.remove('__pycache__')
-            for f in files:
-                dest_path = os.path.join(arc_prefix, f)
-
-                # ignore specific files
-                if ignore and ignore(dest_path):
-                    continue
-
-                if f.endswith('.pyc') or f.endswith('.c'):
-                    continue
-                f_path = os.path.join(root, f)
-
-                self.add_file(f_path, dest_path)
+        for src, dest in directory_files(path, ignore):
+            self.add_file(src, dest)
 
     def add_file(self, src, dest=None):
         """Add the file at ``src`` to the archive.
@@ -270,6 +223,67 @@ class PythonPackageArchive(object):
         return [n.filename for n in self.get_reader().filelist]
 
 
+def module_files(modules, ignore=None):
+    """Iterate the (source path, archive path) of files for python modules.
+    """
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+
+        if hasattr(module, '__path__'):
+            # https://docs.python.org/3/reference/import.html#module-path
+            for directory in module.__path__:
+                for f in directory_files(directory, ignore):
+                    yield f
+            if getattr(module, '__file__', None) is None:
+
+                # Likely a namespace package. Try to add *.pth files so
+                # submodules are importable under Python 2.7.
+
+                sitedir = os.path.abspath(os.path.join(list(module.__path__)[0], os.pardir))
+                for filename in os.listdir(sitedir):
+                    s = filename.startswith
+                    e = filename.endswith
+                    if s(module_name) and e('-nspkg.pth'):
+                        yield os.path.join(sitedir, filename), filename
+
+        elif hasattr(module, '__file__'):
+            # https://docs.python.org/3/reference/import.html#__file__
+            path = module.__file__
+
+            if path.endswith('.pyc'):
+                _path = path[:-1]
+                if not os.path.isfile(_path):
+                    raise ValueError(
+                        'Could not find a *.py source file behind ' + path)
+                path = _path
+
+            if not path.endswith('.py'):
+                raise ValueError(
+                    'We need a *.py source file instead of ' + path)
+
+            yield path, os.path.basename(path)
+
+
+def directory_files(path, ignore=None):
+    """Iterate the (source path, archive path) of files under a directory.
+    """
+    for root, dirs, files in os.walk(path):
+        arc_prefix = os.path.relpath(root, os.path.dirname(path))
+        # py3 remove pyc cache dirs.
+        if '__pycache__' in dirs:
+            dirs.remove('__pycache__')
+        for f in files:
+            dest_path = os.path.join(arc_prefix, f)
+
+            # ignore specific files
+            if ignore and ignore(dest_path):
+                continue
+
+            if f.endswith('.pyc') or f.endswith('.c'):
+                continue
+            yield os.path.join(root, f), dest_path
+
+
 def checksum(fh, hasher, blocksize=65536):
     buf = fh.read(blocksize)
     while len(buf) > 0:
@@ -338,11 +352,41 @@ def custodian_archive(packages=None):
 
     packages: List of additional packages to include in the lambda archive.
 
+    Archives are built once per process for a given package set, each
+    call returns an open copy of the cached build.
     """
     modules = {'c7n', 'pkg_resources'}
     if packages:
         modules = filter(None, modules.union(packages))
-    return PythonPackageArchive(sorted(modules))
+    modules = sorted(modules)
+
+    with _archive_lock:
+        # module contents are digested once per process
+        digest = _archive_digests.get(tuple(modules))
+        if digest is None:
+            digest = _archive_digests[tuple(modules)] = archive_digest(modules)
+        archive = _archive_cache.get(digest)
+        if archive is None:
+            log.debug("Building custodian archive modules:%s", ", ".join(modules))
+            archive = _archive_cache[digest] = PythonPackageArchive(modules).close()
+    return PythonPackageArchive(cache_file=archive.path)
+
+
+# Closed custodian archives keyed by the digest of their contents.
+_archive_cache = {}
+# Content digests keyed by the sorted modules of an archive.
+_archive_digests = {}
+_archive_lock = threading.Lock()
+
+
+def archive_digest(modules):
+    """Return a digest of the archive paths and contents of python modules."""
+    hasher = hashlib.sha256()
+    for src, dest in sorted(module_files(modules), key=lambda f: f[1]):
+        hasher.update(dest.encode('utf8'))
+        with open(src, 'rb') as fh:
+            hasher.update(checksum(fh, hashlib.sha256()))
+    return hasher.hexdigest()
 
 
 class LambdaManager(object):
@@ -364,8 +408,9 @@ class LambdaManager(object):
                     yield f
 
     def publish(self, func, alias=None, role=None, s3_uri=None):
+        timings = {}
         result, changed = self._create_or_update(
-            func, role, s3_uri, qualifier=alias)
+            func, role, s3_uri, qualifier=alias, timings=timings)
         func.arn = result['FunctionArn']
         if alias and changed:
             func.alias = self.publish_alias(result, alias)
@@ -374,11 +419,17 @@ class LambdaManager(object):
         else:
             func.alias = func.arn
 
+        t = time.time()
         for e in func.get_events(self.session_factory):
             if e.add(func):
                 log.debug(
                     "Added event source: %s to function: %s",
                     e, func.alias)
+        timings['events'] = time.time() - t
+        log.info(
+            "Provisioned function:%s changed:%s %s", func.name, changed,
+            " ".join("%s:%0.2fs" % (k, timings[k]) for k in (
+                'archive', 'config', 'code', 'events') if k in timings))
         return result
 
     add = publish
@@ -487,32 +538,39 @@ class LambdaManager(object):
                 remove.add(k)
         return add, list(remove)
 
-    def _create_or_update(self, func, role=None, s3_uri=None, qualifier=None):
+    def _create_or_update(self, func, role=None, s3_uri=None, qualifier=None, timings=None):
+        timings = {} if timings is None else timings
         role = func.role or role
         assert role, "Lambda function role must be specified"
+        t = time.time()
         archive = func.get_archive()
+        timings['archive'] = time.time() - t
         existing = self.get(func.name, qualifier)
 
-        if s3_uri:
-            # TODO: support versioned buckets
-            bucket, key = self._upload_func(s3_uri, func, archive)
-            code_ref = {'S3Bucket': bucket, 'S3Key': key}
-        else:
-            code_ref = {'ZipFile': archive.get_bytes()}
+        def get_code_ref():
+            # Only upload code that is going to be deployed.
+            if s3_uri:
+                # TODO: support versioned buckets
+                bucket, key = self._upload_func(s3_uri, func, archive)
+                return {'S3Bucket': bucket, 'S3Key': key}
+            return {'ZipFile': archive.get_bytes()}
 
         changed = False
         if existing:
             result = old_config = existing['Configuration']
             if archive.get_checksum() != old_config['CodeSha256']:
                 log.debug("Updating function %s code", func.name)
+                t = time.time()
                 params = dict(FunctionName=func.name, Publish=True)
-                params.update(code_ref)
+                params.update(get_code_ref())
                 result = self.client.update_function_code(**params)
+                timings['code'] = time.time() - t
                 changed = True
 
             # TODO/Consider also set publish above to false, and publish
             # after configuration change?
 
+            t = time.time()
             new_config = func.get_config()
             new_config['Role'] = role
 
@@ -527,12 +585,15 @@ class LambdaManager(object):
                 changed = True
             if self._update_concurrency(existing, func):
                 changed = True
+            timings['config'] = time.time() - t
         else:
             log.info('Publishing custodian policy lambda function %s', func.name)
+            t = time.time()
             params = func.get_config()
-            params.update({'Publish': True, 'Code': code_ref, 'Role': role})
+            params.update({'Publish': True, 'Code': get_code_ref(), 'Role': role})
             result = self.client.create_function(**params)
             self._update_concurrency(None, func)
+            timings['code'] = time.time() - t
             changed = True
 
         return result, changed
@@ -20,20 +20,28 @@ See docs/usage/outputs.rst
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import atexit
+from collections import defaultdict, deque
 import contextlib
 from datetime import datetime
 import json
 import gzip
+import io
 import logging
 import os
 import shutil
+import tempfile
+import threading
 import time
 import uuid
 
+import six
+
 
 from c7n.exceptions import InvalidOutputConfig
+from c7n.executor import get_thread_owner, set_thread_owner
 from c7n.registry import PluginRegistry
-from c7n.utils import parse_url_config
+from c7n.utils import dumps, parse_url_config
 
 try:
     import psutil
@@ -117,6 +125,122 @@ class NullTracer(object):
         """Exit main segment for policy execution.
         """
 
+    def record_span(self, name, start, end, **args):
+        """Record an already completed span, ie. an api call.
+        """
+
+
+class TraceRecorder(object):
+    """Accumulate trace events for a trace file across policy executions.
+
+    Trace files are written once when the run completes, or at process
+    exit for other entry points, rather than per policy.
+    """
+
+    recorders = {}
+    lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = set()
+        self.pending = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path):
+        with cls.lock:
+            if not cls.recorders:
+                atexit.register(cls.flush)
+            recorder = cls.recorders.get(path)
+            if recorder is None:
+                recorder = cls.recorders[path] = cls(path)
+            return recorder
+
+    @classmethod
+    def flush(cls):
+        """Write the trace files of all recorders with new events."""
+        with cls.lock:
+            recorders = list(cls.recorders.values())
+        for recorder in recorders:
+            recorder.write()
+
+    def add(self, name, category, start, end, args):
+        thread = threading.current_thread()
+        with self.lock:
+            if thread.ident not in self.threads:
+                self.threads.add(thread.ident)
+                self.events.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                    'tid': thread.ident, 'args': {'name': thread.name}})
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': self.pid,
+                'tid': thread.ident, 'ts': int(start * 1e6),
+                'dur': int((end - start) * 1e6), 'args': args})
+            self.pending = True
+
+    def write(self):
+        with self.lock:
+            if not self.pending:
+                return
+            dirname = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as fh:
+                    json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, fh)
+                # atomically replace any previous trace, os.replace is py3 only
+                getattr(os, 'replace', os.rename)(tmp_path, self.path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+            self.pending = False
+
+
+@tracer_outputs.register('file')
+class TraceEventTracer(NullTracer):
+    """Record policy execution spans to a local trace event file.
+
+    Usage ``--trace file:///tmp/custodian-trace.json``
+
+    The file uses the chrome trace event format, viewable with
+    chrome://tracing, perfetto or speedscope. Spans are recorded by
+    thread for each policy execution, resource fetch and augment, each
+    filter (including block filter children) and action, and on
+    providers whose api stats report them each api call. Policies
+    executed in the same process are written to the same file, when
+    the run completes.
+    """
+
+    def __init__(self, ctx, config=None):
+        super(TraceEventTracer, self).__init__(ctx, config)
+        self.recorder = TraceRecorder.get(os.path.expanduser(
+            self.config.get('netloc', '') + self.config.get('path', '')))
+        self.start = None
+
+    @contextlib.contextmanager
+    def subsegment(self, name):
+        start = time.time()
+        try:
+            yield self
+        finally:
+            self.record_span(name, start, time.time())
+
+    def record_span(self, name, start, end, **args):
+        args['policy'] = self.ctx.policy.name
+        self.recorder.add(name, name.split(':', 1)[0], start, end, args)
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        self.record_span(
+            'policy:%s' % self.ctx.policy.name, self.start, time.time(),
+            resource=self.ctx.policy.resource_type,
+            region=self.ctx.options.region)
+
 
 class DeltaStats(object):
     """Capture stats (dictionary of string->integer) as a stack.
@@ -177,6 +301,11 @@ class NullStats(object):
         """
         return {}
 
+    def get_operation_stats(self):
+        """Return statistics of api calls by operation.
+        """
+        return {}
+
     def __enter__(self):
         """Push a snapshot
         """
@@ -323,6 +452,128 @@ class LogMetrics(Metrics):
         return res
 
 
+class PolicyThreadFilter(logging.Filter):
+    """Scope a policy's log handler to records from its own execution.
+
+    With concurrent policy execution several policies have handlers on
+    the custodian logger at once. Records emitted for another policy,
+    on its thread or on the worker pool threads it owns (ie. filter and
+    action workers), are excluded. Records from threads not owned by a
+    policy are accepted.
+    """
+
+    policy_threads = set()
+
+    def __init__(self):
+        super(PolicyThreadFilter, self).__init__()
+        self.thread = threading.current_thread().ident
+        self.previous_owner = None
+
+    def __enter__(self):
+        # the policy's thread owns its work, even on a policy worker pool
+        self.previous_owner = set_thread_owner(self.thread)
+        self.policy_threads.add(self.thread)
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        self.policy_threads.discard(self.thread)
+        set_thread_owner(self.previous_owner)
+
+    def filter(self, record):
+        # filters run on the thread emitting the record
+        owner = get_thread_owner()
+        return owner == self.thread or owner not in self.policy_threads
+
+
+class OrderedLogBuffer(object):
+    """Order log output of concurrently executing units of work.
+
+    Units are declared up front in their output order, records emitted
+    by a thread while it executes a unit are released to the root
+    logger's handlers in that order. The first outstanding unit streams
+    its records directly, records from later units are buffered until
+    all of the units before them have finished. Records from threads
+    not executing a unit pass through.
+    """
+
+    def __init__(self, keys):
+        self.order = deque(keys)
+        self.done = set()
+        self.threads = {}
+        self.records = defaultdict(list)
+        self.handlers = []
+        self.lock = threading.RLock()
+
+    def __enter__(self):
+        for h in logging.getLogger().handlers:
+            h.addFilter(self.get_filter(h))
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        for h, f in self.handlers:
+            h.removeFilter(f)
+        with self.lock:
+            self.order.clear()
+            self._release(list(self.records))
+
+    def get_filter(self, handler):
+        buf = self
+
+        class _Filter(logging.Filter):
+            def filter(self, record):
+                return buf.filter(handler, record)
+
+        f = _Filter()
+        self.handlers.append((handler, f))
+        return f
+
+    @contextlib.contextmanager
+    def capture(self, key):
+        """Attribute records from the current thread to the given unit."""
+        thread = threading.current_thread().ident
+        with self.lock:
+            previous = self.threads.get(thread)
+            self.threads[thread] = key
+        try:
+            yield
+        finally:
+            with self.lock:
+                if previous is None:
+                    self.threads.pop(thread, None)
+                else:
+                    self.threads[thread] = previous
+
+    def finish(self, key):
+        """Mark a unit as finished, releasing any buffered output now in turn."""
+        with self.lock:
+            self.done.add(key)
+            while self.order and self.order[0] in self.done:
+                self._release([self.order.popleft()])
+            if self.order:
+                self._release([self.order[0]])
+
+    def filter(self, handler, record):
+        with self.lock:
+            key = self.threads.get(record.thread)
+            if key is None or not self.order or key == self.order[0]:
+                return True
+            self.records[key].append((handler, record))
+            return False
+
+    def _release(self, keys):
+        # handlers re-filter on handle, so drop the buffered records'
+        # attribution before replaying them.
+        records = []
+        for k in keys:
+            records.extend(self.records.pop(k, ()))
+        saved, self.threads = self.threads, {}
+        try:
+            for h, r in records:
+                h.handle(r)
+        finally:
+            self.threads = saved
+
+
 class LogOutput(object):
 
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -349,12 +600,15 @@ class LogOutput(object):
         self.handler = self.get_handler()
         self.handler.setLevel(logging.DEBUG)
         self.handler.setFormatter(logging.Formatter(self.log_format))
+        self.handler_filter = PolicyThreadFilter().__enter__()
+        self.handler.addFilter(self.handler_filter)
         mlog = logging.getLogger('custodian')
         mlog.addHandler(self.handler)
 
     def leave_log(self):
         mlog = logging.getLogger('custodian')
         mlog.removeHandler(self.handler)
+        self.handler_filter.__exit__()
         self.handler.flush()
         self.handler.close()
 
@@ -374,12 +628,67 @@ class LogFile(LogOutput):
         return logging.FileHandler(self.log_path)
 
 
+def write_resources(fh, resources):
+    """Incrementally encode resources to a binary file object.
+
+    The output is a json array with one resource per line, so it can be
+    read back a resource at a time with :func:`iter_resources`.
+    """
+    fh.write(b'[')
+    for idx, r in enumerate(resources):
+        fh.write(idx and b',\n' or b'\n')
+        fh.write(dumps(r, indent=None).encode('utf8'))
+    fh.write(b'\n]\n')
+
+
+def iter_resources(fh):
+    """Iterate over the resources in a text file object.
+
+    Files written by :func:`write_resources` are decoded a line at a
+    time, any other json array (ie. pretty printed by older versions)
+    is loaded whole. The file object is never rewound, so it can wrap a
+    stream.
+    """
+    first, line = fh.readline(), fh.readline()
+    if first.rstrip() != '[' or not line.startswith('{'):
+        for r in json.loads(first + line + fh.read()):
+            yield r
+        return
+    while line and line[0] != ']':
+        yield json.loads(line.rstrip().rstrip(','))
+        line = fh.readline()
+
+
+def open_resources(path):
+    """Open a resources.json file for reading, compressed or not.
+
+    Returns None if neither path nor its gzip equivalent exist.
+    """
+    if os.path.exists(path):
+        return io.open(path, encoding='utf8')
+    if not os.path.exists(path + '.gz'):
+        return None
+    return gzip_text(open(path + '.gz', 'rb'))
+
+
+def gzip_text(fileobj):
+    fh = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if six.PY3:
+        return io.TextIOWrapper(fh, encoding='utf8')
+    return fh
+
+
 @blob_outputs.register('file')
 @blob_outputs.register('default')
 class DirectoryOutput(object):
 
     permissions = ()
 
+    # Outputs which compress the directory before upload set this, so
+    # resources are written compressed up front. The uploaded objects are
+    # unchanged, compress replaces every file with its .gz equivalent.
+    compress_resources = False
+
     def __init__(self, ctx, config):
         self.ctx = ctx
         self.config = config
@@ -406,6 +715,8 @@ class DirectoryOutput(object):
         # downloading tar and extracting.
         for root, dirs, files in os.walk(self.root_dir):
             for f in files:
+                if f.endswith('.gz'):
+                    continue
                 fp = os.path.join(root, f)
                 with gzip.open(fp + ".gz", "wb", compresslevel=7) as zfh:
                     with open(fp, "rb") as sfh:
@@ -426,16 +737,23 @@ class DirectoryOutput(object):
             'uuid': str(uuid.uuid4())}
         return data
 
-    def get_resource_set(self):
+    def write_resources(self, resources):
         record_path = os.path.join(self.root_dir, 'resources.json')
+        if self.compress_resources:
+            fh = gzip.open(record_path + '.gz', 'wb', compresslevel=7)
+        else:
+            fh = open(record_path, 'wb')
+        with fh:
+            write_resources(fh, resources)
 
-        if not os.path.exists(record_path):
-            return []
-
-        mdate = datetime.fromtimestamp(
-            os.stat(record_path).st_ctime)
-
-        with open(record_path) as fh:
-            records = json.load(fh)
-            [r.__setitem__('CustodianDate', mdate) for r in records]
-            return records
+    def get_resource_set(self):
+        """Iterate over the resources written by the policy's last run."""
+        fh = open_resources(os.path.join(self.root_dir, 'resources.json'))
+        if fh is None:
+            return
+
+        mdate = datetime.fromtimestamp(os.fstat(fh.fileno()).st_ctime)
+        with fh:
+            for r in iter_resources(fh):
+                r['CustodianDate'] = mdate
+                yield r
@@ -25,6 +25,7 @@ import time
 import jmespath
 import six
 
+from c7n import cache
 from c7n.cwe import CloudWatchEvents
 from c7n.ctx import ExecutionContext
 from c7n.exceptions import PolicyValidationError, ClientError, ResourceLimitExceeded
@@ -48,14 +49,15 @@ def load(options, path, format=None, validate=True, vars=None):
 
     structure = StructureParser()
     structure.validate(data)
-    load_resources(structure.get_resource_types(data))
+    rtypes = structure.get_resource_types(data)
+    load_resources(rtypes, structure.get_element_types(data))
 
     if isinstance(data, list):
         log.warning('yaml in invalid format. The "policies:" line is probably missing.')
         return None
 
     if validate:
-        errors = validate(data)
+        errors = validate(data, resource_types=rtypes)
         if errors:
             raise PolicyValidationError(
                 "Failed to validate policy %s \n %s" % (
@@ -298,17 +300,16 @@ class PullMode(PolicyExecutionMode):
 
             rt = time.time() - s
             self.policy.log.info(
-                "policy:%s resource:%s region:%s count:%d time:%0.2f" % (
+                "policy:%s resource:%s region:%s count:%d time:%0.2f%s" % (
                     self.policy.name,
                     self.policy.resource_type,
                     self.policy.options.region,
-                    len(resources), rt))
+                    len(resources), rt, self.get_api_summary()))
             self.policy.ctx.metrics.put_metric(
                 "ResourceCount", len(resources), "Count", Scope="Policy")
             self.policy.ctx.metrics.put_metric(
                 "ResourceTime", rt, "Seconds", Scope="Policy")
-            self.policy._write_file(
-                'resources.json', utils.dumps(resources, indent=2))
+            self.policy._write_resources(resources)
 
             if not resources:
                 return []
@@ -320,6 +321,8 @@ class PullMode(PolicyExecutionMode):
             at = time.time()
             for a in self.policy.resource_manager.actions:
                 s = time.time()
+                resources = self.policy.resource_manager.resolve_fields(
+                    resources, a.get_resource_fields())
                 with self.policy.ctx.tracer.subsegment('action:%s' % a.type):
                     results = a.process(resources)
                 self.policy.log.info(
@@ -333,8 +336,32 @@ class PullMode(PolicyExecutionMode):
                         "action-%s" % a.name, utils.dumps(results))
             self.policy.ctx.metrics.put_metric(
                 "ActionTime", time.time() - at, "Seconds", Scope="Policy")
+
+            # Actions modify resources, subsequent policies in the run
+            # need to see their current state.
+            snapshot = cache.get_snapshot()
+            get_cache_key = getattr(self.policy.resource_manager, 'get_cache_key', None)
+            if (snapshot is not None and get_cache_key is not None and
+                    self.policy.resource_manager.actions):
+                snapshot.invalidate(get_cache_key(None))
+                # as well as any tags fetched for them
+                snapshot.invalidate(dict(get_cache_key(None), resource='tags'))
             return resources
 
+    def get_api_summary(self, limit=3):
+        """Summarize the slowest api operations by total latency."""
+        api_stats = getattr(self.policy.ctx, 'api_stats', None)
+        if api_stats is None:
+            return ''
+        slowest = sorted(
+            api_stats.get_operation_stats().items(),
+            key=lambda i: i[1]['latency']['total'], reverse=True)[:limit]
+        if not slowest:
+            return ''
+        return " api:%s" % ",".join(
+            "%s=%0.2fs/%d" % (op, s['latency']['total'], s['calls'])
+            for op, s in slowest)
+
     def get_logs(self, start, end):
         from c7n import logs_support
         log_source = self.policy.ctx.output
@@ -541,13 +568,14 @@ class LambdaMode(ServerlessExecutionMode):
                 self.policy.log.info(
                     "Invoking actions %s", self.policy.resource_manager.actions)
 
-            self.policy._write_file(
-                'resources.json', utils.dumps(resources, indent=2))
+            self.policy._write_resources(resources)
 
             for action in self.policy.resource_manager.actions:
                 self.policy.log.info(
                     "policy:%s invoking action:%s resources:%d",
                     self.policy.name, action.name, len(resources))
+                resources = self.policy.resource_manager.resolve_fields(
+                    resources, action.get_resource_fields())
                 if isinstance(action, EventAction):
                     results = action.process(resources, event)
                 else:
@@ -1062,6 +1090,9 @@ class Policy(object):
         with open(os.path.join(self.ctx.log_dir, rel_path), 'w') as fh:
             fh.write(value)
 
+    def _write_resources(self, resources):
+        self.ctx.output.write_resources(resources)
+
     def load_resource_manager(self):
         factory = get_resource_class(self.data.get('resource'))
         return factory(self.ctx, self.data)
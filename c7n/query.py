@@ -26,14 +26,17 @@ import jmespath
 import six
 import os
 
+from c7n import cache
 from c7n.actions import ActionRegistry
 from c7n.exceptions import ClientError, ResourceLimitExceeded, PolicyExecutionError
+from c7n.executor import AdaptiveConcurrency
 from c7n.filters import FilterRegistry, MetricsFilter
 from c7n.manager import ResourceManager
+from c7n.ratelimit import get_limiter
 from c7n.registry import PluginRegistry
 from c7n.tags import register_ec2_tags, register_universal_tags
 from c7n.utils import (
-    local_session, generate_arn, get_retry, chunks, camelResource)
+    local_session, generate_arn, get_retry, chunks, camelResource, overrides)
 
 
 try:
@@ -60,11 +63,12 @@ class ResourceQuery(object):
             m = resource_type
         return m
 
-    def _invoke_client_enum(self, client, enum_op, params, path, retry=None):
+    def _invoke_client_enum(self, client, enum_op, params, path, retry=None,
+                            account_id=None):
         if client.can_paginate(enum_op):
             p = client.get_paginator(enum_op)
             if retry:
-                p.PAGE_ITERATOR_CLS = RetryPageIterator
+                p.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(account_id)
             results = p.paginate(**params)
             data = results.build_full_result()
         else:
@@ -77,6 +81,20 @@ class ResourceQuery(object):
 
         return data
 
+    def _iter_client_enum(self, client, enum_op, params, path, retry=None,
+                          account_id=None):
+        if not path or not client.can_paginate(enum_op):
+            yield self._invoke_client_enum(
+                client, enum_op, params, path, retry, account_id) or []
+            return
+
+        p = client.get_paginator(enum_op)
+        if retry:
+            p.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(account_id)
+        path = jmespath.compile(path)
+        for page in p.paginate(**params):
+            yield path.search(page) or []
+
     def filter(self, resource_manager, **params):
         """Query a set of resources."""
         m = self.resolve(resource_manager.resource_type)
@@ -87,7 +105,21 @@ class ResourceQuery(object):
             params.update(extra_args)
         return self._invoke_client_enum(
             client, enum_op, params, path,
-            getattr(resource_manager, 'retry', None)) or []
+            getattr(resource_manager, 'retry', None),
+            resource_manager.config.account_id) or []
+
+    def iter_filter(self, resource_manager, **params):
+        """Query a set of resources, yielding pages as they are retrieved."""
+        m = self.resolve(resource_manager.resource_type)
+        client = local_session(self.session_factory).client(
+            m.service, resource_manager.config.region)
+        enum_op, path, extra_args = m.enum_spec
+        if extra_args:
+            params.update(extra_args)
+        return self._iter_client_enum(
+            client, enum_op, params, path,
+            getattr(resource_manager, 'retry', None),
+            resource_manager.config.account_id)
 
     def get(self, resource_manager, identities):
         """Get resources by identities
@@ -160,7 +192,8 @@ class ChildResourceQuery(ResourceQuery):
         for parent_id in parent_ids:
             merged_params = self.get_parent_parameters(params, parent_id, parent_key)
             subset = self._invoke_client_enum(
-                client, enum_op, merged_params, path, retry=self.manager.retry)
+                client, enum_op, merged_params, path, retry=self.manager.retry,
+                account_id=self.manager.config.account_id)
             if annotate_parent:
                 for r in subset:
                     r[self.parent_key] = parent_id
@@ -229,6 +262,17 @@ class DescribeSource(object):
     def resources(self, query):
         return self.query.filter(self.manager, **query)
 
+    def iter_resources(self, query):
+        """Iterate over pages of resources.
+
+        Sources and queries with customized enumeration return their
+        resources as a single page.
+        """
+        if (overrides(self, DescribeSource, 'resources') or
+                overrides(self.query, ResourceQuery, 'filter')):
+            return iter((self.resources(query),))
+        return self.query.iter_filter(self.manager, **query)
+
     def get_query(self):
         return self.resource_query_factory(self.manager.session_factory)
 
@@ -251,6 +295,26 @@ class DescribeSource(object):
                 perms.append("%s:%s" % (prefix, _napi(m.batch_detail_spec[0])))
         return perms
 
+    def get_augment_fields(self):
+        """Augmented resource keys fetched for the policy, None if all of them.
+
+        Detail calls are skipped when the policy only references the
+        resource's id, name and date, where enumeration provides them.
+        """
+        model = self.manager.get_model()
+        detail_spec = (getattr(model, 'detail_spec', None) or
+                       getattr(model, 'batch_detail_spec', None))
+        # without a param key enumeration returns bare ids
+        if not detail_spec or detail_spec[2] is None:
+            return None
+        fields = self.manager.get_resource_fields()
+        if fields is None:
+            return None
+        enum_fields = (model.id, model.name, getattr(model, 'date', None))
+        if all(f in enum_fields or f.startswith('c7n:') for f in fields):
+            return ()
+        return None
+
     def augment(self, resources):
         model = self.manager.get_model()
         if getattr(model, 'detail_spec', None):
@@ -261,13 +325,20 @@ class DescribeSource(object):
             _augment = _batch_augment
         else:
             return resources
+        if self.get_augment_fields() is not None:
+            return resources
+        limiter = AdaptiveConcurrency(
+            getattr(self.manager.retry, 'codes', ()),
+            initial=self.manager.max_workers,
+            maximum=self.manager.max_augment_workers)
         _augment = functools.partial(
-            _augment, self.manager, model, detail_spec)
+            _augment, self.manager, model, detail_spec, limiter=limiter)
         with self.manager.executor_factory(
-                max_workers=self.manager.max_workers) as w:
+                max_workers=limiter.maximum) as w:
             results = list(w.map(
                 _augment, chunks(resources, self.manager.chunk_size)))
-            return list(itertools.chain(*results))
+        self.manager.ctx.record_augment_stats(model.service, limiter.get_stats())
+        return list(itertools.chain(*results))
 
 
 @sources.register('describe-child')
@@ -359,7 +430,8 @@ class ConfigSource(object):
             {'input_token': 'NextToken', 'output_token': 'NextToken',
              'result_key': 'Results'},
             client.meta.service_model.operation_model('SelectResourceConfig'))
-        pager.PAGE_ITERATOR_CLS = RetryPageIterator
+        pager.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(
+            self.manager.config.account_id)
 
         results = []
         for page in pager.paginate(Expression=query['expr']):
@@ -379,6 +451,9 @@ class QueryResourceManager(ResourceManager):
     # TODO Check if we can move to describe source
     max_workers = 3
     chunk_size = 20
+    # augment api call concurrency adapts between max_workers and this
+    # limit based on observed throttling.
+    max_augment_workers = 12
 
     permissions = ()
 
@@ -432,19 +507,55 @@ class QueryResourceManager(ResourceManager):
         return perms
 
     def get_cache_key(self, query):
-        return {
+        key = {
             'account': self.account_id,
             'region': self.config.region,
             'resource': str(self.__class__.__name__),
             'source': self.source_type,
             'q': query
         }
+        # partially augmented resources are cached apart from full ones
+        fields = getattr(self.source, 'get_augment_fields', lambda: None)()
+        if fields is not None:
+            key['fields'] = sorted(fields)
+        return key
+
+    @property
+    def stream(self):
+        """Whether to stream resources through augment and filters in pages.
+
+        Streaming bounds memory to a page of resources plus the matched
+        set, at the cost of bypassing the resource cache and snapshot.
+        Filters that need the full resource population disable it.
+        """
+        return getattr(self.config, 'stream', False) and not any(
+            f.full_set for f in self.filters)
 
     def resources(self, query=None):
         query = self.source.get_query_params(query)
-        cache_key = self.get_cache_key(query)
-        resources = None
 
+        if self.stream:
+            resources, resource_count = self._stream_resources(query)
+        else:
+            cache_key = self.get_cache_key(query)
+            snapshot = cache.get_snapshot()
+            if snapshot is not None:
+                resources = snapshot.get(
+                    cache_key, functools.partial(self._fetch_resources, query, cache_key))
+            else:
+                resources = self._fetch_resources(query, cache_key)
+
+            resource_count = len(resources)
+            with self.ctx.tracer.subsegment('filter'):
+                resources = self.filter_resources(resources)
+
+        # Check if we're out of a policies execution limits.
+        if self.data == self.ctx.policy.data:
+            self.check_resource_limit(len(resources), resource_count)
+        return resources
+
+    def _fetch_resources(self, query, cache_key):
+        resources = None
         if self._cache.load():
             resources = self._cache.get(cache_key)
             if resources is not None:
@@ -461,16 +572,36 @@ class QueryResourceManager(ResourceManager):
             with self.ctx.tracer.subsegment('resource-augment'):
                 resources = self.augment(resources)
             self._cache.save(cache_key, resources)
-
-        resource_count = len(resources)
-        with self.ctx.tracer.subsegment('filter'):
-            resources = self.filter_resources(resources)
-
-        # Check if we're out of a policies execution limits.
-        if self.data == self.ctx.policy.data:
-            self.check_resource_limit(len(resources), resource_count)
+        self.ctx.record_cache_stats(self._cache.take_stats())
         return resources
 
+    def _stream_resources(self, query):
+        resource_count = 0
+        results = []
+        for resources in self.iter_resources(query):
+            resource_count += len(resources)
+            with self.ctx.tracer.subsegment('filter'):
+                results.extend(self.filter_resources(resources))
+        return results, resource_count
+
+    def iter_resources(self, query=None):
+        """Iterate over pages of augmented, unfiltered resources."""
+        if query is None:
+            query = {}
+        source_iter = getattr(self.source, 'iter_resources', None)
+        if source_iter is None:
+            pages = iter((self.source.resources(query),))
+        else:
+            pages = source_iter(query)
+        while True:
+            with self.ctx.tracer.subsegment('resource-fetch'):
+                resources = next(pages, None)
+            if resources is None:
+                break
+            with self.ctx.tracer.subsegment('resource-augment'):
+                resources = self.augment(resources)
+            yield resources
+
     def check_resource_limit(self, selection_count, population_count):
         """Check if policy's execution affects more resources then its limit.
 
@@ -485,6 +616,7 @@ class QueryResourceManager(ResourceManager):
         key = self.get_cache_key(None)
         if self._cache.load():
             resources = self._cache.get(key)
+            self.ctx.record_cache_stats(self._cache.take_stats())
             if resources is not None:
                 self.log.debug("Using cached results for get_resources")
                 m = self.get_model()
@@ -493,19 +625,50 @@ class QueryResourceManager(ResourceManager):
         return None
 
     def get_resources(self, ids, cache=True, augment=True):
+        # resources fetched by id are fully described
         if cache:
             resources = self._get_cached_resources(ids)
             if resources is not None:
-                return resources
+                return self.resolve_fields(resources, None)
         try:
             resources = self.source.get_resources(ids)
             if augment:
-                resources = self.augment(resources)
+                resources = self.resolve_fields(self.augment(resources), None)
             return resources
         except ClientError as e:
             self.log.warning("event ids not resolved: %s error:%s" % (ids, e))
             return []
 
+    def get_resource_index(self, ids, fetch_threshold=None):
+        """Return a mapping of resource id to resource for the given ids.
+
+        Within a run, once a resource type has been fully fetched its
+        resources are served from an index shared by all policies and
+        filters.
+        """
+        snapshot = cache.get_snapshot()
+        if snapshot is None:
+            return super(QueryResourceManager, self).get_resource_index(
+                ids, fetch_threshold)
+        ids = set(ids)
+        model = self.get_model()
+        cache_key = self.get_cache_key(None)
+        related = snapshot.lookup(cache_key, model.id, ids)
+        if related is None and fetch_threshold is not None and len(
+                ids) >= fetch_threshold:
+            snapshot.get(cache_key, functools.partial(
+                self._fetch_resources, None, cache_key))
+            related = snapshot.lookup(cache_key, model.id, ids)
+        if related is None:
+            return super(QueryResourceManager, self).get_resource_index(ids)
+        return {r[model.id]: r for r in related}
+
+    def resolve_fields(self, resources, fields):
+        resolve = getattr(self.source, 'resolve_fields', None)
+        if resolve is None:
+            return resources
+        return resolve(resources, fields)
+
     def augment(self, resources):
         """subclasses may want to augment resources with additional information.
 
@@ -634,11 +797,15 @@ class ChildResourceManager(QueryResourceManager):
         return self.get_resource_manager(self.resource_type.parent_spec[0])
 
 
-def _batch_augment(manager, model, detail_spec, resource_set):
+def _batch_augment(manager, model, detail_spec, resource_set, limiter=None):
     detail_op, param_name, param_key, detail_path, detail_args = detail_spec
     client = local_session(manager.session_factory).client(
         model.service, region_name=manager.config.region)
-    op = getattr(client, detail_op)
+    op = functools.partial(
+        get_limiter().call, manager.config.account_id,
+        getattr(client, detail_op))
+    if limiter:
+        op = functools.partial(limiter.call, op)
     if manager.retry:
         args = (op,)
         op = manager.retry
@@ -651,11 +818,15 @@ def _batch_augment(manager, model, detail_spec, resource_set):
     return response[detail_path]
 
 
-def _scalar_augment(manager, model, detail_spec, resource_set):
+def _scalar_augment(manager, model, detail_spec, resource_set, limiter=None):
     detail_op, param_name, param_key, detail_path = detail_spec
     client = local_session(manager.session_factory).client(
         model.service, region_name=manager.config.region)
-    op = getattr(client, detail_op)
+    op = functools.partial(
+        get_limiter().call, manager.config.account_id,
+        getattr(client, detail_op))
+    if limiter:
+        op = functools.partial(limiter.call, op)
     if manager.retry:
         args = (op,)
         op = manager.retry
@@ -679,11 +850,25 @@ def _scalar_augment(manager, model, detail_spec, resource_set):
 
 
 class RetryPageIterator(PageIterator):
+    """Page iterator which retries throttled pages.
+
+    Pages are metered by the rate limiter, use :meth:`for_account` so
+    they share the budget of the account's other api calls.
+    """
 
     retry = staticmethod(QueryResourceManager.retry)
 
+    def __init__(self, *args, **kw):
+        self.account_id = kw.pop('account_id', None)
+        super(RetryPageIterator, self).__init__(*args, **kw)
+
+    @classmethod
+    def for_account(cls, account_id):
+        return functools.partial(cls, account_id=account_id)
+
     def _make_request(self, current_kwargs):
-        return self.retry(self._method, **current_kwargs)
+        return self.retry(
+            get_limiter().call, self.account_id, self._method, **current_kwargs)
 
 
 class TypeMeta(type):
@@ -0,0 +1,276 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Client side api rate limiting.
+
+Retries on throttling errors are reactive, when many threads or
+processes (ie. c7n-org workers) share an account's api limits they
+burst, get throttled, and back off together. The rate limiter instead
+meters calls through token buckets keyed by (account, region, service,
+operation), so callers wait before making a call rather than after
+being throttled.
+
+Budgets are configured via the ``C7N_RATE_LIMITS`` environment
+variable as a comma separated list of ``selector=rate[:burst]`` where
+rate is in calls per second and the selector is one of
+``service.Operation``, ``service`` or ``*``, ie::
+
+  C7N_RATE_LIMITS="ec2=20,ec2.DescribeInstances=5:10,*=50"
+
+The most specific selector wins, and calls for a selector share its
+bucket, ie. a service budget is shared across all of the service's
+operations, while a ``*`` budget applies to each service separately.
+Budgets are metered per account and region, where the account isn't
+known to the caller the client's credentials identify it. By default
+no budgets are configured and calls are not metered.
+
+Buckets are shared by all threads in a process, to share them across
+processes set ``C7N_RATE_LIMIT_STORE`` to a local directory where
+bucket state will be kept in lock protected files.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+log = logging.getLogger('custodian.ratelimit')
+
+
+def parse_budgets(value):
+    """Parse a rate limit budget specification.
+
+    Returns a mapping of selector to (rate, burst).
+    """
+    budgets = {}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        selector, _, rate = entry.partition('=')
+        rate, _, burst = rate.partition(':')
+        try:
+            rate = float(rate)
+            burst = burst and float(burst) or max(1.0, rate)
+        except ValueError:
+            raise ValueError("Invalid rate limit budget %r" % entry)
+        if rate <= 0:
+            raise ValueError("Invalid rate limit budget %r" % entry)
+        budgets[selector.strip()] = (rate, burst)
+    return budgets
+
+
+class TokenBucket(object):
+    """A thread safe token bucket refilled at `rate` tokens per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available.
+
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0
+        while True:
+            with self.lock:
+                delay = self._take(self._refill(self.tokens, self.updated))
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def _refill(self, tokens, updated):
+        self.updated = time.time()
+        return min(
+            self.burst, tokens + (self.updated - updated) * self.rate)
+
+    def _take(self, tokens):
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            return 0
+        self.tokens = tokens
+        return (1 - tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """A token bucket whose state is shared across processes via a file."""
+
+    def __init__(self, path, rate, burst):
+        super(FileTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+    def acquire(self):
+        waited = 0
+        while True:
+            with self.lock:
+                delay = self._acquire_file()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def _acquire_file(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.read(fd, 1024)
+            try:
+                tokens, updated = json.loads(data.decode('utf8'))
+            except ValueError:
+                tokens, updated = self.burst, time.time()
+            delay = self._take(self._refill(tokens, updated))
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(
+                [self.tokens, self.updated]).encode('utf8'))
+            return delay
+        finally:
+            os.close(fd)
+
+
+def get_client_account(client):
+    """Identify the account of a client by its credentials."""
+    credentials = getattr(
+        getattr(client, '_request_signer', None), '_credentials', None)
+    return credentials and credentials.access_key or None
+
+
+class RateLimiter(object):
+    """Meter api calls through token buckets by configured budget."""
+
+    def __init__(self, budgets=None, store=None):
+        self.budgets = budgets or {}
+        self.store = store
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'waits': 0, 'wait_time': 0.0}
+
+    def get_budget(self, service, operation):
+        """Resolve the most specific budget for an operation.
+
+        Returns a tuple of (selector, (rate, burst)) or None.
+        """
+        for selector in ("%s.%s" % (service, operation), service, '*'):
+            if selector in self.budgets:
+                return selector, self.budgets[selector]
+
+    def get_bucket(self, account, region, service, operation):
+        budget = self.get_budget(service, operation)
+        if budget is None:
+            return
+        selector, (rate, burst) = budget
+        if selector == '*':
+            selector = service
+        key = (account, region, selector)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = self._new_bucket(key, rate, burst)
+        return bucket
+
+    def _new_bucket(self, key, rate, burst):
+        if self.store and fcntl is not None:
+            if not os.path.isdir(self.store):
+                os.makedirs(self.store)
+            name = hashlib.sha1(json.dumps(key).encode('utf8')).hexdigest()
+            return FileTokenBucket(
+                os.path.join(self.store, name), rate, burst)
+        return TokenBucket(rate, burst)
+
+    def acquire(self, account, region, service, operation):
+        """Wait for the budget of the given operation to allow a call."""
+        bucket = self.get_bucket(account, region, service, operation)
+        if bucket is None:
+            return 0
+        waited = bucket.acquire()
+        with self.lock:
+            self.stats['calls'] += 1
+            if waited:
+                self.stats['waits'] += 1
+                self.stats['wait_time'] += waited
+        return waited
+
+    def call(self, account, method, *args, **kw):
+        """Invoke a boto client method within its rate limit budget."""
+        if self.budgets:
+            client = method.__self__
+            self.acquire(
+                account or get_client_account(client), client.meta.region_name,
+                client.meta.service_model.service_name,
+                client.meta.method_to_api_mapping.get(
+                    method.__name__, method.__name__))
+        return method(*args, **kw)
+
+    def wrap(self, client, account=None):
+        """Return a client whose api calls are rate limited."""
+        if not self.budgets:
+            return client
+        return RateLimitedClient(self, client, account)
+
+
+class RateLimitedClient(object):
+    """Proxy a boto client, metering its api operations."""
+
+    def __init__(self, limiter, client, account):
+        self._limiter = limiter
+        self._client = client
+        self._account = account
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._client.meta.method_to_api_mapping:
+            return attr
+
+        def limited(*args, **kw):
+            return self._limiter.call(self._account, attr, *args, **kw)
+        limited.__name__ = str(name)
+        return limited
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process wide rate limiter, configured from the environment.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                store = os.environ.get('C7N_RATE_LIMIT_STORE')
+                if store and fcntl is None:
+                    log.warning(
+                        "cross process rate limits not supported on platform")
+                _limiter = RateLimiter(
+                    parse_budgets(os.environ.get('C7N_RATE_LIMITS')), store)
+    return _limiter
+
+
+def reset_limiter():
+    global _limiter
+    _limiter = None
@@ -49,6 +49,10 @@ class PluginRegistry(object):
     EVENT_FINAL = 1
     EVENTS = (EVENT_REGISTER, EVENT_FINAL)
 
+    # Incremented on any change to any registry, for caches of
+    # registry derived data (ie. the policy schema).
+    generation = 0
+
     def __init__(self, plugin_type):
         self.plugin_type = plugin_type
         self._factories = {}
@@ -86,8 +90,10 @@ class PluginRegistry(object):
     def unregister(self, name):
         if name in self._factories:
             del self._factories[name]
+            PluginRegistry.generation += 1
 
     def notify(self, key=None):
+        PluginRegistry.generation += 1
         for subscriber in self._subscribers:
             subscriber(self, key)
 
@@ -44,9 +44,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from concurrent.futures import as_completed
 
 from datetime import datetime
-import gzip
 import io
-import json
 import jmespath
 import logging
 import os
@@ -57,6 +55,7 @@ from botocore.compat import OrderedDict
 from dateutil.parser import parse as date_parse
 
 from c7n.executor import ThreadPoolExecutor
+from c7n.output import gzip_text, iter_resources, open_resources
 from c7n.utils import local_session, dumps
 from c7n.utils import UnicodeWriter
 
@@ -88,13 +87,14 @@ def report(policies, start_date, options, output_fh, raw_output_fh=None):
         else:
             policy_records = fs_record_set(policy.ctx.log_dir, policy.name)
 
-        log.debug("Found %d records for region %s", len(policy_records), policy.options.region)
-
+        count = len(records)
         for record in policy_records:
             record['policy'] = policy.name
             record['region'] = policy.options.region
+            records.append(record)
 
-        records += policy_records
+        log.debug("Found %d records for region %s",
+                  len(records) - count, policy.options.region)
 
     rows = formatter.to_csv(records)
 
@@ -221,18 +221,15 @@ class Formatter(object):
 
 
 def fs_record_set(output_path, policy_name):
-    record_path = os.path.join(output_path, 'resources.json')
-
-    if not os.path.exists(record_path):
-        return []
+    fh = open_resources(os.path.join(output_path, 'resources.json'))
+    if fh is None:
+        return
 
-    mdate = datetime.fromtimestamp(
-        os.stat(record_path).st_ctime)
-
-    with open(record_path) as fh:
-        records = json.load(fh)
-        [r.__setitem__('CustodianDate', mdate) for r in records]
-        return records
+    mdate = datetime.fromtimestamp(os.fstat(fh.fileno()).st_ctime)
+    with fh:
+        for r in iter_resources(fh):
+            r['CustodianDate'] = mdate
+            yield r
 
 
 def record_set(session_factory, bucket, key_prefix, start_date, specify_hour=False):
@@ -279,19 +276,18 @@ def record_set(session_factory, bucket, key_prefix, start_date, specify_hour=Fal
 
 
 def get_records(bucket, key, session_factory):
-    # we're doing a lot of this in memory, worst case
-    # though we're talking about a 10k objects, else
-    # we should spool to temp files
-
     # key ends with 'YYYY/mm/dd/HH/resources.json.gz'
     # so take the date parts only
     date_str = '-'.join(key['Key'].rsplit('/', 5)[-5:-1])
     custodian_date = date_parse(date_str)
     s3 = local_session(session_factory).client('s3')
     result = s3.get_object(Bucket=bucket, Key=key['Key'])
-    blob = io.BytesIO(result['Body'].read())
+    body = result['Body']
+    if six.PY2:
+        # py2 gzip needs a seekable file object
+        body = io.BytesIO(body.read())
 
-    records = json.load(gzip.GzipFile(fileobj=blob))
+    records = list(iter_resources(gzip_text(body)))
     log.debug("bucket: %s key: %s records: %d",
               bucket, key['Key'], len(records))
     for r in records:
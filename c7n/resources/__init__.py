@@ -17,12 +17,33 @@
 #
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import importlib
+
 from c7n.provider import clouds
+from c7n.structure import StructureParser
 
 LOADED = set()
 
-
-def load_resources(resource_types=('*',)):
+# Modules registering filters, actions and modes across all of a
+# provider's resources, by the element types they register. These are
+# only imported when a loaded policy references one of their elements.
+ElementMap = {
+    'aws': {
+        'c7n.resources.securityhub': frozenset((
+            'finding', 'post-finding', 'hub-action', 'hub-finding')),
+        'c7n.resources.sfn': frozenset(('invoke-sfn',)),
+        # send-command is registered on ec2 as well as on managed instances
+        'c7n.resources.ssm': frozenset(('ops-item', 'post-item', 'send-command')),
+    }
+}
+
+
+def load_resources(resource_types=('*',), element_types=None):
+    """Load the given resource types and their providers.
+
+    Cross resource elements are loaded for the providers, either all
+    of them or, if element_types is given, only those referenced.
+    """
     pmap = {}
     for r in resource_types:
         parts = r.split('.', 1)
@@ -32,6 +53,10 @@ def load_resources(resource_types=('*',)):
         pmap.setdefault(parts[0], []).append(r)
 
     load_providers(set(pmap))
+    for pname in ElementMap:
+        ptypes = pmap.get(pname, pmap.get('*'))
+        if ptypes is not None:
+            load_elements(pname, None if '*' in ptypes else element_types)
     missing = []
     for pname, p in clouds.items():
         if '*' in pmap:
@@ -42,6 +67,28 @@ def load_resources(resource_types=('*',)):
     return missing
 
 
+def load_policy_resources(data):
+    """Load only the resources and elements referenced by policy data.
+
+    Like load_available() this skips resources of uninstalled providers.
+    """
+    structure = StructureParser()
+    rtypes = []
+    for r in structure.get_resource_types(data):
+        try:
+            load_providers((r.split('.', 1)[0],))
+        except ImportError:
+            continue
+        rtypes.append(r)
+    return load_resources(rtypes, structure.get_element_types(data))
+
+
+def load_elements(provider_name, element_types=None):
+    for module, elements in ElementMap.get(provider_name, {}).items():
+        if element_types is None or elements.intersection(element_types):
+            importlib.import_module(module)
+
+
 def should_load_provider(name, provider_types):
     global LOADED
     if (name not in LOADED and
@@ -71,12 +118,8 @@ def load_available():
 def load_providers(provider_types):
     global LOADED
 
-    # Even though we're lazy loading resources we still need to import
-    # those that are making available generic filters/actions
     if should_load_provider('aws', provider_types):
-        import c7n.resources.securityhub
-        import c7n.resources.sfn
-        import c7n.resources.ssm # NOQA
+        import c7n.resources.aws # NOQA
 
     if should_load_provider('azure', provider_types):
         from c7n_azure.entry import initialize_azure
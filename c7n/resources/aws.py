@@ -14,10 +14,13 @@
 
 from c7n.provider import clouds, Provider
 
+import bisect
 from collections import Counter, namedtuple
 import contextlib
 import copy
 import datetime
+import gzip
+import io
 import itertools
 import logging
 import os
@@ -25,6 +28,7 @@ import operator
 import shutil
 import sys
 import tempfile
+import threading
 import time
 import traceback
 
@@ -54,6 +58,7 @@ from c7n.output import (
     DeltaStats,
     DirectoryOutput,
     LogOutput,
+    write_resources,
 )
 
 from c7n.registry import PluginRegistry
@@ -394,12 +399,88 @@ class XrayTracer(object):
         self.metadata.clear()
 
 
+# Upper bounds in seconds of the api call latency histogram buckets.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+THROTTLE_ERRORS = frozenset((
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'Throttled',
+    'RequestLimitExceeded',
+    'Client.RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'SlowDown'))
+
+# Request parameters that mark a call as fetching a subsequent page.
+PAGE_TOKENS = (
+    'NextToken', 'nextToken', 'Marker', 'NextMarker', 'ContinuationToken',
+    'KeyMarker', 'StartingToken', 'PaginationToken', 'ExclusiveStartKey')
+
+
+class OperationStats(object):
+    """Api call statistics for a single service operation."""
+
+    __slots__ = (
+        'calls', 'errors', 'throttles', 'retries', 'pages', 'bytes',
+        'latency', 'max_latency', 'histogram')
+
+    def __init__(self):
+        self.calls = self.errors = self.throttles = 0
+        self.retries = self.pages = self.bytes = 0
+        self.latency = self.max_latency = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, latency, nbytes, retries, page, error_code):
+        self.calls += 1
+        self.bytes += nbytes
+        self.retries += retries
+        self.pages += page and 1 or 0
+        if error_code:
+            self.errors += 1
+            if error_code in THROTTLE_ERRORS:
+                self.throttles += 1
+        if latency is not None:
+            self.latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def get_metadata(self):
+        histogram = {}
+        for bound, count in zip(LATENCY_BUCKETS + ('inf',), self.histogram):
+            if count:
+                histogram['le_%s' % bound] = count
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'throttles': self.throttles,
+            'retries': self.retries,
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'latency': {
+                'total': round(self.latency, 4),
+                'max': round(self.max_latency, 4),
+                'histogram': histogram}}
+
+
 @api_stats_outputs.register('aws')
 class ApiStats(DeltaStats):
+    """Record api calls per operation via botocore event hooks.
+
+    Beyond call counts, per operation latency histograms, response
+    sizes, continuation page counts, sdk retry attempts and throttling
+    errors are recorded, and reported in execution metadata as
+    `api-ops`. Throttles from retries via `get_retry` show up as
+    additional calls with throttling errors.
+    """
 
     def __init__(self, ctx, config=None):
         super(ApiStats, self).__init__(ctx, config)
         self.api_calls = Counter()
+        self.operations = {}
+        self.lock = threading.Lock()
 
     def get_snapshot(self):
         return dict(self.api_calls)
@@ -407,6 +488,10 @@ class ApiStats(DeltaStats):
     def get_metadata(self):
         return self.get_snapshot()
 
+    def get_operation_stats(self):
+        with self.lock:
+            return {k: v.get_metadata() for k, v in self.operations.items()}
+
     def __enter__(self):
         if isinstance(self.ctx.session_factory, credentials.SessionFactory):
             self.ctx.session_factory.set_subscribers((self,))
@@ -418,20 +503,122 @@ class ApiStats(DeltaStats):
 
         # With cached sessions, we need to unregister any events subscribers
         # on extant sessions to allow for the next registration.
-        utils.local_session(self.ctx.session_factory).events.unregister(
+        events = utils.local_session(self.ctx.session_factory).events
+        events.unregister(
+            'before-parameter-build.*.*', self._record_start, unique_id='c7n-api-stats-start')
+        events.unregister(
             'after-call.*.*', self._record, unique_id='c7n-api-stats')
 
         self.ctx.metrics.put_metric(
             "ApiCalls", sum(self.api_calls.values()), "Count")
+        with self.lock:
+            ops = list(self.operations.values())
+        if ops:
+            self.ctx.metrics.put_metric(
+                "ApiLatency", sum(o.latency for o in ops), "Seconds")
+            self.ctx.metrics.put_metric(
+                "ApiRetries", sum(o.retries for o in ops), "Count")
+            self.ctx.metrics.put_metric(
+                "ApiThrottles", sum(o.throttles for o in ops), "Count")
+            self.ctx.metrics.put_metric(
+                "ApiResponseSize", sum(o.bytes for o in ops), "Bytes")
         self.pop_snapshot()
 
     def __call__(self, s):
+        s.events.register(
+            'before-parameter-build.*.*', self._record_start, unique_id='c7n-api-stats-start')
         s.events.register(
             'after-call.*.*', self._record, unique_id='c7n-api-stats')
 
-    def _record(self, http_response, parsed, model, **kwargs):
-        self.api_calls["%s.%s" % (
-            model.service_model.endpoint_prefix, model.name)] += 1
+    def _record_start(self, model, params, context, **kwargs):
+        context['c7n-api-start'] = time.time()
+        context['c7n-api-page'] = any(params.get(t) for t in PAGE_TOKENS)
+
+    def _record(self, http_response, parsed, model, context=None, **kwargs):
+        context = context or {}
+        op = "%s.%s" % (model.service_model.endpoint_prefix, model.name)
+        start = context.get('c7n-api-start')
+        latency = None if start is None else time.time() - start
+        # don't consume streaming bodies, their content is left to callers.
+        if model.has_streaming_output:
+            headers = getattr(http_response, 'headers', None) or {}
+            nbytes = int(headers.get('content-length') or 0)
+        else:
+            nbytes = len(getattr(http_response, 'content', None) or b'')
+        error_code = parsed.get('Error', {}).get('Code')
+        retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        with self.lock:
+            self.api_calls[op] += 1
+            stats = self.operations.get(op)
+            if stats is None:
+                stats = self.operations[op] = OperationStats()
+            stats.record(
+                latency, nbytes, retries, context.get('c7n-api-page'), error_code)
+        if start is not None:
+            record_span = getattr(getattr(self.ctx, 'tracer', None), 'record_span', None)
+            if record_span is not None:
+                record_span("api:%s" % op, start, start + latency, error=error_code)
+
+
+class S3MultipartWriter(object):
+    """A write only file object which uploads to s3 as it's written.
+
+    Writes are buffered into parts which are sent via multipart upload,
+    an object smaller than a single part is sent with one put.
+    """
+
+    part_size = 8 * 1024 * 1024
+
+    def __init__(self, client, bucket, key, **params):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.params = params
+        self.buf = io.BytesIO()
+        self.upload_id = None
+        self.parts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
+        if exc_type is None:
+            self.close()
+        elif self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+    def write(self, data):
+        self.buf.write(data)
+        if self.buf.tell() >= self.part_size:
+            self.upload_part()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.params)['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=self.buf.getvalue())
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buf = io.BytesIO()
+
+    def close(self):
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=self.buf.getvalue(),
+                **self.params)
+            return
+        if self.buf.tell():
+            self.upload_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts})
 
 
 @blob_outputs.register('s3')
@@ -486,6 +673,26 @@ class S3Output(DirectoryOutput):
         shutil.rmtree(self.root_dir)
         log.debug("Policy Logs uploaded")
 
+    def write_resources(self, resources):
+        # Stream compressed resources straight to the bucket rather than
+        # spooling them to disk for upload on exit. Resources are written
+        # before actions run, so an upload error shouldn't fail the policy,
+        # fall back to spooling them instead.
+        client = self.ctx.session_factory(assume=False).client('s3')
+        key = self.join(self.key_prefix, 'resources.json.gz')
+        try:
+            with S3MultipartWriter(
+                    client, self.bucket, key,
+                    ACL='bucket-owner-full-control',
+                    ServerSideEncryption='AES256') as fh:
+                with gzip.GzipFile(fileobj=fh, mode='wb', compresslevel=7) as zfh:
+                    write_resources(zfh, resources)
+        except Exception as e:
+            log.warning(
+                "Error uploading resources to s3://%s/%s, spooling for upload on exit: %s",
+                self.bucket, key, e)
+            super(S3Output, self).write_resources(resources)
+
     def upload(self):
         for root, dirs, files in os.walk(self.root_dir):
             for f in files:
@@ -475,7 +475,7 @@ class LambdaLayerVersion(query.QueryResourceManager):
 
         versions = []
         for layer_name in layer_names:
-            pager = get_layer_version_paginator(client)
+            pager = get_layer_version_paginator(client, self.config.account_id)
             for v in pager.paginate(
                     LayerName=layer_name).build_full_result().get('LayerVersions'):
                 v['LayerName'] = layer_name
@@ -483,14 +483,14 @@ class LambdaLayerVersion(query.QueryResourceManager):
         return versions
 
 
-def get_layer_version_paginator(client):
+def get_layer_version_paginator(client, account_id=None):
     pager = Paginator(
         client.list_layer_versions,
         {'input_token': 'NextToken',
          'output_token': 'NextToken',
          'result_key': 'LayerVersions'},
         client.meta.service_model.operation_model('ListLayerVersions'))
-    pager.PAGE_ITERATOR_CLS = query.RetryPageIterator
+    pager.PAGE_ITERATOR_CLS = query.RetryPageIterator.for_account(account_id)
     return pager
 
 
@@ -184,7 +184,8 @@ class GrantCount(Filter):
 
     def process_key(self, client, key):
         p = client.get_paginator('list_grants')
-        p.PAGE_ITERATOR_CLS = RetryPageIterator
+        p.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(
+            self.manager.config.account_id)
         grant_count = 0
         for rp in p.paginate(KeyId=key['TargetKeyId']):
             grant_count += len(rp['Grants'])
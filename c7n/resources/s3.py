@@ -40,16 +40,24 @@ Actions:
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import copy
+import csv
+import fnmatch
 import functools
+import gzip
+import io
 import json
 import itertools
 import logging
 import math
 import os
+import string
+import tempfile
+import threading
 import time
 import ssl
 
 import six
+from six.moves.urllib.parse import unquote_plus
 
 from botocore.client import Config
 from botocore.exceptions import ClientError
@@ -88,6 +96,14 @@ actions.register('put-metric', PutMetric)
 
 MAX_COPY_SIZE = 1024 * 1024 * 1024 * 2
 
+# Candidate character sets for range partitioning a flat key space,
+# in order of preference.
+PARTITION_CHARSETS = (
+    string.digits,
+    string.hexdigits.lower(),
+    string.ascii_lowercase + string.digits,
+    string.ascii_letters + string.digits)
+
 
 @resources.register('s3')
 class S3(query.QueryResourceManager):
@@ -125,11 +141,34 @@ class S3(query.QueryResourceManager):
 
 class DescribeS3(query.DescribeSource):
 
+    def get_augment_fields(self):
+        """Augmented bucket keys the policy reads, None if all of them.
+
+        The bucket location is always fetched, as api calls for the
+        bucket need to be made in its region.
+        """
+        fields = self.manager.get_resource_fields()
+        if fields is None or S3_AUGMENT_KEYS.issubset(fields):
+            return None
+        return S3_AUGMENT_KEYS.intersection(fields).union(('Location',))
+
     def augment(self, buckets):
+        return self.assemble(buckets, self.get_augment_fields())
+
+    def resolve_fields(self, buckets, fields):
+        if self.get_augment_fields() is None:
+            return buckets
+        fields = S3_AUGMENT_KEYS if fields is None else S3_AUGMENT_KEYS.intersection(fields)
+        missing = [b for b in buckets if get_missing_keys(b, fields)]
+        if missing:
+            self.assemble(missing, fields)
+        return buckets
+
+    def assemble(self, buckets, fields=None):
         with self.manager.executor_factory(
                 max_workers=min((10, len(buckets) + 1))) as w:
             results = w.map(
-                assemble_bucket,
+                functools.partial(assemble_bucket, fields=fields),
                 zip(itertools.repeat(self.manager.session_factory), buckets))
             results = list(filter(None, results))
             return results
@@ -421,18 +460,34 @@ S3_AUGMENT_TABLE = (
     #        ('get_bucket_cors', 'Cors'),
 )
 
+S3_AUGMENT_KEYS = frozenset(m[1] for m in S3_AUGMENT_TABLE)
 
-def assemble_bucket(item):
+
+def get_missing_keys(b, keys):
+    """Augmented keys not yet fetched for a bucket, ignoring denied calls."""
+    denied = b.get('c7n:DeniedMethods', ())
+    return [m for m in S3_AUGMENT_TABLE
+            if m[1] in keys and m[1] not in b and m[0] not in denied]
+
+
+def assemble_bucket(item, fields=None):
     """Assemble a document representing all the config state around a bucket.
 
+    Only the keys in fields, along with the bucket location, are fetched
+    if given, and keys already present on the bucket are left as is.
+
     TODO: Refactor this, the logic here feels quite muddled.
     """
     factory, b = item
-    s = factory()
-    c = s.client('s3')
+    s = local_session(factory)
     # Bucket Location, Current Client Location, Default Location
     b_location = c_location = location = "us-east-1"
-    methods = list(S3_AUGMENT_TABLE)
+    if 'Location' in b:
+        c = bucket_client(s, b)
+    else:
+        c = s.client('s3')
+    methods = get_missing_keys(
+        b, S3_AUGMENT_KEYS if fields is None else set(fields).union(('Location',)))
     for minfo in methods:
         m, k, default, select = minfo[:4]
         try:
@@ -572,6 +627,8 @@ class S3Metrics(MetricsFilter):
     mismatch, and additional required dimension.
     """
 
+    resource_fields = ()
+
     def get_dimensions(self, resource):
         dims = [{'Name': 'BucketName', 'Value': resource['Name']}]
         if (self.data['name'] == 'NumberOfObjects' and
@@ -596,6 +653,7 @@ class S3CrossAccountFilter(CrossAccountAccessFilter):
                 filters:
                   - type: cross-account
     """
+    resource_fields = ('Policy',)
     permissions = ('s3:GetBucketPolicy',)
 
     def get_accounts(self):
@@ -689,6 +747,7 @@ class GlobalGrantsFilter(Filter):
 
     """
 
+    resource_fields = ('Acl', 'Website')
     schema = type_schema(
         'global-grants',
         allow_website={'type': 'boolean'},
@@ -813,6 +872,7 @@ class HasStatementFilter(BucketFilterBase):
                         Action: 's3:*'
                         Principal: '*'
     """
+    resource_fields = ('Policy',)
     schema = type_schema(
         'has-statement',
         statement_ids={'type': 'array', 'items': {'type': 'string'}},
@@ -898,6 +958,7 @@ class EncryptionEnabledFilter(Filter):
                 filters:
                   - type: no-encryption-statement
     """
+    resource_fields = ('Policy',)
     schema = type_schema(
         'no-encryption-statement')
 
@@ -949,6 +1010,7 @@ class MissingPolicyStatementFilter(Filter):
                       - RequiredEncryptedPutObject
     """
 
+    resource_fields = ('Policy',)
     schema = type_schema(
         'missing-policy-statement',
         aliases=('missing-statement',),
@@ -993,6 +1055,7 @@ class BucketNotificationFilter(ValueFilter):
                     statement_ids: matched
     """
 
+    resource_fields = ('Notification',)
     schema = type_schema(
         'bucket-notification',
         required=['kind'],
@@ -1059,6 +1122,7 @@ class BucketLoggingFilter(Filter):
                     target_prefix: "{account}/{source_bucket_name}/"
     """
 
+    resource_fields = ('Logging',)
     schema = type_schema(
         'bucket-logging',
         op={'enum': ['enabled', 'disabled', 'equal', 'not-equal', 'eq', 'ne']},
@@ -1117,6 +1181,7 @@ class BucketLoggingFilter(Filter):
 class DeleteBucketNotification(BucketActionBase):
     """Action to delete S3 bucket notification configurations"""
 
+    resource_fields = ('Notification',)
     schema = type_schema(
         'delete-bucket-notification',
         required=['statement_ids'],
@@ -1153,6 +1218,7 @@ class DeleteBucketNotification(BucketActionBase):
 @actions.register('no-op')
 class NoOp(BucketActionBase):
 
+    resource_fields = ()
     schema = type_schema('no-op')
     permissions = ('s3:ListAllMyBuckets',)
 
@@ -1185,6 +1251,7 @@ class SetPolicyStatement(BucketActionBase):
                             "aws:SecureTransport": false
     """
 
+    resource_fields = ('Policy',)
     permissions = ('s3:PutBucketPolicy',)
 
     schema = type_schema(
@@ -1270,6 +1337,7 @@ class RemovePolicyStatement(RemovePolicyBase):
                       - RequiredEncryptedPutObject
     """
 
+    resource_fields = ('Policy',)
     permissions = ("s3:PutBucketPolicy", "s3:DeleteBucketPolicy")
 
     def process(self, buckets):
@@ -1334,6 +1402,7 @@ class ToggleVersioning(BucketActionBase):
                     enabled: true
     """
 
+    resource_fields = ('Versioning',)
     schema = type_schema(
         'toggle-versioning',
         enabled={'type': 'boolean'})
@@ -1403,6 +1472,7 @@ class ToggleLogging(BucketActionBase):
                     target_bucket: "{account_id}-{region}-s3-logs"
                     target_prefix: "{account}/{source_bucket_name}/"
     """
+    resource_fields = ('Logging',)
     schema = type_schema(
         'toggle-logging',
         enabled={'type': 'boolean'},
@@ -1583,6 +1653,7 @@ class EncryptionRequiredPolicy(BucketActionBase):
                   - encryption-policy
     """
 
+    resource_fields = ('Policy',)
     permissions = ("s3:GetBucketPolicy", "s3:PutBucketPolicy")
     schema = type_schema('encryption-policy')
 
@@ -1660,22 +1731,50 @@ class BucketScanLog(object):
      - [list_of_serialized_keys],
      - [] # Empty list of keys at end when we close the buffer
 
+    Scan progress is checkpointed per key space partition to a sibling
+    file, so an interrupted scan resumes from the last completed page of
+    each partition. The checkpoint is removed when the scan completes,
+    and discarded when it was written with different scan options. A
+    resumed scan logs to the next free ``<name>.<n>.json`` file, so the
+    keys remediated before the interruption are kept.
     """
 
-    def __init__(self, log_dir, name):
+    def __init__(self, log_dir, name, options=None):
         self.log_dir = log_dir
         self.name = name
+        self.options = options
         self.fh = None
         self.count = 0
+        self.partitions = None
+        self.rotation = 0
+        self.lock = threading.Lock()
 
     @property
     def path(self):
+        if self.rotation:
+            return os.path.join(self.log_dir, "%s.%d.json" % (self.name, self.rotation))
         return os.path.join(self.log_dir, "%s.json" % self.name)
 
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.log_dir, "%s.checkpoint.json" % self.name)
+
     def __enter__(self):
         # Don't require output directories
         if self.log_dir is None:
-            return
+            return self
+
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as fh:
+                checkpoint = json.load(fh)
+            if checkpoint.get('options') == self.options:
+                self.partitions = checkpoint['partitions']
+            else:
+                log.info("Discarding scan checkpoint bucket:%s with changed options",
+                         self.name)
+                self.complete()
+            while os.path.exists(self.path):
+                self.rotation += 1
 
         self.fh = open(self.path, 'w')
         self.fh.write("[\n")
@@ -1695,17 +1794,60 @@ class BucketScanLog(object):
         return False
 
     def add(self, keys):
-        self.count += len(keys)
-        if self.fh is None:
-            return
-        self.fh.write(dumps(keys))
-        self.fh.write(",\n")
+        with self.lock:
+            self.count += len(keys)
+            if self.fh is None:
+                return
+            self.fh.write(dumps(keys))
+            self.fh.write(",\n")
+
+    def checkpoint(self, partition, **state):
+        """Update a partition's scan state and persist all partitions."""
+        with self.lock:
+            partition.update(state)
+            if self.log_dir is None:
+                return
+            with open(self.checkpoint_path, 'w') as fh:
+                json.dump({'partitions': self.partitions, 'options': self.options}, fh)
+
+    def complete(self):
+        if self.log_dir is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+def get_key_charset(keys):
+    """Select the smallest known character set covering the keys' first characters.
+    """
+    chars = {k[0] for k in keys if k}
+    for charset in PARTITION_CHARSETS:
+        if chars.issubset(charset):
+            return set(charset)
+    return chars.union(PARTITION_CHARSETS[-1])
 
 
 class ScanBucket(BucketActionBase):
+    """Base class for actions which visit every object in a bucket.
+
+    By default a bucket is listed serially. With ``partition`` the key
+    space is split up, on top level common prefixes for nested key spaces
+    or on character ranges for flat ones, and the partitions are listed in
+    parallel. With ``inventory`` the keys are read from the latest csv
+    delivery of a matching S3 inventory configuration instead of listing
+    the bucket; note an inventory is a point in time snapshot, objects
+    written since its delivery are not visited.
+    """
 
     permissions = ("s3:ListBucket",)
 
+    scan_schema = {
+        'partition': {'type': 'boolean'},
+        'inventory': {
+            'type': 'string',
+            'description': 'Inventory configuration id, glob patterns allowed'}}
+
+    scan_workers = 10
+    partition_workers = 4
+
     bucket_ops = {
         'standard': {
             'iterator': 'list_objects',
@@ -1783,37 +1925,75 @@ class ScanBucket(BucketActionBase):
         s = self.manager.session_factory()
         s3 = bucket_client(s, b)
 
-        # The bulk of _process_bucket function executes inline in
-        # calling thread/worker context, neither paginator nor
-        # bucketscan log should be used across worker boundary.
-        p = s3.get_paginator(
-            self.get_bucket_op(b, 'iterator')).paginate(Bucket=b['Name'])
-
-        with BucketScanLog(self.manager.ctx.log_dir, b['Name']) as key_log:
-            with self.executor_factory(max_workers=10) as w:
+        with BucketScanLog(
+                self.manager.ctx.log_dir, b['Name'], self.get_scan_options()) as key_log:
+            with self.executor_factory(max_workers=self.scan_workers) as w:
                 try:
-                    return self._process_bucket(b, p, key_log, w)
+                    if key_log.partitions is None:
+                        key_log.partitions = self.get_partitions(s3, b)
+                    else:
+                        log.info("Resuming scan bucket:%s from checkpoint", b['Name'])
+                    return self._process_bucket(b, s3, key_log, w)
                 except ClientError as e:
                     if e.response['Error']['Code'] == 'NoSuchBucket':
                         log.warning(
                             "Bucket:%s removed while scanning" % b['Name'])
+                        key_log.complete()
                         return
                     if e.response['Error']['Code'] == 'AccessDenied':
                         log.warning(
                             "Access Denied Bucket:%s while scanning" % b['Name'])
                         self.denied_buckets.add(b['Name'])
+                        key_log.complete()
                         return
                     log.exception(
-                        "Error processing bucket:%s paginator:%s" % (
-                            b['Name'], p))
+                        "Error processing bucket:%s partitions:%s" % (
+                            b['Name'], key_log.partitions))
 
     __call__ = process_bucket
 
-    def _process_bucket(self, b, p, key_log, w):
-        count = 0
+    def get_scan_options(self):
+        """The options determining a bucket's partitions, kept with its checkpoint."""
+        return {k: self.data.get(k) for k in self.scan_schema}
+
+    def _process_bucket(self, b, s3, key_log, w):
+        partitions = key_log.partitions
+        pending = [p for p in partitions if not p.get('complete')]
+
+        # A single partition is listed inline in the calling worker,
+        # multiple ones each get a listing thread feeding the shared
+        # key processing pool.
+        if len(pending) == 1:
+            self.process_partition(b, s3, pending[0], key_log, w)
+        elif pending:
+            with self.executor_factory(max_workers=self.partition_workers) as pw:
+                futures = [
+                    pw.submit(self.process_partition, b, s3, p, key_log, w)
+                    for p in pending]
+                for f in as_completed(futures):
+                    f.result()
+
+        count = sum(p.get('count', 0) for p in partitions)
+        remediated = sum(p.get('remediated', 0) for p in partitions)
+        key_log.complete()
+        log.info('Scan Complete bucket:%s keys:%d remediated:%d',
+                 b['Name'], count, remediated)
 
-        for key_set in p:
-            keys = self.get_keys(b, key_set)
+        b['KeyScanCount'] = count
+        b['KeyRemediated'] = remediated
+        return {
+            'Bucket': b['Name'], 'Remediated': remediated, 'Count': count}
+
+    def process_partition(self, b, s3, partition, key_log, w):
+        count = partition.get('count', 0)
+        remediated = partition.get('remediated', 0)
+
+        if 'inventory' in partition:
+            pages = self.get_inventory_pages(b, partition)
+        else:
+            pages = self.get_partition_pages(s3, b, partition)
+
+        for keys, marker in pages:
             count += len(keys)
             futures = []
 
@@ -1829,20 +2009,185 @@ class ScanBucket(BucketActionBase):
                     continue
                 r = f.result()
                 if r:
+                    remediated += len(r)
                     key_log.add(r)
 
-            # Log completion at info level, progress at debug level
-            if key_set['IsTruncated']:
-                log.debug('Scan progress bucket:%s keys:%d remediated:%d ...',
-                          b['Name'], count, key_log.count)
+            key_log.checkpoint(
+                partition, marker=marker, count=count, remediated=remediated)
+            log.debug('Scan progress bucket:%s keys:%d remediated:%d ...',
+                      b['Name'], count, key_log.count)
+
+        key_log.checkpoint(partition, complete=True)
+
+    def get_partitions(self, s3, b):
+        if self.data.get('inventory'):
+            partitions = self.get_inventory_partitions(b)
+            if partitions is not None:
+                return partitions
+        if self.data.get('partition'):
+            return self.detect_partitions(s3, b)
+        return [{}]
+
+    def detect_partitions(self, s3, b, prefix=''):
+        """Split a bucket key space into partitions for parallel listing.
+
+        Nested key spaces are split on their common prefixes, with the
+        keys at that level as their own partition, a lone common prefix
+        is descended into. Otherwise the key space is split into ranges
+        on the character set of a key sample, ranges are bounded on both
+        ends so every key is in exactly one.
+        """
+        method = getattr(s3, self.get_bucket_op(b, 'iterator'))
+        params = {'Bucket': b['Name'], 'Delimiter': '/'}
+        if prefix:
+            params['Prefix'] = prefix
+        results = method(**params)
+        prefixes = [p['Prefix'] for p in results.get('CommonPrefixes', ())]
+        keys = [k['Key'] for k in self.get_keys(b, results)]
+        scope = prefix and {'prefix': prefix} or {}
+
+        if not results['IsTruncated']:
+            if not prefixes:
+                return [scope]
+            level = dict(scope, delimiter='/')
+            if len(prefixes) == 1:
+                return (keys and [level] or []) + self.detect_partitions(
+                    s3, b, prefixes[0])
+            return [level] + [{'prefix': p} for p in prefixes]
+
+        bounds = [prefix + c for c in sorted(
+            get_key_charset([k[len(prefix):] for k in keys + prefixes]))]
+        partitions = [dict(scope, end=bounds[0])]
+        for start, end in zip(bounds, bounds[1:]):
+            partitions.append(dict(scope, start=start, end=end))
+        partitions.append(dict(scope, start=bounds[-1]))
+        log.info("Partitioned bucket:%s into %d key ranges",
+                 b['Name'], len(partitions))
+        return partitions
+
+    def get_partition_pages(self, s3, b, partition):
+        """Iterate the pages of a listing partition as (keys, marker).
+
+        The marker is the listing position after the page.
+        """
+        versioned = self.get_bucket_style(b) == 'versioned'
+        params = {'Bucket': b['Name']}
+        if partition.get('prefix'):
+            params['Prefix'] = partition['prefix']
+        if partition.get('delimiter'):
+            params['Delimiter'] = partition['delimiter']
+        if partition.get('marker'):
+            params.update(partition['marker'])
+        elif partition.get('start'):
+            params[versioned and 'KeyMarker' or 'Marker'] = partition['start']
+
+        end = partition.get('end')
+        p = s3.get_paginator(
+            self.get_bucket_op(b, 'iterator')).paginate(**params)
+
+        for key_set in p:
+            keys = self.get_keys(b, key_set)
+            if end is not None:
+                bounded = [k for k in keys if k['Key'] <= end]
+                if len(bounded) != len(keys):
+                    yield bounded, None
+                    return
+            if not key_set['IsTruncated']:
+                marker = None
+            elif versioned:
+                marker = {'KeyMarker': key_set['NextKeyMarker'],
+                          'VersionIdMarker': key_set['NextVersionIdMarker']}
             else:
-                log.info('Scan Complete bucket:%s keys:%d remediated:%d',
-                         b['Name'], count, key_log.count)
+                marker = {'Marker': key_set.get(
+                    'NextMarker', key_set['Contents'][-1]['Key'])}
+            yield keys, marker
 
-        b['KeyScanCount'] = count
-        b['KeyRemediated'] = key_log.count
-        return {
-            'Bucket': b['Name'], 'Remediated': key_log.count, 'Count': count}
+    def get_inventory_partitions(self, b):
+        """Partition a bucket on the files of its latest inventory delivery.
+
+        Returns None if the bucket has no matching csv inventory with a
+        delivered manifest.
+        """
+        client = bucket_client(local_session(self.manager.session_factory), b)
+        inventories = [
+            i for i in client.list_bucket_inventory_configurations(
+                Bucket=b['Name']).get('InventoryConfigurationList', ())
+            if fnmatch.fnmatch(i['Id'], self.data['inventory']) and
+            i['Destination']['S3BucketDestination']['Format'] == 'CSV']
+        if not inventories:
+            log.info("bucket:%s no csv inventory matching %s",
+                     b['Name'], self.data['inventory'])
+            return None
+
+        destination = inventories[0]['Destination']['S3BucketDestination']
+        inventory_bucket = destination['Bucket'].rsplit(':', 1)[-1]
+        prefix = "%s/%s/" % (b['Name'], inventories[0]['Id'])
+        if destination.get('Prefix'):
+            prefix = "%s/%s" % (destination['Prefix'].rstrip('/'), prefix)
+
+        # Deliveries are in timestamp named folders
+        # ie. 2020-01-31T00-00Z/manifest.json
+        client = local_session(self.manager.session_factory).client('s3')
+        deliveries = sorted(
+            p['Prefix'] for page in client.get_paginator('list_objects').paginate(
+                Bucket=inventory_bucket, Prefix=prefix, Delimiter='/')
+            for p in page.get('CommonPrefixes', ())
+            if p['Prefix'][len(prefix):len(prefix) + 1].isdigit())
+        if not deliveries:
+            log.info("bucket:%s inventory not delivered yet", b['Name'])
+            return None
+
+        manifest = json.loads(client.get_object(
+            Bucket=inventory_bucket,
+            Key="%s%s" % (deliveries[-1], 'manifest.json'))['Body'].read())
+        schema = [n.strip() for n in manifest['fileSchema'].split(',')]
+        if self.get_bucket_style(b) == 'versioned' and 'VersionId' not in schema:
+            log.warning(
+                "bucket:%s versioned but inventory lacks versions, listing",
+                b['Name'])
+            return None
+
+        log.info("bucket:%s scanning inventory s3://%s/%s files:%d",
+                 b['Name'], inventory_bucket, deliveries[-1],
+                 len(manifest.get('files', ())))
+        return [{'inventory': f['key'], 'bucket': inventory_bucket, 'schema': schema}
+                for f in manifest.get('files', ())]
+
+    def get_inventory_pages(self, b, partition):
+        """Iterate the keys of an inventory file as (keys, marker).
+
+        The marker is the count of inventory rows consumed.
+        """
+        client = local_session(self.manager.session_factory).client('s3')
+        schema = {n: idx for idx, n in enumerate(partition['schema'])}
+        versioned = self.get_bucket_style(b) == 'versioned'
+        delete_markers = 'DeleteMarkers' in self.get_bucket_op(b, 'contents_key')
+        offset = partition.get('marker') or 0
+
+        with tempfile.TemporaryFile() as fh:
+            client.download_fileobj(
+                Bucket=partition['bucket'], Key=partition['inventory'], Fileobj=fh)
+            fh.seek(0)
+            data = gzip.GzipFile(fileobj=fh, mode='r')
+            if six.PY3:
+                data = io.TextIOWrapper(data, encoding='utf8')
+            rows = csv.reader(data)
+            for idx, row_set in enumerate(chunks(rows, 1000)):
+                position = idx * 1000 + len(row_set)
+                if position <= offset:
+                    continue
+                keys = []
+                for row in row_set:
+                    if ('IsDeleteMarker' in schema and
+                            row[schema['IsDeleteMarker']] == 'true' and
+                            not delete_markers):
+                        continue
+                    key = {'Key': unquote_plus(row[schema['Key']])}
+                    if versioned:
+                        key['VersionId'] = row[schema['VersionId']]
+                        key['IsLatest'] = row[schema['IsLatest']] == 'true'
+                    keys.append(key)
+                yield keys, position
 
     def process_chunk(self, batch, bucket):
         raise NotImplementedError()
@@ -1887,7 +2232,9 @@ class EncryptExtantKeys(ScanBucket):
             'glacier': {'type': 'boolean'},
             'large': {'type': 'boolean'},
             'crypto': {'enum': ['AES256', 'aws:kms']},
-            'key-id': {'type': 'string'}
+            'key-id': {'type': 'string'},
+            'partition': ScanBucket.scan_schema['partition'],
+            'inventory': ScanBucket.scan_schema['inventory']
         },
         'dependencies': {
             'key-id': {
@@ -1909,6 +2256,8 @@ class EncryptExtantKeys(ScanBucket):
 
     def get_permissions(self):
         perms = ("s3:GetObject", "s3:GetObjectVersion")
+        if self.data.get('inventory'):
+            perms += ('s3:GetInventoryConfiguration',)
         if self.data.get('report-only'):
             perms += ('s3:DeleteObject', 's3:DeleteObjectVersion',
                       's3:PutObject',
@@ -2229,6 +2578,7 @@ def _query_elb_attrs(session_factory, elb_set):
 class RemoveWebsiteHosting(BucketActionBase):
     """Action that removes website hosting configuration."""
 
+    resource_fields = ()
     schema = type_schema('remove-website-hosting')
 
     permissions = ('s3:DeleteBucketWebsite',)
@@ -2257,6 +2607,7 @@ class DeleteGlobalGrants(BucketActionBase):
                   - delete-global-grants
     """
 
+    resource_fields = ('Acl', 'Website')
     schema = type_schema(
         'delete-global-grants',
         grantees={'type': 'array', 'items': {'type': 'string'}})
@@ -2329,6 +2680,8 @@ class BucketTag(Tag):
                     value: us-east-1
     """
 
+    resource_fields = ('Tags',)
+
     def process_resource_set(self, client, resource_set, tags):
         modify_bucket_tags(self.manager.session_factory, resource_set, tags)
 
@@ -2354,6 +2707,7 @@ class MarkBucketForOp(TagDelayedAction):
                     days: 7
     """
 
+    resource_fields = ('Tags',)
     schema = type_schema(
         'mark-for-op', rinherit=TagDelayedAction.schema)
 
@@ -2377,6 +2731,8 @@ class RemoveBucketTag(RemoveTag):
                     tags: ['BucketOwner']
     """
 
+    resource_fields = ('Tags',)
+
     def process_resource_set(self, client, resource_set, tags):
         modify_bucket_tags(
             self.manager.session_factory, resource_set, remove_tags=tags)
@@ -2385,6 +2741,7 @@ class RemoveBucketTag(RemoveTag):
 @filters.register('data-events')
 class DataEvents(Filter):
 
+    resource_fields = ()
     schema = type_schema('data-events', state={'enum': ['present', 'absent']})
     permissions = (
         'cloudtrail:DescribeTrails',
@@ -2435,6 +2792,7 @@ class DataEvents(Filter):
 @filters.register('inventory')
 class Inventory(ValueFilter):
     """Filter inventories for a bucket"""
+    resource_fields = ()
     schema = type_schema('inventory', rinherit=ValueFilter.schema)
     schema_alias = False
     permissions = ('s3:GetInventoryConfiguration',)
@@ -2474,6 +2832,7 @@ class Inventory(ValueFilter):
 class SetInventory(BucketActionBase):
     """Configure bucket inventories for an s3 bucket.
     """
+    resource_fields = ()
     schema = type_schema(
         'set-inventory',
         required=['name', 'destination'],
@@ -2604,7 +2963,9 @@ class DeleteBucket(ScanBucket):
                     remove-contents: true
     """
 
-    schema = type_schema('delete', **{'remove-contents': {'type': 'boolean'}})
+    resource_fields = ('Replication', 'Versioning')
+    schema = type_schema(
+        'delete', **dict(ScanBucket.scan_schema, **{'remove-contents': {'type': 'boolean'}}))
 
     permissions = ('s3:*',)
 
@@ -2739,6 +3100,7 @@ class Lifecycle(BucketActionBase):
 
     """
 
+    resource_fields = ('Lifecycle',)
     schema = type_schema(
         'configure-lifecycle',
         **{
@@ -2963,6 +3325,7 @@ class BucketEncryption(KMSKeyResolverMixin, Filter):
                   - type: bucket-encryption
                     state: False
     """
+    resource_fields = ()
     schema = type_schema('bucket-encryption',
                          state={'type': 'boolean'},
                          crypto={'type': 'string', 'enum': ['AES256', 'aws:kms']},
@@ -3072,6 +3435,7 @@ class SetBucketEncryption(KMSKeyResolverMixin, BucketActionBase):
                     enabled: false
     """
 
+    resource_fields = ()
     schema = {
         'type': 'object',
         'additionalProperties': False,
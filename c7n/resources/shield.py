@@ -56,9 +56,9 @@ def get_protections_paginator(client):
         client.meta.service_model.operation_model('ListProtections'))
 
 
-def get_type_protections(client, model):
+def get_type_protections(client, model, account_id=None):
     pager = get_protections_paginator(client)
-    pager.PAGE_ITERATOR_CLS = RetryPageIterator
+    pager.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(account_id)
     try:
         protections = pager.paginate().build_full_result().get('Protections', [])
     except client.exceptions.ResourceNotFoundException:
@@ -79,7 +79,8 @@ class IsShieldProtected(Filter):
         client = local_session(self.manager.session_factory).client(
             'shield', region_name='us-east-1')
 
-        protections = get_type_protections(client, self.manager.get_model())
+        protections = get_type_protections(
+            client, self.manager.get_model(), self.manager.config.account_id)
         protected_resources = {p['ResourceArn'] for p in protections}
 
         state = self.data.get('state', False)
@@ -110,7 +111,8 @@ class SetShieldProtection(BaseAction):
         client = local_session(self.manager.session_factory).client(
             'shield', region_name='us-east-1')
         model = self.manager.get_model()
-        protections = get_type_protections(client, self.manager.get_model())
+        protections = get_type_protections(
+            client, self.manager.get_model(), self.manager.config.account_id)
         protected_resources = {p['ResourceArn']: p for p in protections}
         state = self.data.get('state', True)
 
@@ -28,27 +28,35 @@ the utils.type_schema function.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from collections import Counter
+import hashlib
 import json
 import inspect
 import logging
+import os
+import sys
+import tempfile
+import threading
 
 from jsonschema import Draft4Validator as JsonSchemaValidator
 from jsonschema.exceptions import best_match
 
 from c7n.policy import execution
 from c7n.provider import clouds
-from c7n.resources import load_available
+from c7n.registry import PluginRegistry
+from c7n.resources import ElementMap, load_available
 from c7n.resolver import ValuesFrom
 from c7n.filters.core import ValueFilter, EventFilter, AgeFilter, OPERATORS, VALUE_TYPES
 from c7n.structure import StructureParser # noqa
+from c7n.version import version
 
+log = logging.getLogger('custodian.schema')
 
-def validate(data, schema=None):
-    if schema is None:
-        schema = generate()
-        JsonSchemaValidator.check_schema(schema)
 
-    validator = JsonSchemaValidator(schema)
+def validate(data, schema=None, resource_types=()):
+    if schema is None:
+        validator = get_validator(resource_types)
+    else:
+        validator = JsonSchemaValidator(schema)
     errors = list(validator.iter_errors(data))
     if not errors:
         return check_unique(data) or []
@@ -70,6 +78,130 @@ def validate(data, schema=None):
     ]))
 
 
+# Generated schema validators by resource types, for the life of the process.
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_validator(resource_types=()):
+    """Get a validator for policies over the given resource types.
+
+    Schema generation and checking walks every registered resource,
+    filter and action, so validators are built once per process for a
+    given set of resource types (an empty set meaning all types).
+
+    If the ``C7N_SCHEMA_CACHE`` environment variable names a directory,
+    generated schemas are also persisted there, keyed by custodian
+    version, the set of loaded provider plugins (with the modification
+    time of their source files) and cross resource element modules and
+    the resource types, so subsequent processes skip generation.
+    """
+    rtypes = tuple(sorted(resource_types))
+    # unknown types are reported against the full schema
+    if not all(map(_is_registered, rtypes)):
+        rtypes = ()
+    # registrations since a validator was built invalidate it.
+    key = (rtypes, PluginRegistry.generation)
+    validator = _validators.get(key)
+    if validator is not None:
+        return validator
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is None:
+            for k in [k for k in _validators if k[1] != key[1]]:
+                del _validators[k]
+            validator = _validators[key] = JsonSchemaValidator(
+                _get_schema(rtypes))
+    return validator
+
+
+def _is_registered(resource_type):
+    cloud_name, _, type_name = resource_type.partition('.')
+    cloud = clouds.get(cloud_name)
+    return cloud is not None and type_name in cloud.resources
+
+
+def reset_validators():
+    _validators.clear()
+
+
+def _get_schema(resource_types):
+    cache_dir = os.environ.get('C7N_SCHEMA_CACHE')
+    if cache_dir:
+        path = os.path.join(cache_dir, "schema-%s.json" % (
+            get_schema_cache_key(resource_types)))
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            pass
+
+    schema = generate(resource_types)
+    JsonSchemaValidator.check_schema(schema)
+
+    if cache_dir:
+        try:
+            _write_schema(cache_dir, path, schema)
+        except (IOError, OSError) as e:
+            log.warning("unable to write schema cache %s: %s", path, e)
+    return schema
+
+
+def _write_schema(cache_dir, path, schema):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # write and rename so concurrent readers never see a partial file.
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(schema, fh)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def get_schema_cache_key(resource_types):
+    providers = []
+    for cloud_name, cloud_type in sorted(clouds.items()):
+        package = cloud_type.__module__.split('.', 1)[0]
+        providers.append((cloud_name, package, getattr(
+            sys.modules.get(package), '__version__', None) or _dist_version(package),
+            _package_mtime(package)))
+    elements = sorted(
+        m for modules in ElementMap.values() for m in modules if m in sys.modules)
+    return hashlib.sha256(json.dumps(
+        [version, providers, elements, list(resource_types)]).encode('utf8')).hexdigest()
+
+
+def _package_mtime(package):
+    """Latest modification time of a package's source files and directories.
+
+    Development checkouts change without a version bump, directory times
+    also catch added and removed modules.
+    """
+    path = getattr(sys.modules.get(package), '__file__', None)
+    if path is None:
+        return None
+    latest = 0
+    for root, dirs, files in os.walk(os.path.dirname(path)):
+        latest = max(latest, os.path.getmtime(root))
+        for f in files:
+            if f.endswith('.py'):
+                latest = max(latest, os.path.getmtime(os.path.join(root, f)))
+    return latest
+
+
+def _dist_version(package):
+    if package == 'c7n':
+        return version
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution(package.replace('_', '-')).version
+    except Exception:
+        return None
+
+
 def check_unique(data):
     counter = Counter([p['name'] for p in data.get('policies', [])])
     for k, v in list(counter.items()):
@@ -224,6 +356,7 @@ def generate(resource_types=()):
                     {'$ref': '#/definitions/max-resources-properties'}
                 ]},
                 'max-resources-percent': {'type': 'number', 'minimum': 0, 'maximum': 100},
+                'filter-reorder': {'type': 'boolean'},
                 'comment': {'type': 'string'},
                 'comments': {'type': 'string'},
                 'description': {'type': 'string'},
@@ -29,7 +29,7 @@ class StructureParser(object):
     allowed_policy_keys = set(
         ('name', 'resource', 'title', 'description', 'mode',
          'tags', 'max-resources', 'source', 'query',
-         'filters', 'actions', 'source', 'tags',
+         'filters', 'actions', 'source', 'tags', 'filter-reorder',
          # legacy keys subject to deprecation.
          'region', 'start', 'end', 'tz', 'max-resources-percent',
          'comments', 'comment'))
@@ -102,3 +102,31 @@ class StructureParser(object):
                 rtype = 'aws.%s' % rtype
             resources.add(rtype)
         return resources
+
+    def get_element_types(self, data):
+        """Get the filter, action and mode types referenced by policies."""
+        elements = set()
+        for p in data.get('policies', []):
+            mode = p.get('mode')
+            if isinstance(mode, dict) and 'type' in mode:
+                elements.add(mode['type'])
+            self._get_filter_types(p.get('filters') or (), elements)
+            for a in p.get('actions') or ():
+                if isinstance(a, six.string_types):
+                    elements.add(a)
+                elif isinstance(a, dict) and 'type' in a:
+                    elements.add(a['type'])
+        return elements
+
+    def _get_filter_types(self, filters, elements):
+        for f in filters:
+            if isinstance(f, six.string_types):
+                elements.add(f)
+            elif not isinstance(f, dict):
+                continue
+            elif 'type' in f:
+                elements.add(f['type'])
+            else:
+                for op in ('and', 'or', 'not'):
+                    if isinstance(f.get(op), list):
+                        self._get_filter_types(f[op], elements)
@@ -28,7 +28,6 @@ from datetime import datetime, timedelta
 from dateutil import tz as tzutil
 from dateutil.parser import parse
 
-import itertools
 import jmespath
 import time
 
@@ -37,6 +36,8 @@ from c7n.actions import BaseAction as Action, AutoTagUser
 from c7n.exceptions import PolicyValidationError, PolicyExecutionError
 from c7n.filters import Filter, OPERATORS
 from c7n.filters.offhours import Time
+from c7n.ratelimit import get_limiter
+from c7n.resources import load_resources
 from c7n import utils
 
 DEFAULT_TAG = "maid_status"
@@ -78,6 +79,38 @@ def register_universal_tags(filters, actions, compatibility=True):
     actions.register('remove-tag', UniversalUntag)
 
 
+# Maximum arns per tagging api get_resources call.
+TAG_ARN_BATCH_SIZE = 100
+
+# Above this many resources, tags are fetched by sweeping the resource
+# type, along with any other types in the run which also need tags.
+TAG_ARN_LIST_THRESHOLD = 500
+
+# Maximum resource types per tagging api get_resources call.
+TAG_TYPE_BATCH_SIZE = 100
+
+# Snapshot hint key for the universal taggable types of a run's policies.
+TAG_TYPES_HINT = 'universal-tag-types'
+
+
+def get_universal_tag_type(manager):
+    m = manager.get_model()
+    return "%s:%s" % (m.arn_service or m.service, m.arn_type)
+
+
+def get_universal_tag_types(policies):
+    """Tagging api resource types of the universal taggable policies."""
+    tag_types = set()
+    for p in policies:
+        if p.provider_name != 'aws':
+            continue
+        manager = p.resource_manager
+        if (getattr(manager.resource_type, 'universal_taggable', False) and
+                not getattr(manager.resource_type, 'global_resource', False)):
+            tag_types.add(get_universal_tag_type(manager))
+    return tag_types
+
+
 def universal_augment(self, resources):
     # Resource Tagging API Support
     # https://docs.aws.amazon.com/awsconsolehelpdocs/latest/gsg/supported-resources.html
@@ -92,21 +125,30 @@ def universal_augment(self, resources):
     client = utils.local_session(
         self.session_factory).client('resourcegroupstaggingapi', region_name=region)
 
-    # Lazy for non circular :-(
-    from c7n.query import RetryPageIterator
-    paginator = client.get_paginator('get_resources')
-    paginator.PAGE_ITERATOR_CLS = RetryPageIterator
-
-    m = self.get_model()
-    resource_type = "%s:%s" % (m.arn_service or m.service, m.arn_type)
-
-    resource_tag_map_list = list(itertools.chain(
-        *[p['ResourceTagMappingList'] for p in paginator.paginate(
-            ResourceTypeFilters=[resource_type])]))
-    resource_tag_map = {
-        r['ResourceARN']: r['Tags'] for r in resource_tag_map_list}
+    resource_type = get_universal_tag_type(self)
+    arns = self.get_arns(resources)
+    tag_key = {'account': self.account_id, 'region': region, 'resource': 'tags'}
 
-    for arn, r in zip(self.get_arns(resources), resources):
+    # Lazy for non circular :-(
+    from c7n.cache import get_snapshot
+    snapshot = get_snapshot()
+    resource_tag_map = None
+    if snapshot is not None:
+        cached = snapshot.peek(dict(tag_key, type=resource_type))
+        resource_tag_map = cached[0] if cached else None
+
+    if resource_tag_map is None:
+        if len(arns) <= TAG_ARN_LIST_THRESHOLD:
+            resource_tag_map = _get_arn_tags(self, client, snapshot, tag_key, arns)
+        else:
+            tag_types = set()
+            if snapshot is not None and region == self.region:
+                tag_types = set(snapshot.hints.get(TAG_TYPES_HINT, ()))
+            tag_types.discard(resource_type)
+            resource_tag_map = _sweep_type_tags(
+                client, snapshot, tag_key, [resource_type] + sorted(tag_types))
+
+    for arn, r in zip(arns, resources):
         if 'Tags' in r:
             continue
         r['Tags'] = resource_tag_map.get(arn, [])
@@ -114,11 +156,75 @@ def universal_augment(self, resources):
     return resources
 
 
+def _get_arn_tags(manager, client, snapshot, tag_key, arns):
+    """Fetch tags for the given arns, in batches via their arn list."""
+    def fetch(keys):
+        batch_arns = [k['arn'] for k in keys]
+        tag_map = {}
+        for batch in utils.chunks(batch_arns, TAG_ARN_BATCH_SIZE):
+            response = manager.retry(client.get_resources, ResourceARNList=batch)
+            for mapping in response.get('ResourceTagMappingList', ()):
+                tag_map[mapping['ResourceARN']] = mapping['Tags']
+        return [tag_map.get(arn, []) for arn in batch_arns]
+
+    keys = [dict(tag_key, arn=arn) for arn in arns]
+    if snapshot is None:
+        values = fetch(keys)
+    else:
+        values = snapshot.get_many(keys, fetch)
+    return dict(zip(arns, values))
+
+
+def _sweep_type_tags(client, snapshot, tag_key, resource_types):
+    """Fetch tags for all resources of several types in a single sweep.
+
+    Types are swept in batches of the api's type filter limit, tags for
+    each type are stored in the snapshot, returns the tags of the first
+    type.
+    """
+    # Lazy for non circular :-(
+    from c7n.query import RetryPageIterator
+    paginator = client.get_paginator('get_resources')
+    paginator.PAGE_ITERATOR_CLS = RetryPageIterator.for_account(tag_key['account'])
+
+    type_tag_maps = {t: {} for t in resource_types}
+    # match arns to the most specific type, ie. loadbalancer/app over loadbalancer
+    match_order = sorted(resource_types, key=len, reverse=True)
+    for type_set in utils.chunks(resource_types, TAG_TYPE_BATCH_SIZE):
+        for page in paginator.paginate(ResourceTypeFilters=type_set):
+            for mapping in page['ResourceTagMappingList']:
+                arn = mapping['ResourceARN']
+                for t in match_order:
+                    if _arn_matches_type(arn, t):
+                        type_tag_maps[t][arn] = mapping['Tags']
+                        break
+
+    if snapshot is not None:
+        snapshot.get_many(
+            [dict(tag_key, type=t) for t in resource_types],
+            lambda keys: [[type_tag_maps[k['type']]] for k in keys])
+    return type_tag_maps[resource_types[0]]
+
+
+def _arn_matches_type(arn, resource_type):
+    # ie. arn:aws:elasticache:us-east-1:123456789012:cluster:name matches
+    # elasticache:cluster, and arn:aws:sqs:us-east-1:123456789012:name sqs:
+    service, _, arn_type = resource_type.partition(':')
+    parts = arn.split(':', 5)
+    if len(parts) < 6 or parts[2] != service:
+        return False
+    if not arn_type:
+        return True
+    resource = parts[5]
+    return resource.startswith(arn_type + '/') or resource.startswith(arn_type + ':')
+
+
 def _common_tag_processer(executor_factory, batch_size, concurrency, client,
                           process_resource_set, id_key, resources, tags,
-                          log):
+                          log, account=None):
 
     error = None
+    client = get_limiter().wrap(client, account)
     with executor_factory(max_workers=concurrency) as w:
         futures = []
         for resource_set in utils.chunks(resources, size=batch_size):
@@ -284,6 +390,7 @@ class TagActionFilter(Filter):
         skew_hours={'type': 'number', 'minimum': 0},
         op={'type': 'string'})
     schema_alias = True
+    resource_fields = ('Tags',)
 
     current_date = None
 
@@ -425,7 +532,8 @@ class Tag(Action):
         client = self.get_client()
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
-            self.process_resource_set, self.id_key, resources, tags, self.log)
+            self.process_resource_set, self.id_key, resources, tags, self.log,
+            self.manager.config.account_id)
 
     def process_resource_set(self, client, resource_set, tags):
         mid = self.manager.get_model().id
@@ -470,7 +578,8 @@ class RemoveTag(Action):
         client = self.get_client()
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
-            self.process_resource_set, self.id_key, resources, tags, self.log)
+            self.process_resource_set, self.id_key, resources, tags, self.log,
+            self.manager.config.account_id)
 
     def process_resource_set(self, client, resource_set, tag_keys):
         return self.manager.retry(
@@ -683,7 +792,8 @@ class TagDelayedAction(Action):
         client = self.get_client()
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
-            self.process_resource_set, self.id_key, resources, tags, self.log)
+            self.process_resource_set, self.id_key, resources, tags, self.log,
+            self.manager.config.account_id)
 
     def process_resource_set(self, client, resource_set, tags):
         tagger = self.manager.action_registry['tag']({}, self.manager)
@@ -852,7 +962,8 @@ class UniversalTag(Tag):
 
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
-            self.process_resource_set, self.id_key, resources, tags, self.log)
+            self.process_resource_set, self.id_key, resources, tags, self.log,
+            self.manager.config.account_id)
 
     def process_resource_set(self, client, resource_set, tags):
         arns = self.manager.get_arns(resource_set)
@@ -937,7 +1048,8 @@ class UniversalTagDelayedAction(TagDelayedAction):
 
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
-            self.process_resource_set, self.id_key, resources, tags, self.log)
+            self.process_resource_set, self.id_key, resources, tags, self.log,
+            self.manager.config.account_id)
 
     def process_resource_set(self, client, resource_set, tags):
         arns = self.manager.get_arns(resource_set)
@@ -1003,6 +1115,8 @@ class CopyRelatedResourceTag(Tag):
 
     def validate(self):
         related_resource = self.data['resource']
+        # only the related resource's tags are read, it needs no elements
+        load_resources(('aws.%s' % related_resource,), element_types=())
         if related_resource not in aws_resources.keys():
             raise PolicyValidationError(
                 "Error: Invalid resource type selected: %s" % related_resource
@@ -1080,11 +1194,9 @@ class CopyRelatedResourceTag(Tag):
         Returns a mapping of {resource_id: {tagkey: tagvalue}}
         """
         manager = self.manager.get_resource_manager(r_type)
-        r_id = manager.resource_type.id
-
         return {
-            r[r_id]: {t['Key']: t['Value'] for t in r.get('Tags', [])}
-            for r in manager.get_resources(list(ids))
+            rid: {t['Key']: t['Value'] for t in r.get('Tags', [])}
+            for rid, r in manager.get_resource_index(ids).items()
         }
 
     @classmethod
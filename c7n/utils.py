@@ -282,6 +282,12 @@ def reset_session_cache():
         setattr(CONN_CACHE, k, {})
 
 
+def overrides(obj, klass, name):
+    """Whether an object's class overrides the named method of klass."""
+    return (six.get_unbound_function(getattr(obj.__class__, name)) is not
+            six.get_unbound_function(getattr(klass, name)))
+
+
 def annotation(i, k):
     return i.get(k, ())
 
@@ -399,6 +405,7 @@ def get_retry(codes=(), max_attempts=8, min_delay=1, log_retries=False):
                         "retrying %s on error:%s attempt:%d last delay:%0.2f",
                         func, e.response['Error']['Code'], idx, delay)
             time.sleep(delay)
+    _retry.codes = codes
     return _retry
 
 
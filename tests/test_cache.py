@@ -20,6 +20,9 @@ from six.moves import cPickle as pickle
 import tempfile
 import mock
 import os
+import shutil
+import sqlite3
+import time
 
 
 class TestCache(TestCase):
@@ -27,7 +30,7 @@ class TestCache(TestCase):
     def test_factory(self):
         self.assertIsInstance(cache.factory(None), cache.NullCache)
         test_config = Namespace(cache_period=60, cache="test-cloud-custodian.cache")
-        self.assertIsInstance(cache.factory(test_config), cache.FileCacheManager)
+        self.assertIsInstance(cache.factory(test_config), cache.SqlKvCache)
         test_config.cache = None
         self.assertIsInstance(cache.factory(test_config), cache.NullCache)
 
@@ -163,3 +166,204 @@ class FileCacheManagerTest(TestCase):
         self.addCleanup(os.unlink, t.name)
         self.addCleanup(t.close)
         return t
+
+
+class SqlKvCacheTest(TestCase):
+
+    def get_cache(self, cache_period=60):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        return cache.SqlKvCache(Namespace(
+            cache_period=cache_period,
+            cache=os.path.join(temp_dir, 'nested', 'test.cache')))
+
+    def test_get_set(self):
+        c = self.get_cache()
+        self.assertIsNone(c.get({'resource': 'ec2'}))
+        self.assertTrue(c.load())
+        k1 = {"account": "12345678901234", "region": "us-west-2", "resource": "ec2"}
+        k2 = {"account": "98765432101234", "region": "eu-west-1", "resource": "asg"}
+        c.save(k1, list(range(5)))
+        c.save(k2, list(range(2)))
+        self.assertEqual(c.get(k1), list(range(5)))
+        self.assertEqual(c.get(k2), list(range(2)))
+        self.assertIsNone(c.get({'resource': 'ebs'}))
+        self.assertEqual(c.stats['hits'], 2)
+        self.assertEqual(c.stats['misses'], 1)
+        self.assertTrue(c.size() > 0)
+
+        c2 = cache.SqlKvCache(Namespace(cache_period=60, cache=c.cache_path))
+        self.assertTrue(c2.load())
+        self.assertEqual(c2.get(k1), list(range(5)))
+        c2.close()
+        c.close()
+
+    def test_entry_expiration(self):
+        c = self.get_cache(cache_period=1)
+        with mock.patch.object(cache.time, 'time', return_value=1000):
+            c.save('old', [1])
+        with mock.patch.object(cache.time, 'time', return_value=1030):
+            c.save('new', [2])
+        with mock.patch.object(cache.time, 'time', return_value=1070):
+            self.assertIsNone(c.get('old'))
+            self.assertEqual(c.get('new'), [2])
+        c.close()
+
+    def test_lru_eviction(self):
+        c = self.get_cache()
+        c.max_size = 150
+        now = time.time()
+        with mock.patch.object(cache.time, 'time') as mock_time:
+            mock_time.return_value = now
+            c.save('a', 'x' * 60)
+            mock_time.return_value = now + 1
+            c.save('b', 'x' * 60)
+            mock_time.return_value = now + 2
+            self.assertEqual(c.get('a'), 'x' * 60)
+            mock_time.return_value = now + 3
+            c.save('c', 'x' * 60)
+        self.assertIsNone(c.get('b'))
+        self.assertEqual(c.get('a'), 'x' * 60)
+        self.assertEqual(c.get('c'), 'x' * 60)
+        c.close()
+
+    def test_replace_pickle_cache_file(self):
+        c = self.get_cache()
+        os.makedirs(os.path.dirname(c.cache_path))
+        with open(c.cache_path, 'wb') as fh:
+            pickle.dump({'a': 1}, fh, protocol=2)
+        self.assertTrue(c.load())
+        c.save('a', 1)
+        self.assertEqual(c.get('a'), 1)
+        c.close()
+
+    def test_locked_cache_file_is_kept(self):
+        c = self.get_cache()
+        os.makedirs(os.path.dirname(c.cache_path))
+        with open(c.cache_path, 'wb') as fh:
+            fh.write(b'data')
+        with mock.patch.object(
+                c, '_open', side_effect=sqlite3.OperationalError('database is locked')):
+            self.assertFalse(c.load())
+        self.assertTrue(os.path.exists(c.cache_path))
+
+    def test_shared_connection(self):
+        c = self.get_cache()
+        self.assertTrue(c.load())
+        c.save('a', 1)
+        with mock.patch.object(c, '_connect') as connect:
+            c2 = cache.SqlKvCache(Namespace(cache_period=60, cache=c.cache_path))
+            self.assertTrue(c2.load())
+            self.assertFalse(connect.called)
+        self.assertIs(c2.conn, c.conn)
+        self.assertIs(c2.lock, c.lock)
+        self.assertEqual(c2.get('a'), 1)
+
+        # the connection is closed once the last cache using it closes
+        conn = c2.conn
+        c.close()
+        self.assertEqual(c2.get('a'), 1)
+        c2.close()
+        self.assertRaises(sqlite3.ProgrammingError, conn.execute, 'select 1')
+
+        c3 = cache.SqlKvCache(Namespace(cache_period=60, cache=c.cache_path))
+        self.assertTrue(c3.load())
+        self.assertIsNot(c3.conn, conn)
+        self.assertEqual(c3.get('a'), 1)
+        c3.close()
+
+    def test_size_total(self):
+        c = self.get_cache()
+        self.assertTrue(c.load())
+        c.save('a', 'x' * 10)
+        c.save('b', 'x' * 20)
+        size = c.size()
+        c.save('a', 'x' * 30)
+        self.assertEqual(c.size(), size + 20)
+        self.assertEqual(
+            c.size(),
+            c.conn.execute('select sum(size) from c7n_cache').fetchone()[0])
+        c.close()
+
+    def test_corrupt_entry_is_miss(self):
+        c = self.get_cache()
+        self.assertTrue(c.load())
+        c.save('a', 1)
+        with c.conn:
+            c.conn.execute("update c7n_cache set value = ?", (sqlite3.Binary(b'junk'),))
+        self.assertIsNone(c.get('a'))
+        self.assertEqual(c.take_stats()['misses'], 1)
+        self.assertEqual(c.stats['misses'], 0)
+        c.close()
+
+
+class ResourceSnapshotTest(TestCase):
+
+    def test_snapshot_activation(self):
+        self.assertIsNone(cache.get_snapshot())
+        with cache.ResourceSnapshot() as snapshot:
+            self.assertEqual(cache.get_snapshot(), snapshot)
+        self.assertIsNone(cache.get_snapshot())
+
+    def test_snapshot_loads_once(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return [{'InstanceId': 'i-1'}, {'InstanceId': 'i-2'}]
+
+        snapshot = cache.ResourceSnapshot()
+        k = {'account': '123', 'region': 'us-east-1', 'resource': 'EC2', 'q': None}
+        self.assertEqual(len(snapshot.get(k, loader)), 2)
+        self.assertEqual(len(snapshot.get(dict(k), loader)), 2)
+        self.assertEqual(len(loads), 1)
+        self.assertEqual((snapshot.hits, snapshot.misses), (1, 1))
+        self.assertEqual(snapshot.size(), 2)
+
+    def test_snapshot_get_many(self):
+        loads = []
+
+        def loader(keys):
+            loads.append([k['metric'] for k in keys])
+            return [k['metric'] != 'Errors' and [{'Sum': 1.0}] or None for k in keys]
+
+        snapshot = cache.ResourceSnapshot()
+        keys = [{'region': 'us-east-1', 'metric': m} for m in ('Requests', 'Errors')]
+        self.assertEqual(snapshot.get_many(keys, loader), [[{'Sum': 1.0}], None])
+        keys.append({'region': 'us-east-1', 'metric': 'Latency'})
+        self.assertEqual(
+            snapshot.get_many(keys, loader),
+            [[{'Sum': 1.0}], None, [{'Sum': 1.0}]])
+        # failed loads (None) are retried, successes are not
+        self.assertEqual(loads, [['Requests', 'Errors'], ['Errors', 'Latency']])
+
+    def test_snapshot_peek(self):
+        snapshot = cache.ResourceSnapshot()
+        key = {'region': 'us-east-1', 'resource': 'tags'}
+        self.assertEqual(snapshot.peek(key), None)
+        snapshot.get(key, lambda: [{'Key': 'App'}])
+        self.assertEqual(snapshot.peek(key), [{'Key': 'App'}])
+        # peeking only counts hits
+        self.assertEqual((snapshot.hits, snapshot.misses), (1, 1))
+
+    def test_snapshot_annotation_isolation(self):
+        base = [{'InstanceId': 'i-1'}]
+        snapshot = cache.ResourceSnapshot()
+        k = {'account': '123', 'region': 'us-east-1', 'resource': 'EC2', 'q': None}
+        first = snapshot.get(k, lambda: base)
+        first[0]['c7n:MatchedFilters'] = ['tag:Owner']
+        second = snapshot.get(k, lambda: base)
+        self.assertNotIn('c7n:MatchedFilters', second[0])
+        self.assertNotIn('c7n:MatchedFilters', base[0])
+
+    def test_snapshot_invalidate(self):
+        snapshot = cache.ResourceSnapshot()
+        ec2_key = {'account': '123', 'region': 'us-east-1', 'resource': 'EC2',
+                   'source': 'describe', 'q': {'Filters': []}}
+        asg_key = dict(ec2_key, resource='ASG')
+        snapshot.get(ec2_key, lambda: [{'InstanceId': 'i-1'}])
+        snapshot.get(asg_key, lambda: [{'AutoScalingGroupName': 'web'}])
+        snapshot.invalidate(dict(ec2_key, q=None))
+        self.assertEqual(snapshot.size(), 1)
+        snapshot.get(ec2_key, lambda: [])
+        self.assertEqual(snapshot.misses, 3)
@@ -553,6 +553,126 @@ class RunTest(CliTest):
             ["custodian", "run", "-s", temp_dir, "--debug", yaml_file], CustomError
         )
 
+    def test_policy_concurrency(self):
+        from c7n.policy import Policy
+
+        executed = []
+
+        def run_policy(p):
+            executed.append(p.name)
+            if p.name == 'error':
+                raise Exception("foobar")
+
+        self.patch(Policy, "__call__", run_policy)
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {"name": "ec2-a", "resource": "ec2"},
+                    {"name": "error", "resource": "ebs"},
+                    {"name": "ec2-b", "resource": "ec2"},
+                    {"name": "sg", "resource": "security-group"},
+                ]
+            }
+        )
+
+        self.run_and_expect_failure(
+            [
+                "custodian",
+                "run",
+                "--policy-concurrency",
+                "3",
+                "-s",
+                temp_dir,
+                yaml_file,
+            ],
+            2,
+        )
+        self.assertEqual(
+            sorted(executed), ['ec2-a', 'ec2-b', 'error', 'sg'])
+        # policies on the same resource type preserve their order
+        self.assertTrue(executed.index('ec2-a') < executed.index('ec2-b'))
+
+    def test_policy_concurrency_groups(self):
+        from c7n.config import Config
+        from c7n.policy import Policy
+
+        executed = []
+        self.patch(Policy, "__call__", lambda p: executed.append(p.name))
+        policies = [
+            self.load_policy({"name": name, "resource": rtype})
+            for name, rtype in (("ec2-a", "ec2"), ("ebs", "ebs"),
+                                ("ec2-b", "ec2"), ("sqs", "sqs"))]
+        options = Config.empty(policy_concurrency=4, service_concurrency=1, debug=True)
+        self.assertEqual(commands._run_policies_concurrent(options, policies), 0)
+        self.assertEqual(len(executed), 4)
+        self.assertEqual(
+            commands._policy_service(policies[1]), ('us-east-1', 'ec2'))
+
+    def test_provision_concurrency(self):
+        from c7n.policy import Policy
+
+        executed = []
+        self.patch(Policy, "__call__", lambda p: executed.append(p.name))
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {"name": "ec2", "resource": "ec2"},
+                    {"name": "ec2-tag", "resource": "ec2",
+                     "mode": {"type": "cloudtrail", "role": "custodian",
+                              "events": ["RunInstances"]}},
+                    {"name": "ebs-periodic", "resource": "ebs",
+                     "mode": {"type": "periodic", "role": "custodian",
+                              "schedule": "rate(1 day)"}},
+                ]
+            }
+        )
+
+        self.run_and_expect_success(
+            ["custodian", "run", "--policy-concurrency", "2", "-s", temp_dir, yaml_file])
+        # serverless policies are provisioned ahead of pull mode ones
+        self.assertEqual(sorted(executed[:2]), ["ebs-periodic", "ec2-tag"])
+        self.assertEqual(executed[2], "ec2")
+
+    def test_region_concurrency(self):
+        from c7n.policy import Policy
+
+        executed = []
+
+        def run_policy(p):
+            executed.append((p.options.region, p.name))
+            if p.options.region == 'us-west-2' and p.name == 'error':
+                raise Exception("foobar")
+
+        self.patch(Policy, "__call__", run_policy)
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {"name": "ec2", "resource": "ec2"},
+                    {"name": "error", "resource": "ebs"},
+                ]
+            }
+        )
+
+        self.run_and_expect_failure(
+            [
+                "custodian", "run", "--region-concurrency", "2",
+                "-r", "us-east-1", "-r", "us-west-2", "-r", "eu-west-1",
+                "-s", temp_dir, yaml_file,
+            ],
+            2,
+        )
+        self.assertEqual(len(executed), 6)
+        for region in ('us-east-1', 'us-west-2', 'eu-west-1'):
+            # policies within a region preserve their order
+            self.assertTrue(
+                executed.index((region, 'ec2')) < executed.index((region, 'error')))
+
 
 class MetricsTest(CliTest):
 
@@ -14,6 +14,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from c7n import executor
+from c7n.exceptions import ClientError
 
 import unittest
 
@@ -55,5 +56,42 @@ class MainExecutorTest(ExecutorBase, unittest.TestCase):
     executor_factory = executor.MainThreadExecutor
 
 
+class AdaptiveConcurrencyTest(unittest.TestCase):
+
+    def throttle(self):
+        raise ClientError(
+            {'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}},
+            'DescribeThings')
+
+    def test_additive_increase(self):
+        limiter = executor.AdaptiveConcurrency(('Throttling',), initial=2, maximum=4)
+        for i in range(20):
+            self.assertEqual(limiter.call(Foo.run, i), ((i,), {}))
+        stats = limiter.get_stats()
+        self.assertEqual(stats['calls'], 20)
+        self.assertEqual(stats['throttles'], 0)
+        self.assertEqual(stats['concurrency'], 4)
+
+    def test_multiplicative_decrease(self):
+        limiter = executor.AdaptiveConcurrency(('Throttling',), initial=8, maximum=8)
+        self.assertRaises(ClientError, limiter.call, self.throttle)
+        self.assertEqual(limiter.get_stats()['concurrency'], 4)
+        self.assertRaises(ClientError, limiter.call, self.throttle)
+        self.assertRaises(ClientError, limiter.call, self.throttle)
+        self.assertRaises(ClientError, limiter.call, self.throttle)
+        self.assertEqual(limiter.get_stats()['concurrency'], 1)
+        self.assertEqual(limiter.get_stats()['throttles'], 4)
+
+    def test_other_errors(self):
+        limiter = executor.AdaptiveConcurrency(('Throttling',), initial=4)
+
+        def fail():
+            raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'DescribeThings')
+
+        self.assertRaises(ClientError, limiter.call, fail)
+        self.assertEqual(limiter.get_stats()['throttles'], 0)
+        self.assertEqual(limiter.active, 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -19,6 +19,8 @@ from dateutil import tz
 from dateutil.parser import parse as parse_date
 import unittest
 
+import mock
+
 from c7n.exceptions import PolicyValidationError
 from c7n.executor import MainThreadExecutor
 from c7n import filters as base_filters
@@ -26,7 +28,9 @@ from c7n.resources.ec2 import filters
 from c7n.resources.elb import ELB
 from c7n.utils import annotation
 from .common import instance, event_data, Bag, BaseTest
-from c7n.filters.core import ValueRegex
+from c7n.filters.core import ValueRegex, get_key_field, order_filters
+from c7n.filters.metrics import MetricsFilter
+from c7n.cache import ResourceSnapshot
 
 
 class BaseFilterTest(unittest.TestCase):
@@ -128,6 +132,191 @@ class TestNotFilter(unittest.TestCase):
         self.assertFalse(fake.invoked)
 
 
+class TestCompiledFilter(unittest.TestCase):
+
+    def test_compiled_matches_interpreted(self):
+        specs = [
+            {"type": "value", "key": "Color", "value": "GR*", "op": "glob"},
+            {"type": "value", "key": "Color", "value": "^gr", "op": "regex"},
+            {"type": "value", "key": "Color", "value": "^gr", "op": "regex-case"},
+            {"type": "value", "key": "Color", "value": ["green", "red"], "op": "in"},
+            {"type": "value", "key": "Color", "value": [["green"]], "op": "in"},
+            {"type": "value", "key": "Colors", "value": ["green"], "op": "not-in"},
+            {"type": "value", "key": "State.Name", "value": "running"},
+            {"type": "value", "key": "tag:Name", "value": "present"},
+            {"type": "value", "key": "tag:Name", "value_regex": "(\\w+)-db",
+             "value": "app"},
+            {"type": "value", "key": "LaunchTime", "value_type": "age",
+             "value": 30, "op": "gt"},
+            {"type": "value", "key": "LaunchTime", "value_type": "date",
+             "value": "2016/01/01", "op": "gt"},
+            {"type": "value", "key": "Cidr", "value_type": "cidr",
+             "value": "10.0.0.0/16", "op": "in"},
+            {"type": "value", "key": "Version", "value_type": "version",
+             "value": "1.10", "op": "gte"},
+            {"type": "value", "key": "Color", "value_type": "expr",
+             "value": "Other"},
+        ]
+        resources = [
+            instance(Color="green", Colors=["green"], Cidr="10.0.1.0/24",
+                     Version="1.9", Other="green",
+                     Tags=[{"Key": "Name", "Value": "app-db"}]),
+            instance(Color="Grey", Colors=["red"], Cidr="10.0.1.1",
+                     Version="1.11", Other="blue"),
+            instance(Color=None, Colors=None, Cidr="192.168.0.0/16",
+                     Version="2.0", LaunchTime=None)]
+        for spec in specs:
+            for r in resources:
+                compiled = filters.factory(dict(spec))
+                interpreted = filters.factory(dict(spec))
+                self.assertEqual(
+                    compiled.match(r), interpreted._match(r), (spec, r['Color']))
+
+    def test_subclass_value_override(self):
+
+        class UpperValue(base_filters.ValueFilter):
+
+            def get_resource_value(self, k, i):
+                return i[k].upper()
+
+        f = UpperValue({"type": "value", "key": "Color", "value": "GREEN"})
+        self.assertEqual(f.compile(), f._match)
+        self.assertTrue(f.match(instance(Color="green")))
+        self.assertIsNone(f.compile_plan())
+
+    def test_and_plan_order(self):
+        f = filters.factory({"and": [
+            {"type": "value", "key": "LaunchTime", "value_type": "age",
+             "value": 1, "op": "gt"},
+            {"Color": "green"}]})
+        cost, match = f.compile_plan()
+        self.assertEqual(cost, 4)
+        self.assertEqual(match(instance(Color="blue", LaunchTime="garbage")), None)
+        # matched keys are reported in declared order
+        self.assertEqual(match(instance(Color="green")), ["LaunchTime", "Color"])
+
+    def test_or_plan_annotation(self):
+        f = filters.factory({"or": [
+            {"Color": "green"}, {"Architecture": "x86_64"}, {"Color": "blue"}]})
+        results = f.process([
+            instance(Color="green", Architecture="x86_64"),
+            instance(Color="blue", Architecture="amd64"),
+            instance(Color="red", Architecture="amd64")])
+        self.assertEqual(
+            [annotation(r, base_filters.ANNOTATION_KEY) for r in results],
+            [["Color", "Architecture"], ["Color"]])
+
+    def test_not_plan_annotation(self):
+        f = filters.factory({"not": [{"Color": "green"}]})
+        results = f.process([instance(Color="green"), instance(Color="blue")])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["Color"], "blue")
+        self.assertNotIn(base_filters.ANNOTATION_KEY, results[0])
+
+    def test_uncompiled_plan(self):
+        f = filters.factory({"and": [
+            {"Color": "green"},
+            {"type": "value", "value_type": "resource_count", "op": "gt", "value": 1}]})
+        self.assertIsNone(f.compile_plan())
+        self.assertEqual(len(f.process([instance(Color="green")])), 0)
+
+
+class TestFilterOrdering(BaseTest):
+
+    class ApiFilter(base_filters.Filter):
+
+        cost = base_filters.COST_API
+
+        def __call__(self, r):
+            return r.get("Color") == "green"
+
+    def test_order_filters(self):
+        api = self.ApiFilter({})
+        value = filters.factory({"Architecture": "x86_64"})
+        annotation_value = filters.factory({"c7n.metrics": "present"})
+        other = base_filters.Filter({})
+        self.assertEqual(
+            order_filters([api, value]), [value, api])
+        # filters without a cost, or on annotations, are barriers
+        self.assertEqual(
+            order_filters([api, other, value]), [api, other, value])
+        self.assertEqual(
+            order_filters([api, annotation_value, value]),
+            [api, annotation_value, value])
+
+    def test_order_by_selectivity(self):
+        arch = filters.factory({"Architecture": "x86_64"})
+        color = filters.factory({"Color": "green"})
+        f = filters.factory({"and": [{"not": [{"Color": "blue"}]}]})
+        f.filters[1:] = [self.ApiFilter({}), arch, color]
+        f.manager = Bag(data={"filter-reorder": True}, get_model=lambda: Bag(id="InstanceId"))
+        resources = [
+            instance(InstanceId="i-1", Architecture="x86_64", Color="green"),
+            instance(InstanceId="i-2", Architecture="x86_64", Color="red")]
+        self.assertEqual(f.process(resources), resources[:1])
+        self.assertEqual(arch.get_selectivity(), 1.0)
+        self.assertEqual(color.get_selectivity(), 0.5)
+        self.assertEqual(
+            f.get_filters(), [color, f.filters[0], arch, f.filters[1]])
+        f.manager.data["filter-reorder"] = False
+        self.assertEqual(f.get_filters(), f.filters)
+
+    def test_policy_filter_reorder(self):
+        p = self.load_policy({
+            "name": "ec2-ordered",
+            "resource": "ec2",
+            "filters": [
+                {"type": "metrics", "name": "CPUUtilization", "value": 1, "op": "lt"},
+                {"tag:Name": "present"}]})
+        self.assertEqual(
+            [f.type for f in p.resource_manager.get_filters()], ["metrics", "value"])
+        p = self.load_policy({
+            "name": "ec2-ordered",
+            "resource": "ec2",
+            "filter-reorder": True,
+            "filters": [
+                {"type": "metrics", "name": "CPUUtilization", "value": 1, "op": "lt"},
+                {"tag:Name": "present"}]})
+        self.assertEqual(
+            [f.type for f in p.resource_manager.get_filters()], ["value", "metrics"])
+
+
+class TestResourceFields(BaseTest):
+
+    def test_get_key_field(self):
+        self.assertEqual(get_key_field("tag:Owner"), "Tags")
+        self.assertEqual(get_key_field("Versioning.Status"), "Versioning")
+        self.assertEqual(get_key_field("Tags[?Key=='Name'].Value"), "Tags")
+        self.assertEqual(get_key_field("c7n:MatchedFilters"), "c7n:MatchedFilters")
+        self.assertEqual(get_key_field("length(Tags)"), None)
+
+    def test_policy_resource_fields(self):
+        p = self.load_policy({
+            "name": "ec2-fields",
+            "resource": "ec2",
+            "filters": [
+                {"tag:Owner": "absent"},
+                {"or": [
+                    {"type": "value", "key": "State.Name", "value": "running"},
+                    {"type": "marked-for-op", "op": "stop"}]}]})
+        self.assertEqual(
+            p.resource_manager.get_resource_fields(), {"Tags", "State"})
+        # undeclared filters and actions need fully described resources
+        p = self.load_policy({
+            "name": "ec2-fields",
+            "resource": "ec2",
+            "filters": [{"tag:Owner": "absent"}, {"type": "instance-age", "days": 1}]})
+        self.assertEqual(p.resource_manager.get_resource_fields(), None)
+        p = self.load_policy({
+            "name": "ec2-fields",
+            "resource": "ec2",
+            "filters": [{"tag:Owner": "absent"}],
+            "actions": ["stop"]})
+        self.assertEqual(p.resource_manager.get_resource_fields(), None)
+        p = self.load_policy({"name": "ec2-inventory", "resource": "ec2"})
+        self.assertEqual(p.resource_manager.get_resource_fields(), None)
+
+
 class TestValueFilter(unittest.TestCase):
 
     # TODO test_manager needs a valid session_factory object
@@ -1001,6 +1190,34 @@ class TestMissingMetrics(BaseTest):
                 for res in resources)
         )
 
+    def test_metrics_shared_in_run(self):
+        self.patch(ELB, "executor_factory", MainThreadExecutor)
+        self.patch(MetricsFilter, "executor_factory", MainThreadExecutor)
+        session_factory = self.replay_flight_data("test_missing_metrics")
+        query_set = mock.patch.object(
+            MetricsFilter, "process_query_set", autospec=True,
+            side_effect=MetricsFilter.process_query_set)
+        frozen = mock.patch("c7n.filters.metrics.datetime")
+
+        results = []
+        with ResourceSnapshot(), query_set as query_set, frozen as frozen:
+            frozen.utcnow.return_value = datetime(2019, 7, 9, 15, 36)
+            for fill in (False, True):
+                data = {"type": "metrics", "value": 0, "name": "RequestCount",
+                        "op": "eq", "statistics": "Sum"}
+                if fill:
+                    data["missing-value"] = 0.0
+                p = self.load_policy(
+                    {"name": "elb-metrics", "resource": "elb", "filters": [data]},
+                    config={"account_id": "644160558196"},
+                    session_factory=session_factory)
+                results.append(p.run())
+
+        self.assertEqual([len(r) for r in results], [1, 2])
+        # the second filter is served from the run's results
+        self.assertEqual(query_set.call_count, 1)
+        self.assertEqual(len(query_set.call_args[0][1]), 3)
+
 
 if __name__ == "__main__":
     unittest.main()
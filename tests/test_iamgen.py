@@ -15,6 +15,7 @@
 from .common import BaseTest, load_data
 from c7n.config import Config, Bag
 from c7n import manager
+from c7n.resources import load_resources
 import fnmatch
 
 
@@ -41,6 +42,8 @@ class TestIamGen(BaseTest):
         return [(path, invalid)]
 
     def test_iam_permissions_validity(self):
+        # check all resources and their cross resource elements
+        load_resources(('aws.*',))
         cfg = Config.empty()
         missing = set()
         all_invalid = []
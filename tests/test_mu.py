@@ -30,6 +30,7 @@ import zipfile
 
 import mock
 
+from c7n import mu
 from c7n.mu import (
     custodian_archive,
     generate_requirements,
@@ -85,6 +86,23 @@ class Publish(BaseTest):
         self.addCleanup(archive.remove)
         return LambdaFunction(func_data, archive)
 
+    def test_publish_unchanged_code_skips_upload(self):
+        func = self.make_func()
+        mgr = LambdaManager(lambda: mock.MagicMock())
+        mgr._upload_func = mock.MagicMock()
+        config = func.get_config()
+        config.pop('Tags')
+        config.update({
+            'FunctionArn': 'arn:aws:lambda:us-east-1:644160558196:function:test-foo-bar',
+            'CodeSha256': func.get_archive().get_checksum()})
+        mgr.client.get_function.return_value = {'Configuration': config}
+
+        with mock.patch.object(func, 'get_events', return_value=()):
+            mgr.publish(func, s3_uri='s3://custodian-assets/functions')
+        mgr._upload_func.assert_not_called()
+        mgr.client.update_function_code.assert_not_called()
+        mgr.client.update_function_configuration.assert_not_called()
+
     def test_publishes_a_lambda(self):
         session_factory = self.replay_flight_data("test_publishes_a_lambda")
         mgr = LambdaManager(session_factory)
@@ -974,6 +992,30 @@ class PythonArchiveTest(unittest.TestCase):
         self.assertTrue("c7n/__init__.py" in filenames)
         self.assertTrue("pkg_resources/__init__.py" in filenames)
 
+    def test_custodian_archive_cache(self):
+        build = mock.Mock(wraps=PythonPackageArchive)
+        digest = mock.Mock(wraps=mu.archive_digest)
+        with mock.patch.object(mu, "_archive_cache", {}), \
+                mock.patch.object(mu, "_archive_digests", {}), \
+                mock.patch.object(mu, "archive_digest", digest), \
+                mock.patch.object(mu, "PythonPackageArchive", build):
+            first = custodian_archive().close()
+            second = custodian_archive()
+            second.add_contents("config.json", "{}")
+            second.close()
+            cache_size = len(mu._archive_cache)
+
+        # module files are only walked and digested once
+        self.assertEqual(digest.call_count, 1)
+
+        # a single module build, plus a copy of it for each call
+        self.assertEqual(
+            [c[0] for c in build.call_args_list], [(["c7n", "pkg_resources"],), (), ()])
+        self.assertEqual(cache_size, 1)
+        self.assertEqual(
+            set(second.get_filenames()).difference(first.get_filenames()), {"config.json"})
+        self.assertEqual(custodian_archive().close().get_checksum(), first.get_checksum())
+
     def make_file(self):
         bench = tempfile.mkdtemp()
         path = os.path.join(bench, "foo.txt")
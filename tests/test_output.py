@@ -15,17 +15,28 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import datetime
 import gzip
+import io
+import json
 import logging
 import mock
 import shutil
 import os
+import threading
 
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
 from dateutil.parser import parse as date_parse
 
 from c7n.ctx import ExecutionContext
 from c7n.config import Config
-from c7n.output import DirectoryOutput, LogFile, metrics_outputs
-from c7n.resources.aws import S3Output, MetricsOutput
+from c7n.executor import ThreadPoolExecutor
+from c7n.output import (
+    DirectoryOutput, LogFile, OrderedLogBuffer, PolicyThreadFilter, TraceEventTracer,
+    TraceRecorder, metrics_outputs, write_resources)
+from c7n.policy import PullMode
+from c7n.reports.csvout import fs_record_set, get_records
+from c7n.resources.aws import ApiStats, S3MultipartWriter, S3Output, MetricsOutput
 from c7n.testing import mock_datetime_now, TestUtils
 
 from .common import Bag, BaseTest
@@ -38,6 +49,186 @@ class MetricsTest(BaseTest):
             isinstance(metrics_outputs.select(True, {}), MetricsOutput))
 
 
+class ApiStatsTest(BaseTest):
+
+    def test_api_operation_stats(self):
+        session = boto3.Session(
+            region_name='us-east-1',
+            aws_access_key_id='AKID', aws_secret_access_key='secret')
+        metrics = []
+        spans = []
+        ctx = Bag(
+            session_factory=lambda: session,
+            metrics=Bag(put_metric=lambda *args: metrics.append(args)),
+            tracer=Bag(record_span=lambda name, *args, **kw: spans.append(name)))
+        stats = ApiStats(ctx)
+        stats(session)
+        stats.__enter__()
+
+        client = session.client('sqs')
+        stubber = Stubber(client)
+        stubber.add_response('list_queues', {'QueueUrls': []})
+        stubber.add_response('list_queues', {'QueueUrls': []}, {'NextToken': 'abc'})
+        stubber.add_client_error('list_queues', 'RequestThrottled')
+        stubber.add_response('get_queue_url', {'QueueUrl': 'https://x'})
+        with stubber:
+            client.list_queues()
+            client.list_queues(NextToken='abc')
+            self.assertRaises(Exception, client.list_queues)
+            client.get_queue_url(QueueName='x')
+
+        self.assertEqual(
+            stats.get_metadata(), {'sqs.ListQueues': 3, 'sqs.GetQueueUrl': 1})
+        ops = stats.get_operation_stats()
+        list_stats = ops['sqs.ListQueues']
+        self.assertEqual(
+            {k: list_stats[k] for k in ('calls', 'errors', 'throttles', 'pages')},
+            {'calls': 3, 'errors': 1, 'throttles': 1, 'pages': 1})
+        self.assertEqual(sum(list_stats['latency']['histogram'].values()), 3)
+        self.assertEqual(
+            spans, ['api:sqs.ListQueues'] * 3 + ['api:sqs.GetQueueUrl'])
+
+        self.patch(PullMode, '__init__', lambda self, policy: None)
+        mode = PullMode(None)
+        mode.policy = Bag(ctx=Bag(api_stats=stats))
+        self.assertTrue(mode.get_api_summary(1).startswith(' api:sqs.'))
+        self.assertEqual(mode.get_api_summary(5).count('sqs.'), 2)
+
+        stats.__exit__()
+        self.assertEqual(
+            [m[0] for m in metrics],
+            ['ApiCalls', 'ApiLatency', 'ApiRetries', 'ApiThrottles', 'ApiResponseSize'])
+        self.assertEqual(metrics[0][1], 4)
+        self.assertEqual(metrics[3][1], 1)
+
+
+class TraceEventTracerTest(BaseTest):
+
+    def test_trace_file(self):
+        trace_path = os.path.join(self.get_temp_dir(), 'trace', 'run.json')
+        self.addCleanup(TraceRecorder.recorders.pop, trace_path, None)
+        session_factory = self.replay_flight_data("test_ec2_augment_tags")
+        p = self.load_policy({
+            "name": "ec2-tags",
+            "resource": "ec2",
+            "filters": [
+                {"or": [
+                    {"tag:Env": "Production"},
+                    {"type": "instance-age", "days": 100000}]}]},
+            config={'tracer': 'file://%s' % trace_path},
+            session_factory=session_factory)
+        self.assertIsInstance(p.ctx.tracer, TraceEventTracer)
+        self.assertEqual(len(p.run()), 1)
+        # traces are written once, when the run completes
+        self.assertFalse(os.path.exists(trace_path))
+        TraceRecorder.flush()
+
+        self.assertEqual(os.listdir(os.path.dirname(trace_path)), ['run.json'])
+        with open(trace_path) as fh:
+            events = json.load(fh)['traceEvents']
+        spans = [e['name'] for e in events if e['ph'] == 'X']
+        for name in ('policy:ec2-tags', 'resource-fetch', 'resource-augment',
+                     'filter:or', 'filter:value', 'filter:instance-age'):
+            self.assertIn(name, spans)
+        self.assertEqual(
+            set(e['tid'] for e in events if e['ph'] == 'M'),
+            set(e['tid'] for e in events if e['ph'] == 'X'))
+        policy_span = [e for e in events if e['name'] == 'policy:ec2-tags'][0]
+        self.assertEqual(policy_span['cat'], 'policy')
+        self.assertEqual(policy_span['args']['resource'], 'ec2')
+
+    def test_trace_write_concurrent(self):
+        trace_path = os.path.join(self.get_temp_dir(), 'run.json')
+        recorder = TraceRecorder(trace_path)
+
+        def record(i):
+            recorder.add('policy:%d' % i, 'policy', 0, 1, {})
+            recorder.write()
+
+        threads = [threading.Thread(target=record, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(os.listdir(os.path.dirname(trace_path)), ['run.json'])
+        with open(trace_path) as fh:
+            events = json.load(fh)['traceEvents']
+        self.assertEqual(len([e for e in events if e['ph'] == 'X']), 8)
+
+
+class OrderedLogBufferTest(BaseTest):
+
+    def test_ordered_log_buffer(self):
+        records = []
+
+        class Handler(logging.Handler):
+            def emit(self, record):
+                records.append(record.getMessage())
+
+        root = logging.getLogger()
+        handler = Handler()
+        root.addHandler(handler)
+        self.addCleanup(root.removeHandler, handler)
+        log = logging.getLogger('custodian.test')
+        log.setLevel(logging.INFO)
+        self.addCleanup(log.setLevel, logging.NOTSET)
+
+        def run(buf, key):
+            with buf.capture(key):
+                log.info(key)
+            buf.finish(key)
+
+        with OrderedLogBuffer(['a', 'b', 'c']) as buf:
+            for key in ('c', 'b'):
+                t = threading.Thread(target=run, args=(buf, key))
+                t.start()
+                t.join()
+            log.info('main')
+            self.assertEqual(records, ['main'])
+            run(buf, 'a')
+        self.assertEqual(records, ['main', 'a', 'b', 'c'])
+        self.assertEqual(handler.filters, [])
+
+
+class PolicyThreadFilterTest(BaseTest):
+
+    def test_worker_records_follow_policy(self):
+        record = logging.LogRecord('custodian.test', logging.INFO, '', 0, 'x', (), None)
+        accepted = {}
+
+        def policy(name, ready, done):
+            with PolicyThreadFilter() as log_filter:
+                accepted[name] = log_filter
+                ready.set()
+                done.wait()
+
+        ready = [threading.Event(), threading.Event()]
+        done = threading.Event()
+        threads = [threading.Thread(target=policy, args=(n, ready[n], done))
+                   for n in (0, 1)]
+        for t in threads:
+            t.start()
+        for r in ready:
+            r.wait()
+
+        def check(name):
+            with ThreadPoolExecutor(max_workers=1) as w:
+                return w.submit(accepted[name].filter, record).result()
+
+        try:
+            # a worker submitted by the main thread is shared output
+            self.assertTrue(check(0))
+            with PolicyThreadFilter():
+                with ThreadPoolExecutor(max_workers=1) as w:
+                    self.assertFalse(w.submit(check, 0).result())
+            self.assertTrue(accepted[1].filter(record))
+        finally:
+            done.set()
+            for t in threads:
+                t.join()
+
+
 class DirOutputTest(BaseTest):
 
     def get_dir_output(self, location):
@@ -55,6 +246,64 @@ class DirOutputTest(BaseTest):
         self.assertEqual(os.listdir(work_dir), ["myoutput"])
         self.assertTrue(os.path.isdir(os.path.join(work_dir, "myoutput")))
 
+    def test_write_resources(self):
+        work_dir, output = self.get_dir_output("file://myoutput")
+        resources = [
+            {"InstanceId": "i-1", "LaunchTime": datetime.datetime(2020, 1, 1)},
+            {"InstanceId": "i-2", "Tags": [{"Key": "App", "Value": "a,\nb"}]}]
+        output.write_resources(resources)
+
+        record_path = os.path.join(output.root_dir, "resources.json")
+        with open(record_path) as fh:
+            self.assertEqual(len(fh.readlines()), 4)
+        with open(record_path) as fh:
+            self.assertEqual(json.load(fh)[0]["LaunchTime"], "2020-01-01T00:00:00")
+
+        records = list(output.get_resource_set())
+        self.assertEqual([r["InstanceId"] for r in records], ["i-1", "i-2"])
+        self.assertEqual(records[1]["Tags"][0]["Value"], "a,\nb")
+        self.assertIn("CustodianDate", records[0])
+
+        output.write_resources([])
+        self.assertEqual(list(output.get_resource_set()), [])
+
+    def test_read_compressed_resources(self):
+        work_dir, output = self.get_dir_output("file://myoutput")
+        output.compress_resources = True
+        output.write_resources([{"InstanceId": "i-1"}])
+        self.assertEqual(os.listdir(output.root_dir), ["resources.json.gz"])
+
+        output.compress()
+        self.assertEqual(os.listdir(output.root_dir), ["resources.json.gz"])
+        self.assertEqual(
+            [r["InstanceId"] for r in fs_record_set(output.root_dir, "xyz")], ["i-1"])
+
+    def test_read_pretty_printed_resources(self):
+        work_dir, output = self.get_dir_output("file://myoutput")
+        with open(os.path.join(output.root_dir, "resources.json"), "w") as fh:
+            json.dump([{"InstanceId": "i-1"}, {"InstanceId": "i-2"}], fh, indent=2)
+        self.assertEqual(
+            [r["InstanceId"] for r in output.get_resource_set()], ["i-1", "i-2"])
+
+    def test_get_records_streams_body(self):
+        blob = io.BytesIO()
+        with gzip.GzipFile(fileobj=blob, mode="wb") as fh:
+            write_resources(fh, [{"InstanceId": "i-1"}, {"InstanceId": "i-2"}])
+
+        class Body(object):
+            # a non seekable stream, as returned by s3
+            def __init__(self, data):
+                self.read = io.BytesIO(data).read
+
+        client = mock.MagicMock()
+        client.get_object.return_value = {"Body": Body(blob.getvalue())}
+        session = Bag(client=lambda service: client)
+        with mock.patch("c7n.reports.csvout.local_session", return_value=session):
+            records = get_records(
+                "bucket", {"Key": "xyz/2020/01/02/03/resources.json.gz"}, None)
+        self.assertEqual([r["InstanceId"] for r in records], ["i-1", "i-2"])
+        self.assertEqual(records[0]["CustodianDate"], datetime.datetime(2020, 1, 2, 3))
+
 
 class S3OutputTest(TestUtils):
 
@@ -148,6 +397,63 @@ class S3OutputTest(TestUtils):
             extra_args={"ACL": "bucket-owner-full-control", "ServerSideEncryption": "AES256"},
         )
 
+    def test_write_resources(self):
+        output = self.get_s3_output()
+        client = mock.MagicMock()
+        output.ctx.session_factory = lambda assume=True: Bag(client=lambda service: client)
+
+        output.write_resources([{"InstanceId": "i-1"}])
+
+        params = client.put_object.call_args[1]
+        self.assertEqual(params["Bucket"], "cloud-custodian")
+        self.assertEqual(
+            params["Key"], "%s/resources.json.gz" % output.key_prefix.strip("/"))
+        self.assertEqual(params["ServerSideEncryption"], "AES256")
+        with gzip.GzipFile(fileobj=io.BytesIO(params["Body"])) as fh:
+            self.assertEqual(json.loads(fh.read().decode("utf8")), [{"InstanceId": "i-1"}])
+        self.assertEqual(os.listdir(output.root_dir), [])
+
+    def test_write_resources_upload_error(self):
+        output = self.get_s3_output()
+        client = mock.MagicMock()
+        client.put_object.side_effect = ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "denied"}}, "PutObject")
+        output.ctx.session_factory = lambda assume=True: Bag(client=lambda service: client)
+
+        with mock.patch("c7n.resources.aws.log") as log:
+            output.write_resources([{"InstanceId": "i-1"}])
+        self.assertEqual(log.warning.call_count, 1)
+
+        # resources are spooled for upload on exit
+        self.assertEqual(os.listdir(output.root_dir), ["resources.json"])
+        self.assertEqual(
+            [r["InstanceId"] for r in output.get_resource_set()], ["i-1"])
+
+    def test_multipart_writer(self):
+        client = mock.MagicMock()
+        client.create_multipart_upload.return_value = {"UploadId": "u1"}
+        client.upload_part.side_effect = lambda **kw: {"ETag": "e%d" % kw["PartNumber"]}
+
+        with S3MultipartWriter(client, "bucket", "key") as fh:
+            fh.part_size = 4
+            fh.write(b"abcde")
+            fh.write(b"fg")
+        self.assertEqual(
+            [c[1]["Body"] for c in client.upload_part.call_args_list], [b"abcde", b"fg"])
+        client.complete_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="key", UploadId="u1",
+            MultipartUpload={"Parts": [
+                {"ETag": "e1", "PartNumber": 1}, {"ETag": "e2", "PartNumber": 2}]})
+        client.put_object.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            with S3MultipartWriter(client, "bucket", "key") as fh:
+                fh.part_size = 4
+                fh.write(b"abcde")
+                raise ValueError()
+        client.abort_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="key", UploadId="u1")
+
     def test_sans_prefix(self):
         output = self.get_s3_output()
 
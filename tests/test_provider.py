@@ -13,10 +13,17 @@
 # limitations under the License.
 
 
+import os
+import subprocess
+import sys
+import tempfile
+
+import mock
+
 from .common import BaseTest
 
 from c7n.provider import get_resource_class, import_resource_classes
-from c7n.resources import load_resources
+from c7n.resources import ElementMap, load_resources, load_policy_resources
 from c7n.resources.resource_map import ResourceMap
 
 
@@ -44,3 +51,57 @@ class ProviderTest(BaseTest):
         load_resources(('aws.ec2',))
         ec2 = get_resource_class('aws.ec2')
         self.assertEqual(ec2.type, 'ec2')
+
+    def test_load_referenced_elements(self):
+        load_resources(('aws.sqs',))
+
+        def imported(imp):
+            return sorted(
+                c[0][0] for c in imp.call_args_list if c[0][0] in ElementMap['aws'])
+
+        with mock.patch('c7n.resources.importlib.import_module') as imp:
+            load_resources(('aws.sqs',), set(('value', 'post-item')))
+            self.assertEqual(imported(imp), ['c7n.resources.ssm'])
+
+            imp.reset_mock()
+            load_policy_resources({'policies': [
+                {'name': 'q', 'resource': 'sqs',
+                 'filters': [{'not': [{'type': 'finding'}]}]}]})
+            self.assertEqual(imported(imp), ['c7n.resources.securityhub'])
+
+            # without references all elements are loaded
+            imp.reset_mock()
+            load_resources(('aws.sqs',))
+            self.assertEqual(
+                imported(imp),
+                ['c7n.resources.securityhub', 'c7n.resources.sfn', 'c7n.resources.ssm'])
+
+            # an empty set of element types loads no elements
+            imp.reset_mock()
+            load_resources(('aws.sqs',), ())
+            self.assertEqual(imported(imp), [])
+
+    def test_validate_ec2_ssm_elements(self):
+        # elements ssm registers on ec2 must load in a fresh interpreter
+        # where nothing else has imported the ssm module
+        with tempfile.NamedTemporaryFile('w', suffix='.yml', delete=False) as fh:
+            fh.write("""
+policies:
+  - name: ec2-send-command
+    resource: ec2
+    filters:
+      - type: ssm
+        key: PingStatus
+        value: Online
+    actions:
+      - type: send-command
+        command:
+          DocumentName: AWS-RunShellScript
+          Parameters:
+            commands: [uptime]
+""")
+        self.addCleanup(os.unlink, fh.name)
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'c7n.cli', 'validate', fh.name],
+            stderr=subprocess.STDOUT)
+        self.assertIn(b'Configuration valid', output)
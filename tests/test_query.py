@@ -17,7 +17,9 @@ import json
 import logging
 import os
 
+import mock
 
+from c7n.cache import ResourceSnapshot
 from c7n.query import ResourceQuery, RetryPageIterator
 from c7n.resources.vpc import InternetGateway
 
@@ -109,6 +111,124 @@ class ResourceQueryTest(BaseTest):
         self.assertEqual(len(resources), 1)
 
 
+class QueryAugmentTest(BaseTest):
+
+    def test_augment_stats(self):
+        session_factory = self.replay_flight_data("test_sqs_delete")
+        p = self.load_policy(
+            {'name': 'sqs', 'resource': 'sqs'}, session_factory=session_factory)
+        m = p.resource_manager
+        resources = m.source.augment(m.source.resources({}))
+        self.assertEqual(len(resources), 3)
+        self.assertTrue(all('QueueArn' in r for r in resources))
+        stats = p.ctx.augment_stats
+        self.assertEqual(stats['sqs']['calls'], 3)
+        self.assertEqual(stats['sqs']['throttles'], 0)
+
+    def test_cache_stats(self):
+        session_factory = self.replay_flight_data("test_sqs_delete")
+        p = self.load_policy(
+            {'name': 'sqs', 'resource': 'sqs'}, session_factory=session_factory,
+            cache='memory')
+        p.resource_manager._cache = mock.MagicMock()
+        p.resource_manager._cache.get.return_value = [{'QueueUrl': 'q'}]
+        p.resource_manager._cache.take_stats.return_value = {'hits': 1, 'misses': 0}
+        self.assertEqual(len(p.resource_manager.resources()), 1)
+        p.resource_manager._fetch_resources(None, None)
+        self.assertEqual(p.ctx.cache_stats, {'hits': 2, 'misses': 0})
+        p.ctx.initialize()
+        self.assertEqual(p.ctx.get_metadata()['cache-stats'], {'hits': 2, 'misses': 0})
+
+
+class QueryStreamTest(BaseTest):
+
+    def test_iter_client_enum_pages(self):
+        session_factory = self.replay_flight_data('test_query_pagination_retry')
+        client = session_factory().client(
+            'logs', config=Config(retries={'max_attempts': 0}))
+        pages = list(ResourceQuery(session_factory)._iter_client_enum(
+            client, 'describe_log_groups', {}, 'logGroups',
+            retry=RetryPageIterator.retry))
+        self.assertEqual([len(p) for p in pages], [8, 3])
+
+    def test_query_stream(self):
+        session_factory = self.replay_flight_data("test_query_filter")
+        p = self.load_policy(
+            {"name": "ec2", "resource": "ec2",
+             "filters": [{"InstanceId": "i-9432cb49"}]},
+            config={'stream': True},
+            session_factory=session_factory)
+        self.assertTrue(p.resource_manager.stream)
+        resources = p.run()
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(resources[0]["InstanceId"], "i-9432cb49")
+
+    def test_query_stream_full_set(self):
+        p = self.load_policy(
+            {"name": "ec2", "resource": "ec2",
+             "filters": [{"or": [
+                 {"type": "value", "value_type": "resource_count",
+                  "op": "gt", "value": 5},
+                 {"tag:Owner": "absent"}]}]},
+            config={'stream': True})
+        self.assertFalse(p.resource_manager.stream)
+
+    def test_source_iter_resources_override(self):
+        p = self.load_policy({"name": "iam", "resource": "iam-policy"})
+        pages = p.resource_manager.source.iter_resources
+        self.patch(p.resource_manager.source.__class__, 'resources',
+                   lambda self, query: [{'Arn': 'xyz'}])
+        self.assertEqual(list(pages({})), [[{'Arn': 'xyz'}]])
+
+
+class QuerySnapshotTest(BaseTest):
+
+    def test_query_snapshot_shared(self):
+        session_factory = self.replay_flight_data("test_query_filter")
+        policies = [
+            self.load_policy(
+                {"name": "ec2-%d" % i, "resource": "ec2"},
+                session_factory=session_factory)
+            for i in range(2)]
+
+        with ResourceSnapshot() as snapshot:
+            first = policies[0].resource_manager.resources()
+            first[0]['c7n:annotation'] = True
+            second = policies[1].resource_manager.resources()
+
+        self.assertEqual((snapshot.hits, snapshot.misses), (1, 1))
+        self.assertEqual(second[0]["InstanceId"], "i-9432cb49")
+        self.assertNotIn('c7n:annotation', second[0])
+
+    def test_query_snapshot_resource_index(self):
+        session_factory = self.replay_flight_data("test_query_filter")
+        manager = self.load_policy(
+            {"name": "ec2", "resource": "ec2"},
+            session_factory=session_factory).resource_manager
+
+        with mock.patch.object(manager, 'get_resources') as get_resources:
+            get_resources.return_value = [{"InstanceId": "i-9432cb49"}]
+            with ResourceSnapshot() as snapshot:
+                # before the type is fetched, ids are described
+                self.assertEqual(
+                    list(manager.get_resource_index(["i-9432cb49"], 10)),
+                    ["i-9432cb49"])
+                self.assertEqual(get_resources.call_count, 1)
+                # reaching the threshold fetches and indexes the type
+                manager.get_resource_index(["i-9432cb49"], 1)
+                index = manager.get_resource_index(["i-9432cb49", "i-missing"])
+                self.assertEqual(get_resources.call_count, 1)
+                self.assertEqual(list(index), ["i-9432cb49"])
+                index["i-9432cb49"]["c7n:annotation"] = True
+                self.assertNotIn(
+                    "c7n:annotation",
+                    manager.get_resource_index(["i-9432cb49"])["i-9432cb49"])
+
+                snapshot.invalidate(manager.get_cache_key(None))
+                manager.get_resource_index(["i-9432cb49"])
+                self.assertEqual(get_resources.call_count, 2)
+
+
 class ConfigSourceTest(BaseTest):
 
     def test_config_select(self):
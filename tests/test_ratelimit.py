@@ -0,0 +1,160 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+
+import boto3
+import mock
+from botocore.paginate import Paginator
+
+from c7n import ratelimit
+from c7n.query import RetryPageIterator
+
+from .common import BaseTest
+
+
+class RateLimitTest(BaseTest):
+
+    def get_client(self):
+        return boto3.Session(
+            aws_access_key_id='AKID', aws_secret_access_key='secret',
+            region_name='us-east-1').client('sqs')
+
+    def test_parse_budgets(self):
+        self.assertEqual(
+            ratelimit.parse_budgets('ec2=20, ec2.DescribeInstances=5:10,*=0.5'),
+            {'ec2': (20.0, 20.0),
+             'ec2.DescribeInstances': (5.0, 10.0),
+             '*': (0.5, 1.0)})
+        self.assertEqual(ratelimit.parse_budgets(None), {})
+        self.assertRaises(ValueError, ratelimit.parse_budgets, 'ec2=x')
+        self.assertRaises(ValueError, ratelimit.parse_budgets, 'ec2=0')
+
+    def test_budget_resolution(self):
+        limiter = ratelimit.RateLimiter(
+            ratelimit.parse_budgets('ec2=20,ec2.DescribeInstances=5,*=1'))
+        self.assertEqual(
+            limiter.get_budget('ec2', 'DescribeInstances'),
+            ('ec2.DescribeInstances', (5.0, 5.0)))
+        self.assertEqual(
+            limiter.get_budget('ec2', 'DescribeVolumes'), ('ec2', (20.0, 20.0)))
+        self.assertEqual(
+            limiter.get_budget('sqs', 'ListQueues'), ('*', (1.0, 1.0)))
+
+        # service budgets are shared across operations, default
+        # budgets are per service, and all are per account and region.
+        bucket = limiter.get_bucket('123', 'us-east-1', 'ec2', 'DescribeVolumes')
+        self.assertIs(
+            bucket,
+            limiter.get_bucket('123', 'us-east-1', 'ec2', 'DescribeSnapshots'))
+        self.assertIsNot(
+            bucket,
+            limiter.get_bucket('123', 'us-west-2', 'ec2', 'DescribeSnapshots'))
+        self.assertIsNot(
+            limiter.get_bucket('123', 'us-east-1', 'sqs', 'ListQueues'),
+            limiter.get_bucket('123', 'us-east-1', 'sns', 'ListTopics'))
+        self.assertIsNone(
+            ratelimit.RateLimiter().get_bucket(
+                '123', 'us-east-1', 'ec2', 'DescribeVolumes'))
+
+    def test_token_bucket(self):
+        bucket = ratelimit.TokenBucket(2, 2)
+        with mock.patch('c7n.ratelimit.time') as mock_time:
+            mock_time.time.return_value = bucket.updated
+            self.assertEqual(bucket.acquire(), 0)
+            self.assertEqual(bucket.acquire(), 0)
+
+            def sleep(delay):
+                mock_time.time.return_value += delay
+            mock_time.sleep.side_effect = sleep
+            self.assertEqual(bucket.acquire(), 0.5)
+            mock_time.sleep.assert_called_once_with(0.5)
+
+    def test_file_token_bucket(self):
+        store = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store)
+        limiter = ratelimit.RateLimiter({'ec2': (1, 2)}, store)
+        bucket = limiter.get_bucket('123', 'us-east-1', 'ec2', 'DescribeVolumes')
+        self.assertIsInstance(bucket, ratelimit.FileTokenBucket)
+        self.assertEqual(len(os.listdir(store)), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(len(os.listdir(store)), 1)
+
+        # another process sees the same bucket state
+        other = ratelimit.RateLimiter({'ec2': (1, 2)}, store).get_bucket(
+            '123', 'us-east-1', 'ec2', 'DescribeVolumes')
+        self.assertEqual(other.path, bucket.path)
+        self.assertEqual(other.acquire(), 0)
+        with mock.patch('c7n.ratelimit.time.sleep') as sleep:
+            sleep.side_effect = StopIteration
+            self.assertRaises(StopIteration, bucket.acquire)
+
+    def test_call(self):
+        client = self.get_client()
+        limiter = ratelimit.RateLimiter({'sqs.ListQueues': (10, 10)})
+        with mock.patch.object(limiter, 'acquire') as acquire:
+            with mock.patch.object(
+                    client, 'list_queues', return_value={'QueueUrls': []}) as op:
+                op.__self__ = client
+                op.__name__ = 'list_queues'
+                self.assertEqual(
+                    limiter.call('123', client.list_queues), {'QueueUrls': []})
+                limiter.call(None, client.list_queues)
+        self.assertEqual(
+            acquire.call_args_list,
+            [mock.call('123', 'us-east-1', 'sqs', 'ListQueues'),
+             mock.call('AKID', 'us-east-1', 'sqs', 'ListQueues')])
+
+    def test_paginate_account(self):
+        client = self.get_client()
+        limiter = ratelimit.RateLimiter({'sqs': (10, 10)})
+        with mock.patch('c7n.query.get_limiter', return_value=limiter):
+            with mock.patch.object(limiter, 'acquire') as acquire:
+                with mock.patch.object(
+                        client, 'list_queues', return_value={'QueueUrls': ['a']}) as op:
+                    op.__self__ = client
+                    op.__name__ = 'list_queues'
+                    pager = Paginator(
+                        client.list_queues,
+                        {'input_token': 'NextToken', 'output_token': 'NextToken',
+                         'result_key': 'QueueUrls'},
+                        client.meta.service_model.operation_model('ListQueues'))
+                    # pages are metered by account, not by the client's access key
+                    pager.PAGE_ITERATOR_CLS = RetryPageIterator.for_account('123')
+                    self.assertEqual(
+                        pager.paginate().build_full_result(), {'QueueUrls': ['a']})
+        acquire.assert_called_once_with('123', 'us-east-1', 'sqs', 'ListQueues')
+
+    def test_wrap_client(self):
+        client = self.get_client()
+        self.assertIs(ratelimit.RateLimiter().wrap(client), client)
+
+        limiter = ratelimit.RateLimiter({'sqs': (10, 10)})
+        wrapped = limiter.wrap(client, '123')
+        self.assertEqual(wrapped.meta.region_name, 'us-east-1')
+        with mock.patch.object(limiter, 'call') as call:
+            wrapped.list_queues(QueueNamePrefix='c7n')
+        call.assert_called_once_with(
+            '123', mock.ANY, QueueNamePrefix='c7n')
+
+    def test_get_limiter(self):
+        self.addCleanup(ratelimit.reset_limiter)
+        ratelimit.reset_limiter()
+        with mock.patch.dict(os.environ, {'C7N_RATE_LIMITS': 'ec2=5'}):
+            limiter = ratelimit.get_limiter()
+        self.assertEqual(limiter.budgets, {'ec2': (5.0, 5.0)})
+        self.assertIs(ratelimit.get_limiter(), limiter)
@@ -15,9 +15,11 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import datetime
 import functools
+import gzip
 import json
 import os
 import io
+import itertools
 import shutil
 import tempfile
 import time  # NOQA needed for some recordings
@@ -26,6 +28,7 @@ from unittest import TestCase
 
 from botocore.exceptions import ClientError
 from dateutil.tz import tzutc
+from mock import MagicMock, patch
 
 from c7n.exceptions import PolicyValidationError
 from c7n.executor import MainThreadExecutor
@@ -77,6 +80,176 @@ class BucketScanLogTests(TestCase):
             data = json.load(fh)
             self.assertEqual(data, [first_five, next_five, []])
 
+    def test_scan_checkpoint(self):
+        with self.log:
+            self.log.partitions = [{'end': 'a'}, {'start': 'a'}]
+            self.log.checkpoint(self.log.partitions[0], complete=True, count=3)
+
+        resumed = s3.BucketScanLog(self.log_dir, "test")
+        with resumed:
+            self.assertEqual(
+                resumed.partitions, [{'end': 'a', 'complete': True, 'count': 3}, {'start': 'a'}])
+            resumed.complete()
+        self.assertFalse(os.path.exists(resumed.checkpoint_path))
+
+    def test_scan_checkpoint_options_changed(self):
+        scan_log = s3.BucketScanLog(self.log_dir, "test", {'partition': True})
+        with scan_log:
+            scan_log.partitions = [{'end': 'a'}, {'start': 'a'}]
+            scan_log.checkpoint(scan_log.partitions[0], complete=True)
+
+        resumed = s3.BucketScanLog(self.log_dir, "test", {'partition': False})
+        with resumed:
+            self.assertIsNone(resumed.partitions)
+            self.assertFalse(os.path.exists(resumed.checkpoint_path))
+
+    def test_scan_resume_keeps_log(self):
+        with self.log:
+            self.log.partitions = [{}]
+            self.log.add(["a", "b"])
+            self.log.checkpoint(self.log.partitions[0], marker={'Marker': 'b'})
+
+        for keys in (["c"], ["d"]):
+            resumed = s3.BucketScanLog(self.log_dir, "test")
+            with resumed:
+                resumed.add(keys)
+
+        logs = {}
+        for n in ("test.json", "test.1.json", "test.2.json"):
+            with open(os.path.join(self.log_dir, n)) as fh:
+                logs[n] = list(itertools.chain(*json.load(fh)))
+        self.assertEqual(
+            logs, {"test.json": ["a", "b"], "test.1.json": ["c"], "test.2.json": ["d"]})
+
+
+class BucketScanPartitionTest(BaseTest):
+
+    def get_action(self, **options):
+        options['type'] = 'encrypt-keys'
+        p = self.load_policy({'name': 'scan', 'resource': 's3', 'actions': [options]})
+        return p.resource_manager.actions[0]
+
+    def test_detect_prefix_partitions(self):
+        action = self.get_action(partition=True)
+        client = MagicMock()
+        client.list_objects.return_value = {
+            'IsTruncated': False, 'Contents': [{'Key': 'index.html'}],
+            'CommonPrefixes': [{'Prefix': 'css/'}, {'Prefix': 'js/'}]}
+        self.assertEqual(
+            action.get_partitions(client, {'Name': 'site'}),
+            [{'delimiter': '/'}, {'prefix': 'css/'}, {'prefix': 'js/'}])
+        client.list_objects.assert_called_once_with(Bucket='site', Delimiter='/')
+
+    def test_detect_lone_prefix_partitions(self):
+        action = self.get_action(partition=True)
+        client = MagicMock()
+        client.list_objects.side_effect = [
+            {'IsTruncated': False, 'CommonPrefixes': [{'Prefix': 'AWSLogs/'}]},
+            {'IsTruncated': False, 'Contents': [{'Key': 'AWSLogs/index'}],
+             'CommonPrefixes': [{'Prefix': 'AWSLogs/123/'}]},
+            {'IsTruncated': True, 'Contents': [
+                {'Key': 'AWSLogs/123/a1'}, {'Key': 'AWSLogs/123/b2'}]}]
+        partitions = action.get_partitions(client, {'Name': 'logs'})
+        self.assertEqual(partitions[0], {'prefix': 'AWSLogs/', 'delimiter': '/'})
+        self.assertEqual(partitions[1], {'prefix': 'AWSLogs/123/', 'end': 'AWSLogs/123/0'})
+        self.assertEqual(
+            partitions[-1], {'prefix': 'AWSLogs/123/', 'start': 'AWSLogs/123/f'})
+        self.assertEqual(len(partitions), 18)
+        client.list_objects.assert_called_with(
+            Bucket='logs', Delimiter='/', Prefix='AWSLogs/123/')
+
+    def test_detect_range_partitions(self):
+        action = self.get_action(partition=True)
+        client = MagicMock()
+        client.list_objects.return_value = {
+            'IsTruncated': True, 'Contents': [{'Key': '0af1'}, {'Key': 'c41e'}]}
+        partitions = action.get_partitions(client, {'Name': 'flat'})
+        self.assertEqual(len(partitions), 17)
+        self.assertEqual(partitions[0], {'end': '0'})
+        self.assertEqual(partitions[1], {'start': '0', 'end': '1'})
+        self.assertEqual(partitions[-1], {'start': 'f'})
+
+    def test_partition_pages_bounded(self):
+        action = self.get_action()
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'IsTruncated': True, 'Contents': [{'Key': 'a1'}, {'Key': 'a2'}]},
+            {'IsTruncated': True, 'Contents': [{'Key': 'a3'}, {'Key': 'b'}, {'Key': 'b1'}]},
+            {'IsTruncated': False, 'Contents': [{'Key': 'c'}]}]
+        pages = list(action.get_partition_pages(
+            client, {'Name': 'flat'}, {'start': 'a', 'end': 'b'}))
+        self.assertEqual(pages, [
+            ([{'Key': 'a1'}, {'Key': 'a2'}], {'Marker': 'a2'}),
+            ([{'Key': 'a3'}, {'Key': 'b'}], None)])
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket='flat', Marker='a')
+
+    def test_scan_resume(self):
+        action = self.get_action()
+        action.process_chunk = lambda batch, bucket: [k['Key'] for k in batch]
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'IsTruncated': False, 'Contents': [{'Key': 'a3'}, {'Key': 'a4'}]}]
+        bucket = {'Name': 'flat'}
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        key_log = s3.BucketScanLog(log_dir, 'flat')
+        with open(key_log.checkpoint_path, 'w') as fh:
+            json.dump({'partitions': [
+                {'end': 'a', 'complete': True, 'count': 5, 'remediated': 1},
+                {'start': 'a', 'marker': {'Marker': 'a2'}, 'count': 2, 'remediated': 2}]},
+                fh)
+
+        with key_log:
+            result = action._process_bucket(bucket, client, key_log, MainThreadExecutor())
+        self.assertEqual(result, {'Bucket': 'flat', 'Remediated': 5, 'Count': 9})
+        self.assertEqual(key_log.count, 2)
+        self.assertFalse(os.path.exists(key_log.checkpoint_path))
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket='flat', Marker='a2')
+
+    def test_scan_removed_bucket(self):
+        action = self.get_action(partition=True)
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.side_effect = ClientError(
+            {'Error': {'Code': 'NoSuchBucket', 'Message': 'gone'}}, 'ListObjects')
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        key_log = s3.BucketScanLog(log_dir, 'gone', action.get_scan_options())
+        with key_log:
+            key_log.partitions = [{'end': 'a', 'complete': True}, {'start': 'a'}]
+            key_log.checkpoint(key_log.partitions[0])
+
+        with patch('c7n.resources.s3.bucket_client', return_value=client):
+            with patch.object(type(action.manager.ctx), 'log_dir', log_dir):
+                self.assertIsNone(action.process_bucket({'Name': 'gone'}))
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            Bucket='gone', Marker='a')
+        self.assertFalse(os.path.exists(key_log.checkpoint_path))
+
+    def test_inventory_pages(self):
+        action = self.get_action(inventory='weekly')
+        rows = ['"flat","docs%2Fa+b.txt","v1","true","false"',
+                '"flat","old","v2","false","true"',
+                '"flat","old","v1","false","false"']
+        data = io.BytesIO()
+        with gzip.GzipFile(fileobj=data, mode='w') as fh:
+            fh.write(("\n".join(rows) + "\n").encode('utf8'))
+
+        session = MagicMock()
+        session.client.return_value.download_fileobj.side_effect = (
+            lambda Bucket, Key, Fileobj: Fileobj.write(data.getvalue()))
+        partition = {
+            'inventory': 'inv/data/1.csv.gz', 'bucket': 'inventory',
+            'schema': ['Bucket', 'Key', 'VersionId', 'IsLatest', 'IsDeleteMarker']}
+
+        with patch('c7n.resources.s3.local_session', return_value=session):
+            pages = list(action.get_inventory_pages(
+                {'Name': 'flat', 'Versioning': {'Status': 'Enabled'}}, partition))
+        self.assertEqual(pages, [([
+            {'Key': 'docs/a b.txt', 'VersionId': 'v1', 'IsLatest': True},
+            {'Key': 'old', 'VersionId': 'v1', 'IsLatest': False}], 3)])
+
 
 def destroyBucket(client, bucket):
     for o in client.list_objects(Bucket=bucket).get("Contents", []):
@@ -741,6 +914,63 @@ class BucketTag(BaseTest):
         )
 
 
+class BucketFields(BaseTest):
+
+    def test_augment_fields(self):
+        p = self.load_policy({
+            "name": "s3-grants",
+            "resource": "s3",
+            "filters": [{"Name": "custodian-grants"}, "global-grants"]})
+        self.assertEqual(
+            p.resource_manager.source.get_augment_fields(),
+            {"Location", "Acl", "Website"})
+        cache_key = p.resource_manager.get_cache_key(None)
+        self.assertEqual(cache_key["fields"], ["Acl", "Location", "Website"])
+
+        p = self.load_policy({
+            "name": "s3-tags",
+            "resource": "s3",
+            "filters": [{"type": "value", "key": "length(Tags)", "value": 0}]})
+        self.assertEqual(p.resource_manager.source.get_augment_fields(), None)
+        self.assertNotIn("fields", p.resource_manager.get_cache_key(None))
+
+    def test_resolve_fields(self):
+        calls = []
+
+        class Client(object):
+
+            def __getattr__(self, name):
+                def method(Bucket):
+                    calls.append(name)
+                    return {"ResponseMetadata": {}, "Status": "Enabled", "TagSet": []}
+                return method
+
+        class Session(object):
+
+            def client(self, *args, **kw):
+                return Client()
+
+        self.patch(s3.S3, "executor_factory", MainThreadExecutor)
+        p = self.load_policy({
+            "name": "s3-versioning",
+            "resource": "s3",
+            "filters": [{"Versioning.Status": "Enabled"}]},
+            session_factory=Session)
+        source = p.resource_manager.source
+        buckets = source.augment([{"Name": "a"}, {"Name": "b"}])
+        self.assertEqual(
+            calls, ["get_bucket_location", "get_bucket_versioning"] * 2)
+        self.assertNotIn("Tags", buckets[0])
+
+        # fields not yet fetched are resolved on demand
+        del calls[:]
+        buckets[1]["c7n:DeniedMethods"] = ["get_bucket_tagging"]
+        source.resolve_fields(buckets, ("Tags", "Versioning"))
+        self.assertEqual(calls, ["get_bucket_tagging"])
+        self.assertEqual(buckets[0]["Tags"], [])
+        self.assertNotIn("Tags", buckets[1])
+
+
 class S3ConfigSource(ConfigTest):
 
     maxDiff = None
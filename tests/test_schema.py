@@ -13,18 +13,23 @@
 # limitations under the License.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import json
 import mock
+import os
+import shutil
 import sys
+import tempfile
 from jsonschema.exceptions import best_match
 
 from c7n.exceptions import PolicyValidationError
 from c7n.filters import ValueFilter
+from c7n import schema
 from c7n.resources import load_resources
 from c7n.schema import (
     StructureParser, ElementSchema, resource_vocabulary,
     JsonSchemaValidator, validate, generate,
     specific_error, policy_error_scope)
-from .common import BaseTest
+from .common import Bag, BaseTest
 
 
 class StructureParserTest(BaseTest):
@@ -112,6 +117,21 @@ class StructureParserTest(BaseTest):
                 {'resource': 'ec2'}, {'resource': 'gcp.instance'}]}),
             set(('aws.ec2', 'gcp.instance')))
 
+    def test_get_element_types(self):
+        p = StructureParser()
+        self.assertEqual(
+            p.get_element_types({'policies': [
+                {'resource': 'ec2',
+                 'mode': {'type': 'hub-finding'},
+                 'filters': [
+                     'marked-for-op',
+                     {'tag:Env': 'absent'},
+                     {'or': [{'type': 'finding'}, {'not': [{'type': 'value'}]}]}],
+                 'actions': ['stop', {'type': 'post-item'}]},
+                {'resource': 'sqs'}]}),
+            set(('hub-finding', 'marked-for-op', 'finding', 'value',
+                 'stop', 'post-item')))
+
 
 class SchemaTest(BaseTest):
 
@@ -140,6 +160,68 @@ class SchemaTest(BaseTest):
                 {"policies": []}),
             [])
 
+    def test_validator_cache(self):
+        self.addCleanup(schema.reset_validators)
+        schema.reset_validators()
+        load_resources(('aws.ec2', 'aws.ebs'))
+        validator = schema.get_validator(('aws.ec2', 'aws.ebs'))
+        self.assertIs(validator, schema.get_validator(['aws.ebs', 'aws.ec2']))
+        self.assertIsNot(validator, schema.get_validator(('aws.ec2',)))
+        self.assertEqual(
+            sorted(r['$ref'] for r in validator.schema[
+                'properties']['policies']['items']['anyOf']),
+            ['#/definitions/resources/aws.ebs/policy',
+             '#/definitions/resources/aws.ec2/policy'])
+        # unknown resource types validate against the full schema
+        self.assertIs(
+            schema.get_validator(('aws.ec2', 'aws.xyz')), schema.get_validator())
+
+    def test_persistent_schema_cache(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'schema')
+        self.addCleanup(shutil.rmtree, os.path.dirname(cache_dir))
+        self.addCleanup(schema.reset_validators)
+        self.patch(os, 'environ', dict(os.environ, C7N_SCHEMA_CACHE=cache_dir))
+
+        schema.reset_validators()
+        load_resources(('aws.sqs',))
+        validator = schema.get_validator(('aws.sqs',))
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        # a new process loads the persisted schema without generating it
+        schema.reset_validators()
+        with mock.patch('c7n.schema.generate') as gen:
+            cached = schema.get_validator(('aws.sqs',))
+        self.assertFalse(gen.called)
+        self.assertEqual(
+            cached.schema, json.loads(json.dumps(validator.schema)))
+
+        # the cache is keyed by custodian version
+        key = schema.get_schema_cache_key(('aws.sqs',))
+        with mock.patch('c7n.schema.version', '0.0.1'):
+            self.assertNotEqual(key, schema.get_schema_cache_key(('aws.sqs',)))
+        # and by the modification time of provider sources
+        with mock.patch('c7n.schema._package_mtime', return_value=0):
+            self.assertNotEqual(key, schema.get_schema_cache_key(('aws.sqs',)))
+
+    def test_package_mtime(self):
+        pkg_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pkg_dir)
+        init = os.path.join(pkg_dir, '__init__.py')
+        with open(init, 'w'):
+            pass
+        os.utime(init, (100, 100))
+        os.utime(pkg_dir, (100, 100))
+        self.patch(sys, 'modules', dict(sys.modules, xyzpkg=Bag(__file__=init)))
+        self.assertEqual(schema._package_mtime('xyzpkg'), 100)
+
+        os.utime(init, (200, 200))
+        self.assertEqual(schema._package_mtime('xyzpkg'), 200)
+
+        # removing a module updates its directory's time
+        os.utime(pkg_dir, (300, 300))
+        self.assertEqual(schema._package_mtime('xyzpkg'), 300)
+        self.assertIsNone(schema._package_mtime('xyzmissing'))
+
     def test_duplicate_policies(self):
         data = {
             "policies": [
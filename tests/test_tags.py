@@ -19,11 +19,14 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import time
 from mock import MagicMock, call
 
-from c7n.tags import universal_retry, coalesce_copy_user_tags
+from c7n.cache import ResourceSnapshot
+from c7n.tags import (
+    universal_retry, coalesce_copy_user_tags, get_universal_tag_types,
+    universal_augment, _get_arn_tags, _sweep_type_tags)
 from c7n.exceptions import PolicyExecutionError, PolicyValidationError
 from c7n.utils import yaml_load
 
-from .common import BaseTest
+from .common import BaseTest, Bag
 
 
 class UniversalAugmentTest(BaseTest):
@@ -47,6 +50,87 @@ class UniversalAugmentTest(BaseTest):
         results = policy.run()
         self.assertTrue('Tags' in results[0])
 
+    def test_universal_augment_arn_list(self):
+        client = MagicMock()
+        client.get_resources.side_effect = lambda ResourceARNList: {
+            'ResourceTagMappingList': [
+                {'ResourceARN': arn, 'Tags': [{'Key': 'App', 'Value': 'x'}]}
+                for arn in ResourceARNList if not arn.endswith('q2')]}
+        manager = Bag(retry=lambda func, **kw: func(**kw))
+        tag_key = {'account': '123456789012', 'region': 'us-east-1', 'resource': 'tags'}
+        arns = ['arn:aws:sqs:us-east-1:123456789012:q%d' % i for i in range(250)]
+
+        with ResourceSnapshot() as snapshot:
+            tag_map = _get_arn_tags(manager, client, snapshot, tag_key, arns)
+            self.assertEqual(client.get_resources.call_count, 3)
+            self.assertEqual(tag_map[arns[2]], [])
+            self.assertEqual(tag_map[arns[3]], [{'Key': 'App', 'Value': 'x'}])
+            # tags are cached run wide
+            _get_arn_tags(manager, client, snapshot, tag_key, arns[:5])
+            self.assertEqual(client.get_resources.call_count, 3)
+
+    def test_universal_augment_type_sweep(self):
+        classic = 'arn:aws:elasticloadbalancing:us-east-1:123456789012:loadbalancer/web'
+        app = 'arn:aws:elasticloadbalancing:us-east-1:123456789012:loadbalancer/app/web/1'
+        queue = 'arn:aws:sqs:us-east-1:123456789012:jobs'
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'ResourceTagMappingList': [
+                {'ResourceARN': arn, 'Tags': []} for arn in (classic, app, queue)]}]
+        tag_key = {'account': '123456789012', 'region': 'us-east-1', 'resource': 'tags'}
+        tag_types = [
+            'elasticloadbalancing:loadbalancer', 'elasticloadbalancing:loadbalancer/app', 'sqs:']
+
+        with ResourceSnapshot() as snapshot:
+            tag_map = _sweep_type_tags(client, snapshot, tag_key, tag_types)
+            self.assertEqual(list(tag_map), [classic])
+            [[app_map], [queue_map]] = snapshot.get_many(
+                [dict(tag_key, type=t) for t in tag_types[1:]], None)
+        self.assertEqual(list(app_map), [app])
+        self.assertEqual(list(queue_map), [queue])
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            ResourceTypeFilters=tag_types)
+
+    def test_universal_augment_type_sweep_batches(self):
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = []
+        tag_key = {'account': '123456789012', 'region': 'us-east-1', 'resource': 'tags'}
+        tag_types = ['svc%d:thing' % i for i in range(150)]
+
+        self.assertEqual(_sweep_type_tags(client, None, tag_key, tag_types), {})
+        self.assertEqual(
+            client.get_paginator.return_value.paginate.call_args_list,
+            [call(ResourceTypeFilters=tag_types[:100]),
+             call(ResourceTypeFilters=tag_types[100:])])
+
+    def test_universal_augment_large_set_no_hint(self):
+        arns = ['arn:aws:sqs:us-east-1:123456789012:q%d' % i for i in range(501)]
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'ResourceTagMappingList': [
+                {'ResourceARN': arns[0], 'Tags': [{'Key': 'App', 'Value': 'x'}]}]}]
+        manager = Bag(
+            resource_type=Bag(global_resource=False), region='us-east-1',
+            account_id='123456789012', get_arns=lambda resources: arns,
+            get_model=lambda: Bag(service='sqs', arn_service=None, arn_type=''),
+            session_factory=lambda *args, **kw: Bag(client=lambda *args, **kw: client))
+        resources = [{'QueueUrl': arn} for arn in arns]
+
+        # with no snapshot or hint, large sets sweep their own type
+        universal_augment(manager, resources)
+        self.assertEqual(resources[0]['Tags'], [{'Key': 'App', 'Value': 'x'}])
+        self.assertEqual(resources[1]['Tags'], [])
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            ResourceTypeFilters=['sqs:'])
+        client.get_resources.assert_not_called()
+
+    def test_universal_tag_types(self):
+        policies = [
+            self.load_policy({'name': 'queues', 'resource': 'sqs'}),
+            self.load_policy({'name': 'keys', 'resource': 'kms-key'}),
+            self.load_policy({'name': 'instances', 'resource': 'ec2'})]
+        self.assertEqual(get_universal_tag_types(policies), {'sqs:', 'kms:key'})
+
 
 class UniversalTagRetry(BaseTest):
 
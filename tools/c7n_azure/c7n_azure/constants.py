@@ -89,11 +89,20 @@ Threading Variable
 DEFAULT_MAX_THREAD_WORKERS = 3
 DEFAULT_CHUNK_SIZE = 20
 
+# Child resource enumeration and bulk get concurrency
+DEFAULT_MAX_QUERY_WORKERS = 10
+DEFAULT_QUERY_CHUNK_SIZE = 5
+
 """
 Custom Retry Code Variables
 """
 DEFAULT_MAX_RETRY_AFTER = 30
 
+# Requests to a subscription are slowed down once fewer than this many
+# reads or writes remain in its ARM quota (x-ms-ratelimit-remaining-*)
+DEFAULT_RATELIMIT_THRESHOLD = 100
+DEFAULT_RATELIMIT_BACKOFF = 2
+
 """
 KeyVault url templates
 """
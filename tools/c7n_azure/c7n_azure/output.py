@@ -52,6 +52,8 @@ class AzureStorageOutput(DirectoryOutput):
 
     DEFAULT_BLOB_FOLDER_PREFIX = '{policy_name}/{now:%Y/%m/%d/%H/}'
 
+    compress_resources = True
+
     log = logging.getLogger('custodian.azure.output.AzureStorageOutput')
 
     def __init__(self, ctx, config=None):
@@ -276,8 +276,7 @@ class AzureModeCommon:
                 buffer=False)
             policy.ctx.metrics.put_metric(
                 "ResourceTime", rt, "Seconds", Scope="Policy")
-            policy._write_file(
-                'resources.json', utils.dumps(resources, indent=2))
+            policy._write_resources(resources)
 
             if not resources:
                 policy.log.info(
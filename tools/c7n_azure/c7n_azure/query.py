@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import logging
+from functools import partial
 try:
     from collections.abc import Iterable
 except ImportError:
@@ -21,17 +22,19 @@ except ImportError:
 import six
 from c7n_azure import constants
 from c7n_azure.actions.logic_app import LogicAppAction
-from azure.mgmt.resourcegraph.models import QueryRequest
+from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
 from c7n_azure.actions.notify import Notify
 from c7n_azure.filters import ParentFilter
 from c7n_azure.provider import resources
+from c7n_azure.utils import ThreadHelper
 
 from c7n.actions import ActionRegistry
 from c7n.exceptions import PolicyValidationError
 from c7n.filters import FilterRegistry
+from c7n.filters.core import BooleanGroupFilter, ValueFilter
 from c7n.manager import ResourceManager
 from c7n.query import sources, MaxResourceLimit
-from c7n.utils import local_session
+from c7n.utils import chunks, local_session
 
 log = logging.getLogger('custodian.azure.query')
 
@@ -99,6 +102,36 @@ class DescribeSource(object):
 
 @sources.register('resource-graph')
 class ResourceGraphSource(object):
+    """Query resources in bulk via the Azure Resource Graph.
+
+    Resources are returned in the same shape as the describe source,
+    so filters and actions work unchanged. Resources from several
+    subscriptions can be fetched at once by listing them in the
+    policy's query block, by default the session's subscription is used.
+    Filter and action clients are bound to the session's subscription,
+    so a policy querying any other subscription is limited to value
+    filters and notify actions.
+
+    .. code-block:: yaml
+
+       policies:
+         - name: storage-accounts
+           resource: azure.storage
+           source: resource-graph
+           query:
+             - subscriptions:
+                 - ea42f556-5106-4743-99b0-c129bfa71a47
+                 - 9a8b8f0e-4f8b-4b4a-8f8b-4f8b4b4a8f8b
+    """
+
+    # columns of a resource graph row which are part of the arm resource shape
+    columns = (
+        'id', 'name', 'type', 'kind', 'location', 'managedBy', 'sku',
+        'plan', 'properties', 'tags', 'identity', 'zones')
+
+    # max page size and max subscriptions per resource graph query
+    page_size = 1000
+    subscription_batch_size = 1000
 
     def __init__(self, manager):
         self.manager = manager
@@ -108,28 +141,100 @@ class ResourceGraphSource(object):
             raise PolicyValidationError(
                 "%s is not supported with the Azure Resource Graph source."
                 % self.manager.data['resource'])
+        # a single listed subscription is checked against the session's
+        # when resources are fetched.
+        if len(set(s.lower() for s in self.get_query_subscriptions())) > 1:
+            self.validate_subscription_scope()
 
-    def get_resources(self, _):
-        log.warning('The Azure Resource Graph source '
-                    'should not be used in production scenarios at this time.')
+    def validate_subscription_scope(self):
+        """Reject filters and actions bound to the session's subscription.
+
+        Their clients would process resources of other subscriptions
+        against the session's subscription.
+        """
+        for f in self.iter_filters(self.manager.filters):
+            if type(f) is not ValueFilter:
+                raise PolicyValidationError(
+                    "%s filter is not supported when querying other subscriptions "
+                    "with the Azure Resource Graph source." % f.type)
+        for a in self.manager.actions:
+            if not isinstance(a, Notify):
+                raise PolicyValidationError(
+                    "%s action is not supported when querying other subscriptions "
+                    "with the Azure Resource Graph source." % a.type)
+
+    @classmethod
+    def iter_filters(cls, filters):
+        for f in filters:
+            if isinstance(f, BooleanGroupFilter):
+                for child in cls.iter_filters(f.filters):
+                    yield child
+            else:
+                yield f
+
+    def get_query_subscriptions(self):
+        subscriptions = []
+        for q in self.manager.data.get('query', ()):
+            subscriptions.extend(q.get('subscriptions', ()))
+        return subscriptions
+
+    def get_subscriptions(self, session):
+        return self.get_query_subscriptions() or [session.get_subscription_id()]
+
+    def get_query(self):
+        query = []
+        resource_type = self.manager.resource_type.resource_type
+        # the generic arm resource type queries all resources
+        if resource_type != 'armresource':
+            query.append("where type =~ '%s'" % resource_type)
+        query.append("project %s" % ", ".join(self.columns))
+        return " | ".join(query)
 
+    def get_resources(self, _):
         session = self.manager.get_session()
+        subscriptions = self.get_subscriptions(session)
+        if set(s.lower() for s in subscriptions) != {session.get_subscription_id().lower()}:
+            self.validate_subscription_scope()
         client = session.client('azure.mgmt.resourcegraph.ResourceGraphClient')
+        query = self.get_query()
+
+        resources = []
+        for subscriptions in chunks(subscriptions, self.subscription_batch_size):
+            skip_token = None
+            while True:
+                response = client.resources(QueryRequest(
+                    query=query,
+                    subscriptions=subscriptions,
+                    options=QueryRequestOptions(
+                        top=self.page_size, skip_token=skip_token)))
+                resources.extend(
+                    self.normalize(r) for r in self.get_rows(response.data))
+                skip_token = response.skip_token
+                if not skip_token:
+                    break
+        return resources
 
-        # empty scope will return all resource
-        query_scope = ""
-        if self.manager.resource_type.resource_type != 'armresource':
-            query_scope = "where type =~ '%s'" % self.manager.resource_type.resource_type
-
-        query = QueryRequest(
-            query=query_scope,
-            subscriptions=[session.get_subscription_id()]
-        )
-        res = client.resources(query)
-        cols = [c['name'] for c in res.data['columns']]
-        data = [dict(zip(cols, r)) for r in res.data['rows']]
+    @staticmethod
+    def get_rows(data):
+        # table formatted results are a dict of columns and rows,
+        # object array formatted results are already a list of dicts.
+        if isinstance(data, dict):
+            cols = [c['name'] for c in data['columns']]
+            return [dict(zip(cols, r)) for r in data['rows']]
         return data
 
+    def normalize(self, resource):
+        """Normalize a resource graph row to the describe source shape.
+
+        Null columns are dropped as arm omits unset attributes, and
+        resource graph lower cases resource types.
+        """
+        resource = {k: v for k, v in resource.items() if v is not None}
+        resource_type = self.manager.resource_type.resource_type
+        if resource.get('type', '').lower() == resource_type.lower():
+            resource['type'] = resource_type
+        return resource
+
     def get_permissions(self):
         return ()
 
@@ -145,13 +250,31 @@ class ChildResourceQuery(ResourceQuery):
 
     def filter(self, resource_manager, **params):
         """Query a set of resources."""
-        m = self.resolve(resource_manager.resource_type)  # type: ChildTypeInfo
-
         parents = resource_manager.get_parent_manager()
 
         # Have to query separately for each parent's children.
+        results, exceptions = ThreadHelper.execute_in_parallel(
+            resources=parents.resources(),
+            event=None,
+            execution_method=self._process_parent_set,
+            executor_factory=resource_manager.executor_factory,
+            log=log,
+            max_workers=constants.DEFAULT_MAX_QUERY_WORKERS,
+            chunk_size=constants.DEFAULT_QUERY_CHUNK_SIZE,
+            resource_manager=resource_manager,
+            parent_id_key=parents.resource_type.id,
+            params=params
+        )
+        if exceptions:
+            raise exceptions[0]
+
+        return results
+
+    def _process_parent_set(self, parent_set, event, resource_manager, parent_id_key, params):
+        m = self.resolve(resource_manager.resource_type)  # type: ChildTypeInfo
+
         results = []
-        for parent in parents.resources():
+        for parent in parent_set:
             try:
                 subset = resource_manager.enumerate_resources(parent, m, **params)
 
@@ -159,13 +282,13 @@ class ChildResourceQuery(ResourceQuery):
                     # If required, append parent resource ID to all child resources
                     if m.annotate_parent:
                         for r in subset:
-                            r[m.parent_key] = parent[parents.resource_type.id]
+                            r[m.parent_key] = parent[parent_id_key]
 
                     results.extend(subset)
 
             except Exception as e:
                 log.warning('Child enumeration failed for {0}. {1}'
-                            .format(parent[parents.resource_type.id], e))
+                            .format(parent[parent_id_key], e))
                 if m.raise_on_exception:
                     raise e
 
@@ -261,7 +384,8 @@ class QueryResourceManager(ResourceManager):
         return self.get_session().client(service)
 
     def get_cache_key(self, query):
-        return {'source_type': self.source_type, 'query': query}
+        return {'source_type': self.source_type, 'query': query,
+                'policy_query': self.data.get('query')}
 
     @classmethod
     def get_model(cls):
@@ -311,12 +435,27 @@ class QueryResourceManager(ResourceManager):
             params.update(extra_args)
 
         op = getattr(getattr(resource_client, get_client), get_op)
-        data = [
-            op(rid, **params)
-            for rid in resource_ids
-        ]
+        data = self.bulk_get(resource_ids, partial(op, **params))
         return [r.serialize(True) for r in data]
 
+    def bulk_get(self, resource_ids, get_op):
+        """Get the resources with the given ids concurrently.
+
+        :param get_op: callable returning the resource for an id
+        """
+        data, exceptions = ThreadHelper.execute_in_parallel(
+            resources=list(resource_ids),
+            event=None,
+            execution_method=lambda ids, event: [get_op(rid) for rid in ids],
+            executor_factory=self.executor_factory,
+            log=log,
+            max_workers=constants.DEFAULT_MAX_QUERY_WORKERS,
+            chunk_size=constants.DEFAULT_QUERY_CHUNK_SIZE
+        )
+        if exceptions:
+            raise exceptions[0]
+        return data
+
     @staticmethod
     def register_actions_and_filters(registry, resource_class):
         resource_class.action_registry.register('notify', Notify)
@@ -58,10 +58,10 @@ class ArmResourceManager(QueryResourceManager):
 
     def get_resources(self, resource_ids):
         resource_client = self.get_client('azure.mgmt.resource.ResourceManagementClient')
-        data = [
-            resource_client.resources.get_by_id(rid, self._session.resource_api_version(rid))
-            for rid in resource_ids
-        ]
+        data = self.bulk_get(
+            resource_ids,
+            lambda rid: resource_client.resources.get_by_id(
+                rid, self._session.resource_api_version(rid)))
         return self.augment([r.serialize(True) for r in data])
 
     def tag_operation_enabled(self, resource_type):
@@ -79,16 +79,16 @@ class GenericArmResource(ArmResourceManager):
 
     def get_resources(self, resource_ids):
         client = self.get_client()
-        result = []
 
-        for rid in resource_ids:
-            resource = None
+        def get_resource(rid):
             if is_resource_group_id(rid):
                 resource = client.resource_groups.get(ResourceIdParser.get_resource_group(rid))
                 resource.type = RESOURCE_GROUPS_TYPE
             else:
                 resource = client.resources.get_by_id(rid, self._session.resource_api_version(rid))
-            result.append(resource)
+            return resource
+
+        result = self.bulk_get(resource_ids, get_resource)
 
         return self.augment([r.serialize(True) for r in result])
 
@@ -28,8 +28,9 @@ from azure.common.credentials import (BasicTokenAuthentication,
                                       ServicePrincipalCredentials)
 from azure.keyvault import KeyVaultAuthentication, AccessToken
 from c7n_azure import constants
-from c7n_azure.utils import (ResourceIdParser, StringUtils, custodian_azure_send_override,
-                             ManagedGroupHelper, get_keyvault_secret)
+from c7n_azure.utils import (RateLimitTracker, ResourceIdParser, StringUtils,
+                             custodian_azure_send_override, ManagedGroupHelper,
+                             get_keyvault_secret)
 from msrest.exceptions import AuthenticationError
 from msrestazure.azure_active_directory import MSIAuthentication
 from requests import HTTPError
@@ -68,6 +69,7 @@ class Session(object):
         self.resource_namespace = resource
         self.authorization_file = authorization_file
         self._auth_params = {}
+        self._rate_limit_tracker = RateLimitTracker()
 
     @property
     def auth_params(self):
@@ -188,6 +190,7 @@ class Session(object):
         # Override send() method to log request limits & custom retries
         service_client = client._client
         service_client.orig_send = service_client.send
+        service_client.rate_limit_tracker = self._rate_limit_tracker
         service_client.send = types.MethodType(custodian_azure_send_override, service_client)
 
         # Don't respect retry_after_header to implement custom retries
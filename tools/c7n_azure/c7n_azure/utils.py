@@ -18,9 +18,9 @@ import hashlib
 import itertools
 import logging
 import re
+import threading
 import time
 import uuid
-from concurrent.futures import as_completed
 
 import six
 from azure.graphrbac.models import DirectoryObject, GetObjectsParameters
@@ -143,12 +143,15 @@ def custodian_azure_send_override(self, request, headers=None, content=None, **k
     retries = 0
     max_retries = 3
     while retries < max_retries:
+        url = getattr(request, 'url', None)
+        self.rate_limit_tracker.wait(url)
         response = self.orig_send(request, headers, content, **kwargs)
 
         send_logger.debug(response.status_code)
         for k, v in response.headers.items():
             if k.startswith('x-ms-ratelimit'):
                 send_logger.debug(k + ':' + v)
+        self.rate_limit_tracker.update(url, response.headers)
 
         # Retry codes from urllib3/util/retry.py
         if response.status_code in [413, 429, 503]:
@@ -172,6 +175,50 @@ def custodian_azure_send_override(self, request, headers=None, content=None, **k
     return response
 
 
+class RateLimitTracker(object):
+    """Tracks the remaining ARM request quota of each subscription.
+
+    ARM reports the remaining reads and writes of a subscription's quota
+    in the x-ms-ratelimit-remaining-subscription-* response headers, once
+    they run low further requests to the subscription back off so that
+    concurrent enumeration doesn't exhaust the quota and get throttled.
+
+    A tracker is shared by the clients of a session.
+    """
+
+    SUBSCRIPTION_ID = re.compile(r'/subscriptions/([^/?]+)', re.IGNORECASE)
+    HEADER_PREFIX = 'x-ms-ratelimit-remaining-subscription-'
+
+    def __init__(self):
+        self.remaining = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_subscription_id(cls, url):
+        match = url and cls.SUBSCRIPTION_ID.search(url)
+        return match and match.group(1).lower()
+
+    def update(self, url, headers):
+        subscription_id = self.get_subscription_id(url)
+        if not subscription_id:
+            return
+        quota = [int(v) for k, v in headers.items()
+                 if k.lower().startswith(self.HEADER_PREFIX) and str(v).isdigit()]
+        if quota:
+            with self.lock:
+                self.remaining[subscription_id] = min(quota)
+
+    def wait(self, url):
+        subscription_id = self.get_subscription_id(url)
+        remaining = self.remaining.get(subscription_id)
+        if remaining is None or remaining >= constants.DEFAULT_RATELIMIT_THRESHOLD:
+            return
+        send_logger.warning(
+            "Subscription %s has %d requests remaining in its quota, backing off"
+            % (subscription_id, remaining))
+        time.sleep(constants.DEFAULT_RATELIMIT_BACKOFF)
+
+
 class ThreadHelper:
 
     disable_multi_threading = False
@@ -197,7 +244,8 @@ class ThreadHelper:
                 for resource_set in chunks(resources, chunk_size):
                     futures.append(w.submit(execution_method, resource_set, event, **kwargs))
 
-                for f in as_completed(futures):
+                # collect results in submission order, so they are deterministic
+                for f in futures:
                     if f.exception():
                         log.error(
                             "Execution failed with error: %s" % f.exception())
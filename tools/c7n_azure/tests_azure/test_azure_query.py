@@ -18,6 +18,7 @@ import logging
 from .azure_common import BaseTest, arm_template
 from .azure_common import cassette_name
 from c7n_azure.session import Session
+from c7n_azure.utils import ThreadHelper
 from mock import mock, patch
 
 from c7n.exceptions import ResourceLimitExceeded
@@ -91,6 +92,51 @@ class QueryResourceManagerTest(BaseTest):
                     'Failed to query resource.'
                     '\nType: azure.resourcegroup.\nError: test query exception')
 
+    @patch('c7n_azure.utils.ThreadHelper.disable_multi_threading', False)
+    def test_child_query_parallel(self):
+        p = self.load_policy({'name': 'sqldb', 'resource': 'azure.sqldatabase'})
+        manager = p.resource_manager
+        parents = [{'id': 'server-%d' % i} for i in range(12)]
+        parent_manager = mock.MagicMock()
+        parent_manager.resources.return_value = parents
+        parent_manager.resource_type.id = 'id'
+
+        def enumerate_resources(parent, type_info, **params):
+            return [{'id': '%s/db' % parent['id']}]
+
+        with patch.object(manager, 'get_parent_manager', return_value=parent_manager), \
+                patch.object(manager, 'enumerate_resources', side_effect=enumerate_resources):
+            resources = manager.source.get_resources(None)
+
+        self.assertFalse(ThreadHelper.disable_multi_threading)
+        self.assertEqual(
+            sorted((r['id'], r['c7n:parent-id']) for r in resources),
+            sorted(('%s/db' % s['id'], s['id']) for s in parents))
+
+    @patch('c7n_azure.utils.ThreadHelper.disable_multi_threading', False)
+    def test_child_query_parallel_exception(self):
+        p = self.load_policy({'name': 'sqldb', 'resource': 'azure.sqldatabase'})
+        manager = p.resource_manager
+        parent_manager = mock.MagicMock()
+        parent_manager.resources.return_value = [{'id': 'a'}, {'id': 'b'}]
+        parent_manager.resource_type.id = 'id'
+
+        with patch.object(manager, 'get_parent_manager', return_value=parent_manager), \
+                patch.object(manager, 'enumerate_resources', side_effect=ValueError('x')):
+            self.assertRaises(ValueError, manager.source.get_resources, None)
+
+    @patch('c7n_azure.utils.ThreadHelper.disable_multi_threading', False)
+    def test_bulk_get(self):
+        p = self.load_policy({'name': 'vm', 'resource': 'azure.vm'})
+        ids = ['vm-%d' % i for i in range(12)]
+
+        resources = p.resource_manager.bulk_get(ids, lambda rid: {'id': rid})
+        self.assertEqual(sorted(r['id'] for r in resources), sorted(ids))
+
+        def get_op(rid):
+            raise ValueError(rid)
+        self.assertRaises(ValueError, p.resource_manager.bulk_get, ids, get_op)
+
     @staticmethod
     def _get_resource_group_client_api_string():
         return local_session(Session) \
@@ -19,7 +19,8 @@ import types
 from .azure_common import BaseTest, DEFAULT_SUBSCRIPTION_ID
 from c7n_azure.tags import TagHelper
 from c7n_azure.utils import (AppInsightsHelper, ManagedGroupHelper, Math, PortsRangeHelper,
-                             ResourceIdParser, StringUtils, custodian_azure_send_override,
+                             RateLimitTracker, ResourceIdParser, StringUtils,
+                             custodian_azure_send_override,
                              get_keyvault_secret, get_service_tag_ip_space, is_resource_group_id,
                              is_resource_group)
 from mock import patch, Mock
@@ -319,3 +320,29 @@ class UtilsTest(BaseTest):
     def test_is_resource_group(self):
         self.assertTrue(is_resource_group({'type': 'resourceGroups'}))
         self.assertFalse(is_resource_group({'type': 'virtualMachines'}))
+
+    @patch('c7n_azure.utils.time.sleep')
+    def test_rate_limit_tracker(self, sleep):
+        mock = Mock()
+        mock.rate_limit_tracker = RateLimitTracker()
+        mock.send = types.MethodType(custodian_azure_send_override, mock)
+
+        response_dict = {
+            'headers': {'x-ms-ratelimit-remaining-subscription-reads': '50',
+                        'x-ms-ratelimit-remaining-subscription-writes': '1199'},
+            'status_code': 200
+        }
+        mock.orig_send.return_value = type(str('response'), (), response_dict)
+        request = Mock(url='https://management.azure.com' + RESOURCE_ID)
+
+        mock.send(request)
+        self.assertEqual(
+            mock.rate_limit_tracker.remaining, {DEFAULT_SUBSCRIPTION_ID.lower(): 50})
+        self.assertEqual(sleep.call_count, 0)
+
+        mock.send(request)
+        self.assertEqual(sleep.call_count, 1)
+
+        # requests to other subscriptions are unaffected
+        mock.send(Mock(url='https://management.azure.com/subscriptions/%s' % GUID))
+        self.assertEqual(sleep.call_count, 1)
@@ -14,8 +14,9 @@
 import json
 from datetime import timedelta
 
+from mock import MagicMock
 from six import string_types
-from tests_azure.azure_common import BaseTest, arm_template
+from tests_azure.azure_common import BaseTest, DEFAULT_SUBSCRIPTION_ID, arm_template
 from dateutil.parser import parse
 
 from c7n.exceptions import PolicyValidationError
@@ -40,6 +41,44 @@ class ResourceGraphSource(BaseTest):
             })
             self.assertTrue(p)
 
+    def test_resource_graph_validate_subscriptions(self):
+        policy = {
+            'name': 'test-azure-storage-subscriptions',
+            'resource': 'azure.storage',
+            'source': 'resource-graph',
+            'query': [{'subscriptions': ['sub-a', 'sub-b']}],
+            'filters': [{'or': [{'name': 'a'}, {'tag:App': 'absent'}]}],
+            'actions': [{'type': 'notify', 'template': 'default',
+                         'subject': 'test', 'to': ['user@example.com'],
+                         'transport': {'type': 'asq',
+                                       'queue': 'https://test.queue.core.windows.net/q'}}]}
+        self.assertTrue(self.load_policy(policy, validate=True))
+
+        # filters and actions with clients bound to the session's subscription
+        with self.assertRaises(PolicyValidationError):
+            self.load_policy(dict(policy, filters=[
+                {'type': 'metric', 'metric': 'Transactions', 'op': 'gt', 'threshold': 0}]),
+                validate=True)
+        with self.assertRaises(PolicyValidationError):
+            self.load_policy(dict(policy, actions=[{'type': 'tag', 'tag': 'a', 'value': 'b'}]),
+                             validate=True)
+
+        # a single subscription is checked against the session's when fetching
+        tag_policy = dict(policy, actions=[{'type': 'tag', 'tag': 'a', 'value': 'b'}])
+        p = self.load_policy(
+            dict(tag_policy, query=[{'subscriptions': ['sub-a']}]), validate=True)
+        with self.assertRaises(PolicyValidationError):
+            p.resource_manager.source.get_resources(None)
+
+        p = self.load_policy(
+            dict(tag_policy, query=[{'subscriptions': [DEFAULT_SUBSCRIPTION_ID.upper()]}]),
+            validate=True)
+        session = MagicMock()
+        session.get_subscription_id.return_value = DEFAULT_SUBSCRIPTION_ID
+        session.client.return_value.resources.return_value = MagicMock(data=[], skip_token=None)
+        p.resource_manager._session = session
+        self.assertEqual(p.resource_manager.source.get_resources(None), [])
+
     @arm_template('storage.json')
     def test_resource_graph_and_arm_sources_storage_are_equivalent(self):
         p1 = self.load_policy({
@@ -104,6 +143,48 @@ class ResourceGraphSource(BaseTest):
         self.assertTrue(
             resource_cmp(resources_arm, resources_resource_graph, ignore_properties=['resources']))
 
+    def test_resource_graph_paging_and_subscriptions(self):
+        p = self.load_policy({
+            'name': 'test-azure-storage-arm-source',
+            'resource': 'azure.storage',
+            'source': 'resource-graph',
+            'query': [{'subscriptions': ['sub-a', 'sub-b', 'sub-c']}],
+        })
+        source = p.resource_manager.source
+        source.subscription_batch_size = 2
+
+        pages = {
+            (('sub-a', 'sub-b'), None): (
+                {'columns': [{'name': 'id'}, {'name': 'type'}, {'name': 'sku'}],
+                 'rows': [['a1', 'microsoft.storage/storageaccounts', None]]},
+                'page-2'),
+            (('sub-a', 'sub-b'), 'page-2'): (
+                [{'id': 'b1', 'type': 'microsoft.storage/storageaccounts',
+                  'sku': {'name': 'Standard_LRS'}}], None),
+            (('sub-c',), None): (
+                {'columns': [{'name': 'id'}], 'rows': [['c1']]}, None)}
+        queries = []
+
+        def resources(request):
+            queries.append(request.query)
+            data, skip_token = pages[
+                (tuple(request.subscriptions), request.options.skip_token)]
+            return MagicMock(data=data, skip_token=skip_token)
+
+        session = MagicMock()
+        session.client.return_value.resources.side_effect = resources
+        p.resource_manager._session = session
+
+        resources = source.get_resources(None)
+        self.assertEqual(resources, [
+            {'id': 'a1', 'type': 'Microsoft.Storage/storageAccounts'},
+            {'id': 'b1', 'type': 'Microsoft.Storage/storageAccounts',
+             'sku': {'name': 'Standard_LRS'}},
+            {'id': 'c1'}])
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(queries[0].startswith(
+            "where type =~ 'Microsoft.Storage/storageAccounts' | project id, name, type"))
+
 
 def resource_cmp(res1, res2, ignore_properties=[]):
     """
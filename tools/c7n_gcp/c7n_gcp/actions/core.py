@@ -75,20 +75,20 @@ class MethodAction(Action):
     def process_resource_set(self, client, model, resources):
         result_key = self.method_spec.get('result_key')
         annotation_key = self.method_spec.get('annotation_key')
-        for resource in resources:
-            op_name = self.get_operation_name(model, resource)
-            params = self.get_resource_params(model, resource)
-            result = self.invoke_api(client, op_name, params)
-            if result_key and annotation_key:
+        requests = [(self.get_operation_name(model, r), self.get_resource_params(model, r))
+                    for r in resources]
+        results = self.invoke_batch_api(client, requests)
+        for resource, result in zip(resources, results):
+            if result_key and annotation_key and not isinstance(result, HttpError):
                 resource[annotation_key] = result.get(result_key)
 
-    def invoke_api(self, client, op_name, params):
-        try:
-            return client.execute_command(op_name, params)
-        except HttpError as e:
-            if e.resp.status in self.ignore_error_codes:
-                return e
-            raise
+    def invoke_batch_api(self, client, requests):
+        results = client.execute_batch(requests)
+        for result in results:
+            if isinstance(result, HttpError) and (
+                    result.resp.status not in self.ignore_error_codes):
+                raise result
+        return results
 
     def get_operation_name(self, model, resource):
         return self.method_spec['op']
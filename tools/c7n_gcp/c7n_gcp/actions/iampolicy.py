@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from googleapiclient.errors import HttpError
+
 from c7n.utils import local_session, type_schema
 from c7n_gcp.actions import MethodAction
 
@@ -104,8 +106,29 @@ class SetIamPolicy(MethodAction):
         :param model: the parameters that are defined in a resource manager
         :param resource: the resource the action is applied to
         """
+        return self._get_policy_params(
+            resource, self._get_existing_bindings(model, resource))
+
+    def process_resource_set(self, client, model, resources):
+        """
+        Fetches the existing policies of all the resources in a single batch, then sets the
+        updated policies in another one.
+        """
+        policies = self.invoke_batch_api(
+            client, [('getIamPolicy', self._verb_arguments(r)) for r in resources])
+        self.invoke_batch_api(client, [
+            (self.get_operation_name(model, r),
+             self._get_policy_params(r, p.get('bindings', [])))
+            for r, p in zip(resources, policies) if not isinstance(p, HttpError)])
+
+    def _get_policy_params(self, resource, existing_bindings):
+        """
+        Returns the 'setIamPolicy' parameters for the resource given its existing bindings.
+
+        :param resource: the same as in `get_resource_params`
+        :param existing_bindings: a list of the bindings the resource currently has
+        """
         params = self._verb_arguments(resource)
-        existing_bindings = self._get_existing_bindings(model, resource)
         add_bindings = self.data['add-bindings'] if 'add-bindings' in self.data else []
         remove_bindings = self.data['remove-bindings'] if 'remove-bindings' in self.data else []
         bindings_to_set = self._add_bindings(existing_bindings, add_bindings)
@@ -28,6 +28,7 @@ import threading
 import os
 import socket
 import ssl
+import time
 
 from googleapiclient import discovery, errors  # NOQA
 from googleapiclient.http import set_user_agent
@@ -42,6 +43,8 @@ from retrying import retry
 from six.moves import http_client
 from six.moves.urllib.error import URLError
 
+from c7n_gcp.query import extract_error
+
 HTTPLIB_CA_BUNDLE = os.environ.get('HTTPLIB_CA_BUNDLE')
 
 CLOUD_SCOPES = frozenset(['https://www.googleapis.com/auth/cloud-platform'])
@@ -57,6 +60,13 @@ log = logging.getLogger('c7n_gcp.client')
 # Default value num_retries within HttpRequest execute method
 NUM_HTTP_RETRIES = 5
 
+# Max number of sub requests google batch endpoints accept per batch.
+BATCH_MAX_REQUESTS = 100
+
+# Sub request statuses and error reasons that are retried in a batch.
+BATCH_RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+BATCH_RETRY_REASONS = frozenset(('rateLimitExceeded', 'userRateLimitExceeded'))
+
 RETRYABLE_EXCEPTIONS = (
     http_client.ResponseNotReady,
     http_client.IncompleteRead,
@@ -83,6 +93,22 @@ def is_retryable_exception(e):
     return isinstance(e, RETRYABLE_EXCEPTIONS)
 
 
+def is_retryable_batch_error(response):
+    """Whether a batched sub request response should be retried.
+
+    Args:
+        response (object): Service Response or HttpError.
+
+    Returns:
+        bool: True for rate limit and server errors. False otherwise.
+    """
+    if not isinstance(response, errors.HttpError):
+        return False
+    if response.resp.status in BATCH_RETRY_STATUS:
+        return True
+    return extract_error(response) in BATCH_RETRY_REASONS
+
+
 @retry(retry_on_exception=is_retryable_exception,
        wait_exponential_multiplier=1000,
        wait_exponential_max=10000,
@@ -149,6 +175,7 @@ class Session(object):
                  use_rate_limiter=False,
                  http=None,
                  project_id=None,
+                 use_batch=True,
                  **kwargs):
         """Constructor.
 
@@ -162,6 +189,8 @@ class Session(object):
             quota_period (float): The time period to track requests over.
             use_rate_limiter (bool): Set to false to disable the use of a rate
                 limiter for this service.
+            use_batch (bool): Set to false to execute batches of requests
+                individually instead of via the api's batch endpoint.
             **kwargs (dict): Additional args such as version.
         """
         self._use_cached_http = False
@@ -176,6 +205,7 @@ class Session(object):
         else:
             self._rate_limiter = None
         self._http = http
+        self._use_batch = use_batch
 
         self.project_id = project_id
 
@@ -230,6 +260,7 @@ class Session(object):
             credentials=self._credentials,
             rate_limiter=self._rate_limiter,
             use_cached_http=self._use_cached_http,
+            use_batch=self._use_batch,
             http=self._http)
 
 
@@ -241,7 +272,8 @@ class ServiceClient(object):
                  num_retries=NUM_HTTP_RETRIES, key_field='project',
                  entity_field=None, list_key_field=None, get_key_field=None,
                  max_results_field='maxResults', search_query_field='query',
-                 rate_limiter=None, use_cached_http=True, http=None):
+                 rate_limiter=None, use_cached_http=True, use_batch=True,
+                 http=None):
         """Constructor.
 
         Args:
@@ -269,6 +301,8 @@ class ServiceClient(object):
             use_cached_http (bool): If set to true, calls to the API will use
                 a thread local shared http object. When false a new http object
                 is used for each request.
+            use_batch (bool): If set to true, execute_batch sends requests
+                via the api's batch endpoint.
         """
         self.gcp_service = gcp_service
         self._credentials = credentials
@@ -296,6 +330,7 @@ class ServiceClient(object):
         self._rate_limiter = rate_limiter
 
         self._use_cached_http = use_cached_http
+        self._use_batch = use_batch
         self._local = LOCAL_THREAD
         self._http_replay = http
 
@@ -306,7 +341,7 @@ class ServiceClient(object):
         Returns:
             httplib2.Http: An Http instance authorized by the credentials.
         """
-        if self._use_cached_http and hasattr(self._local, 'http'):
+        if self._use_cached_http and getattr(self._local, 'http', None) is not None:
             return self._local.http
         if self._http_replay is not None:
             # httplib2 instance is not thread safe
@@ -458,6 +493,111 @@ class ServiceClient(object):
         request = self._build_request(verb, verb_arguments)
         return self._execute(request)
 
+    def execute_batch(self, requests):
+        """Executes many commands or queries via the api's batch endpoint.
+
+        Requests are sent in batches of up to BATCH_MAX_REQUESTS, sub
+        requests failing with a rate limit or server error are retried
+        with exponential backoff.
+
+        Args:
+            requests (list): (verb, verb_arguments) tuples.
+
+        Returns:
+            list: A Service Response or an HttpError per request, in the
+                order of requests.
+        """
+        if not self._use_batch:
+            return [self._execute_one(self._build_request(verb, args))
+                    for verb, args in requests]
+
+        results = [None] * len(requests)
+        pending = list(range(len(requests)))
+        attempt = 0
+        while pending:
+            retries = []
+            for idx_set in [pending[i:i + BATCH_MAX_REQUESTS] for i in range(
+                    0, len(pending), BATCH_MAX_REQUESTS)]:
+                responses = self._execute_batch(
+                    [(idx, self._build_request(*requests[idx])) for idx in idx_set])
+                for idx, response in responses.items():
+                    results[idx] = response
+                    if attempt < self._num_retries and is_retryable_batch_error(response):
+                        retries.append(idx)
+            pending = retries
+            if pending:
+                attempt += 1
+                log.debug('Retrying %d batched requests, attempt #%d',
+                          len(pending), attempt)
+                time.sleep(min(2 ** attempt, 10))
+        return results
+
+    def _execute_one(self, request):
+        try:
+            return self._execute(request)
+        except errors.HttpError as e:
+            return e
+
+    def _execute_batch(self, requests):
+        """Run a single batch request with retries and rate limiting.
+
+        Args:
+            requests (list): (request_id, HttpRequest) tuples.
+
+        Returns:
+            dict: The response or HttpError for each request id.
+        """
+        responses = {}
+        self._send_batch(requests, responses)
+        return responses
+
+    @retry(retry_on_exception=is_retryable_exception,
+           wait_exponential_multiplier=1000,
+           wait_exponential_max=10000,
+           stop_max_attempt_number=5)
+    def _send_batch(self, requests, responses):
+        """Send the requests without a recorded response as one batch.
+
+        A transport error may interrupt a batch after some of its sub
+        requests were answered, so retries only resend the remainder.
+
+        Args:
+            requests (list): (request_id, HttpRequest) tuples.
+            responses (dict): The response or HttpError per request id,
+                updated as sub request responses are received.
+        """
+        requests = [(request_id, request) for request_id, request in requests
+                    if request_id not in responses]
+        if not requests:
+            return
+
+        def callback(request_id, response, exception):
+            responses[int(request_id)] = exception or response
+
+        http = self.http
+        batch = self.gcp_service.new_batch_http_request(callback=callback)
+        for request_id, request in requests:
+            request.http = http
+            batch.add(request, request_id=str(request_id))
+
+        # each request in a batch counts against the api's quota
+        self._acquire_quota(len(requests))
+        batch.execute(http=http)
+
+    def _acquire_quota(self, count):
+        """Block until the rate limiter allows count more api calls.
+
+        Args:
+            count (int): The number of calls to acquire.
+        """
+        if not self._rate_limiter:
+            return
+        for _ in range(count):
+            # the ratelimiter library only exposes a context manager
+            # interface, entering it blocks until a call is available.
+            with self._rate_limiter:
+                pass
+
     @retry(retry_on_exception=is_retryable_exception,
            wait_exponential_multiplier=1000,
            wait_exponential_max=10000,
@@ -174,6 +174,8 @@ class StackDriverLogging(LogOutput):
 @blob_outputs.register('gs')
 class GCPStorageOutput(DirectoryOutput):
 
+    compress_resources = True
+
     def __init__(self, ctx, config=None):
         super(GCPStorageOutput, self).__init__(ctx, config)
         self.date_path = datetime.datetime.now().strftime('%Y/%m/%d/%H')
@@ -17,6 +17,8 @@ import json
 import logging
 import six
 
+from functools import partial
+
 from googleapiclient.errors import HttpError
 
 from c7n.actions import ActionRegistry
@@ -129,6 +131,7 @@ class QueryResourceManager(ResourceManager):
 
     def get_cache_key(self, query):
         return {'source_type': self.source_type, 'query': query,
+                'project': self.config.account_id,
                 'service': self.resource_type.service,
                 'version': self.resource_type.version,
                 'component': self.resource_type.component}
@@ -147,8 +150,18 @@ class QueryResourceManager(ResourceManager):
     def resources(self, query=None):
         q = query or self.get_resource_query()
         key = self.get_cache_key(q)
-        resources = self._fetch_resources(q)
-        self._cache.save(key, resources)
+        resources = None
+        if self._cache.load():
+            resources = self._cache.get(key)
+            if resources is not None:
+                self.log.debug("Using cached %s: %d" % (
+                    "%s.%s" % (self.__class__.__module__,
+                               self.__class__.__name__),
+                    len(resources)))
+
+        if resources is None:
+            resources = self._fetch_resources(q)
+            self._cache.save(key, resources)
 
         resource_count = len(resources)
         resources = self.filter_resources(resources)
@@ -187,6 +200,10 @@ class QueryResourceManager(ResourceManager):
 
 class ChildResourceManager(QueryResourceManager):
 
+    # children of separate parents are enumerated concurrently, each
+    # worker thread reuses its own session and authorized http object.
+    max_workers = 4
+
     def get_resource(self, resource_info):
         child_instance = super(ChildResourceManager, self).get_resource(resource_info)
 
@@ -204,25 +221,36 @@ class ChildResourceManager(QueryResourceManager):
         if not query:
             query = {}
 
-        resources = []
-        annotation_key = self.resource_type.get_parent_annotation_key()
         parent_query = self.get_parent_resource_query()
         parent_resource_manager = self.get_resource_manager(
             resource_type=self.resource_type.parent_spec['resource'],
             data=({'query': parent_query} if parent_query else {})
         )
+        parents = parent_resource_manager.resources()
+        fetch = partial(self._fetch_children, query)
 
-        for parent_instance in parent_resource_manager.resources():
-            query.update(self._get_child_enum_args(parent_instance))
-            children = super(ChildResourceManager, self)._fetch_resources(query)
-
-            for child_instance in children:
-                child_instance[annotation_key] = parent_instance
+        if len(parents) < 2:
+            results = map(fetch, parents)
+        else:
+            with self.executor_factory(
+                    max_workers=min(self.max_workers, len(parents))) as w:
+                results = list(w.map(fetch, parents))
 
+        resources = []
+        for children in results:
             resources.extend(children)
-
         return resources
 
+    def _fetch_children(self, query, parent_instance):
+        child_query = dict(query)
+        child_query.update(self._get_child_enum_args(parent_instance))
+        children = super(ChildResourceManager, self)._fetch_resources(child_query)
+
+        annotation_key = self.resource_type.get_parent_annotation_key()
+        for child_instance in children:
+            child_instance[annotation_key] = parent_instance
+        return children
+
     def _get_parent_resource_info(self, child_instance):
         mappings = self.resource_type.parent_spec['parent_get_params']
         return self._extract_fields(child_instance, mappings)
@@ -13,6 +13,8 @@
 # limitations under the License.
 import jmespath
 
+from googleapiclient.errors import HttpError
+
 from c7n_gcp.query import QueryResourceManager, TypeInfo, ChildTypeInfo, ChildResourceManager
 from c7n_gcp.provider import resources
 
@@ -47,12 +49,11 @@ class DataSet(QueryResourceManager):
 
     def augment(self, resources):
         client = self.get_client()
-        results = []
-        for r in resources:
-            ref = r['datasetReference']
-            results.append(
-                client.execute_query(
-                    'get', verb_arguments=ref))
+        results = client.execute_batch(
+            [('get', r['datasetReference']) for r in resources])
+        for r in results:
+            if isinstance(r, HttpError):
+                raise r
         return results
 
 
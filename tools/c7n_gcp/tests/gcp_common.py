@@ -42,7 +42,7 @@ class FlightRecorderTest(TestUtils):
         LOCAL_THREAD.http = None
         return super(FlightRecorderTest, self).cleanUp()
 
-    def record_flight_data(self, test_case, project_id=None):
+    def record_flight_data(self, test_case, project_id=None, use_batch=False):
         test_dir = os.path.join(DATA_DIR, test_case)
         discovery_dir = os.path.join(DATA_DIR, "discovery")
         self.recording = True
@@ -52,12 +52,13 @@ class FlightRecorderTest(TestUtils):
         os.makedirs(test_dir)
 
         self.addCleanup(self.cleanUp)
-        bound = {'http': HttpRecorder(test_dir, discovery_dir)}
+        # batch requests go out individually unless a test exercises batching
+        bound = {'http': HttpRecorder(test_dir, discovery_dir), 'use_batch': use_batch}
         if project_id:
             bound['project_id'] = project_id
         return functools.partial(Session, **bound)
 
-    def replay_flight_data(self, test_case, project_id=None):
+    def replay_flight_data(self, test_case, project_id=None, use_batch=False):
         test_dir = os.path.join(DATA_DIR, test_case)
         discovery_dir = os.path.join(DATA_DIR, "discovery")
         self.recording = False
@@ -66,7 +67,7 @@ class FlightRecorderTest(TestUtils):
             raise RuntimeError("Invalid Test Dir for flight data %s" % test_dir)
 
         self.addCleanup(self.cleanUp)
-        bound = {'http': HttpReplay(test_dir, discovery_dir)}
+        bound = {'http': HttpReplay(test_dir, discovery_dir), 'use_batch': use_batch}
         if project_id:
             bound['project_id'] = project_id
         return functools.partial(Session, **bound)
@@ -22,6 +22,10 @@ from httplib2 import Http, Response
 from six.moves.urllib.parse import urlparse
 
 
+def is_multipart(response):
+    return response.get('content-type', '').startswith('multipart/')
+
+
 class FlightRecorder(Http):
 
     def __init__(self, data_path=None, discovery_path=None):
@@ -89,7 +93,11 @@ class HttpRecorder(FlightRecorder):
             recorded['headers'] = dict(response)
             if not content:
                 content = '{}'
-            recorded['body'] = json.loads(content)
+            if is_multipart(response):
+                # batch responses are recorded verbatim
+                recorded['body'] = content.decode('utf8')
+            else:
+                recorded['body'] = json.loads(content)
             fh.write(json.dumps(recorded, indent=2).encode('utf8'))
 
         return response, content
@@ -125,7 +133,10 @@ class HttpReplay(FlightRecorder):
         with fopen(fpath, 'rb') as fh:
             data = json.load(fh)
             response = Response(data['headers'])
-            serialized = json.dumps(data['body']).encode('utf8')
+            if is_multipart(response):
+                serialized = data['body'].encode('utf8')
+            else:
+                serialized = json.dumps(data['body']).encode('utf8')
             if fpath.endswith('bz2'):
                 self._cache[fpath] = response, serialized
             return response, serialized
@@ -0,0 +1,160 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import socket
+import unittest
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+from mock import MagicMock, patch
+
+from c7n_gcp.actions import MethodAction
+from c7n_gcp.client import ServiceClient, is_retryable_batch_error
+from c7n_gcp.query import extract_error
+
+
+def http_error(status, reason):
+    return HttpError(
+        Response({'status': status}),
+        json.dumps({'error': {'errors': [{'reason': reason}]}}).encode('utf8'))
+
+
+class FakeRequest(dict):
+    http = None
+
+
+class FakeBatch(object):
+
+    def __init__(self, responder, batches, callback=None):
+        self.responder = responder
+        self.callback = callback
+        self.requests = []
+        batches.append(self.requests)
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        for request_id, request in self.requests:
+            result = self.responder(request)
+            if isinstance(result, HttpError):
+                self.callback(request_id, None, result)
+            else:
+                self.callback(request_id, result, None)
+
+
+class BatchTest(unittest.TestCase):
+
+    def get_client(self, responder, use_batch=True):
+        batches = []
+        service = MagicMock()
+        service.new_batch_http_request.side_effect = (
+            lambda callback: FakeBatch(responder, batches, callback))
+        component = MagicMock()
+        component.get.side_effect = lambda **kw: FakeRequest(kw)
+        service.instances.return_value = component
+        client = ServiceClient(
+            service, MagicMock(), component='instances',
+            use_cached_http=False, use_batch=use_batch, http=MagicMock())
+        return client, batches
+
+    def test_batch_chunks_in_order(self):
+        client, batches = self.get_client(
+            lambda r: http_error(404, 'notFound') if r['name'] == 7 else r)
+        results = client.execute_batch([('get', {'name': i}) for i in range(250)])
+
+        self.assertEqual([len(b) for b in batches], [100, 100, 50])
+        self.assertEqual(extract_error(results[7]), 'notFound')
+        self.assertEqual(
+            [r['name'] for r in results if not isinstance(r, HttpError)],
+            [i for i in range(250) if i != 7])
+
+    @patch('c7n_gcp.client.time.sleep')
+    def test_batch_retry(self, sleep):
+        attempts = {}
+
+        def responder(request):
+            count = attempts[request['name']] = attempts.get(request['name'], 0) + 1
+            if request['name'] == 'a' and count < 3:
+                return http_error(403, 'rateLimitExceeded')
+            if request['name'] == 'b':
+                return http_error(503, 'backendError')
+            return request
+
+        client, batches = self.get_client(responder)
+        client._num_retries = 3
+        results = client.execute_batch([('get', {'name': n}) for n in 'abc'])
+
+        self.assertEqual(results[0], {'name': 'a'})
+        self.assertEqual(results[1].resp.status, 503)
+        self.assertEqual(results[2], {'name': 'c'})
+        self.assertEqual(attempts, {'a': 3, 'b': 4, 'c': 1})
+        self.assertEqual(sleep.call_count, 3)
+
+    @patch('retrying.time.sleep')
+    def test_batch_transport_retry(self, sleep):
+        failures = []
+
+        def responder(request):
+            if request['name'] == 'b' and not failures:
+                failures.append(request)
+                raise socket.timeout()
+            return request
+
+        client, batches = self.get_client(responder)
+        results = client.execute_batch([('get', {'name': n}) for n in 'abc'])
+
+        self.assertEqual(results, [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+        # the retry only resends requests without a response
+        self.assertEqual([[r['name'] for _, r in b] for b in batches],
+                         [['a', 'b', 'c'], ['b', 'c']])
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_batch_disabled(self):
+        client, batches = self.get_client(None, use_batch=False)
+        error = http_error(404, 'notFound')
+        with patch.object(client, '_execute', side_effect=[{'name': 'a'}, error]):
+            results = client.execute_batch([('get', {'name': 'a'}), ('get', {'name': 'b'})])
+        self.assertEqual(results, [{'name': 'a'}, error])
+        self.assertEqual(batches, [])
+
+    def test_batch_rate_limit(self):
+        client, batches = self.get_client(lambda r: r)
+        client._rate_limiter = MagicMock()
+        client.execute_batch([('get', {'name': i}) for i in range(150)])
+        self.assertEqual([len(b) for b in batches], [100, 50])
+        self.assertEqual(client._rate_limiter.__enter__.call_count, 150)
+
+    def test_retryable_batch_error(self):
+        self.assertTrue(is_retryable_batch_error(http_error(429, 'rateLimitExceeded')))
+        self.assertTrue(is_retryable_batch_error(http_error(403, 'userRateLimitExceeded')))
+        self.assertFalse(is_retryable_batch_error(http_error(403, 'forbidden')))
+        self.assertFalse(is_retryable_batch_error({'name': 'a'}))
+
+
+class MethodActionBatchTest(unittest.TestCase):
+
+    def test_invoke_batch_api_errors(self):
+        action = MethodAction()
+        action.ignore_error_codes = (404,)
+        client = MagicMock()
+
+        client.execute_batch.return_value = [{}, http_error(404, 'notFound')]
+        self.assertEqual(
+            len(action.invoke_batch_api(client, [('stop', {}), ('stop', {})])), 2)
+
+        client.execute_batch.return_value = [{}, http_error(400, 'invalid')]
+        self.assertRaises(
+            HttpError, action.invoke_batch_api, client, [('stop', {}), ('stop', {})])
@@ -62,6 +62,26 @@ class InstanceTest(BaseTest):
                      'zone': resources[0]['zone'].rsplit('/', 1)[-1]})
         self.assertEqual(result['items'][0]['status'], 'STOPPING')
 
+    def test_stop_instance_batch(self):
+        project_id = 'cloud-custodian'
+        factory = self.replay_flight_data(
+            'instance-stop-batch', project_id=project_id, use_batch=True)
+        p = self.load_policy(
+            {'name': 'istop',
+             'resource': 'gcp.instance',
+             'filters': [{'name': 'instance-1'}, {'status': 'RUNNING'}],
+             'actions': ['stop']},
+            session_factory=factory)
+        resources = p.run()
+        self.assertEqual(len(resources), 1)
+
+        client = p.resource_manager.get_client()
+        result = client.execute_query(
+            'list', {'project': project_id,
+                     'filter': 'name = instance-1',
+                     'zone': resources[0]['zone'].rsplit('/', 1)[-1]})
+        self.assertEqual(result['items'][0]['status'], 'STOPPING')
+
     def test_start_instance(self):
         project_id = 'cloud-custodian'
         factory = self.replay_flight_data('instance-start', project_id=project_id)
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from c7n_gcp.query import GcpLocation
+import threading
+
+from mock import MagicMock, patch
+
+from c7n_gcp.query import GcpLocation, QueryResourceManager
 from gcp_common import BaseTest
 
 
@@ -86,3 +90,63 @@ class GcpLocationTest(BaseTest):
         actual_locations_set = set(GcpLocation.get_service_locations(service_name))
         self.assertTrue(locations_set.issubset(actual_locations_set))
         self.assertTrue(actual_locations_set.issubset(locations_set))
+
+
+class QueryResourceManagerTest(BaseTest):
+
+    def test_resources_from_cache(self):
+        p = self.load_policy({'name': 'sql', 'resource': 'gcp.sql-instance'})
+        manager = p.resource_manager
+        manager._cache = MagicMock()
+        manager._cache.load.return_value = True
+        manager._cache.get.return_value = [{'name': 'db'}]
+
+        with patch.object(manager, '_fetch_resources') as fetch:
+            resources = manager.resources()
+        self.assertFalse(fetch.called)
+        self.assertFalse(manager._cache.save.called)
+        self.assertEqual(resources, [{'name': 'db'}])
+
+    def test_resources_cache_miss(self):
+        p = self.load_policy({'name': 'sql', 'resource': 'gcp.sql-instance'})
+        manager = p.resource_manager
+        manager._cache = MagicMock()
+        manager._cache.load.return_value = False
+
+        with patch.object(manager, '_fetch_resources', return_value=[{'name': 'db'}]):
+            resources = manager.resources()
+        self.assertEqual(resources, [{'name': 'db'}])
+        manager._cache.save.assert_called_once_with(
+            manager.get_cache_key(None), [{'name': 'db'}])
+
+    def test_child_enum_concurrent(self):
+        p = self.load_policy({'name': 'sql-users', 'resource': 'gcp.sql-user'})
+        manager = p.resource_manager
+        parents = [{'name': 'db%d' % i} for i in range(6)]
+        parent_manager = MagicMock()
+        parent_manager.resources.return_value = parents
+
+        queries = []
+        threads = set()
+
+        def fetch(self, query):
+            queries.append(dict(query))
+            threads.add(threading.current_thread().ident)
+            return [{'name': 'user-%s' % query['instance']}]
+
+        with patch.object(manager, 'get_resource_manager', return_value=parent_manager):
+            with patch.object(QueryResourceManager, '_fetch_resources', fetch):
+                resources = manager._fetch_resources({'filter': 'x'})
+
+        self.assertEqual(
+            [r['name'] for r in resources],
+            ['user-db%d' % i for i in range(6)])
+        self.assertEqual(
+            [r['c7n:sql-instance']['name'] for r in resources],
+            [p['name'] for p in parents])
+        self.assertEqual(
+            sorted(q['instance'] for q in queries),
+            [p['name'] for p in parents])
+        self.assertTrue(all(q['filter'] == 'x' for q in queries))
+        self.assertTrue(len(threads) <= manager.max_workers)
+        self.assertNotIn(threading.current_thread().ident, threads)
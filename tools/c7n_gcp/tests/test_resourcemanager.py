@@ -170,3 +170,35 @@ class ProjectTest(BaseTest):
         actual_bindings = client.execute_query('getIamPolicy', get_iam_policy_params)
         expected_bindings[0]['members'].append('user:mediapills@gmail.com')
         self.assertEqual(actual_bindings['bindings'], expected_bindings)
+
+    def test_project_set_iam_policy_batch(self):
+        resource_full_name = 'cloud-custodian'
+        get_iam_policy_params = {'resource': resource_full_name, 'body': {}}
+        session_factory = self.replay_flight_data(
+            'project-set-iam-policy-batch', use_batch=True)
+
+        policy = self.load_policy(
+            {'name': 'gcp-project-set-iam-policy',
+             'resource': 'gcp.project',
+             'filters': [{'type': 'value',
+                          'key': 'name',
+                          'value': resource_full_name}],
+             'actions': [{'type': 'set-iam-policy',
+                          'add-bindings':
+                              [{'members': ['user:mediapills@gmail.com'],
+                                'role': 'roles/automl.admin'}]}]},
+            session_factory=session_factory)
+
+        resources = policy.run()
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(resources[0]['name'], resource_full_name)
+
+        if self.recording:
+            time.sleep(1)
+
+        client = policy.resource_manager.get_client()
+        actual_bindings = client.execute_query('getIamPolicy', get_iam_policy_params)
+        self.assertEqual(
+            actual_bindings['bindings'][0],
+            {'members': ['user:alex.karpitski@gmail.com', 'user:mediapills@gmail.com'],
+             'role': 'roles/automl.admin'})
@@ -40,7 +40,7 @@ from c7n.config import Config
 from c7n.policy import PolicyCollection
 from c7n.provider import get_resource_class
 from c7n.reports.csvout import Formatter, fs_record_set
-from c7n.resources import load_available
+from c7n.resources import load_policy_resources
 from c7n.utils import CONN_CACHE, dumps
 
 from c7n_org.utils import environ, account_tags
@@ -194,7 +194,7 @@ def init(config, use, debug, verbose, accounts, tags, policies, resource=None, p
     filter_policies(custodian_config, policy_tags, policies, resource)
     filter_accounts(accounts_config, tags, accounts)
 
-    load_available()
+    load_policy_resources(custodian_config)
     MainThreadExecutor.c7n_async = False
     executor = debug and MainThreadExecutor or ProcessPoolExecutor
     return accounts_config, custodian_config, executor
@@ -277,7 +277,7 @@ def report_account(account, region, policies_config, output_path, cache_path, de
     output_path = os.path.join(output_path, account['name'], region)
     cache_path = os.path.join(cache_path, "%s-%s.cache" % (account['name'], region))
 
-    load_available()
+    load_policy_resources(policies_config)
     config = Config.empty(
         region=region,
         output_dir=output_path,
@@ -298,8 +298,7 @@ def report_account(account, region, policies_config, output_path, cache_path, de
         log.debug(
             "Report policy:%s account:%s region:%s path:%s",
             p.name, account['name'], region, output_path)
-        policy_records = fs_record_set(p.ctx.log_dir, p.name)
-        for r in policy_records:
+        for r in fs_record_set(p.ctx.log_dir, p.name):
             r['policy'] = p.name
             r['region'] = p.options.region
             r['account'] = account['name']
@@ -307,7 +306,7 @@ def report_account(account, region, policies_config, output_path, cache_path, de
                 if ':' in t:
                     k, v = t.split(':', 1)
                     r[k] = v
-        records.extend(policy_records)
+            records.append(r)
     return records
 
 
@@ -515,7 +514,7 @@ def run_account(account, region, policies_config, output_path,
     logging.getLogger('custodian.output').setLevel(logging.ERROR + 1)
     CONN_CACHE.session = None
     CONN_CACHE.time = None
-    load_available()
+    load_policy_resources(policies_config)
 
     # allow users to specify interpolated output paths
     if '{' not in output_path:
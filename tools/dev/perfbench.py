@@ -0,0 +1,433 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Synthetic large scale policy execution benchmarks.
+
+Generates placebo style recorded responses for large numbers of
+resources, then runs representative policies fully offline against
+them, reporting wall time per phase, api call counts and peak rss.
+
+Scenarios cover ec2 instances, s3 buckets, iam users and security
+groups, ie::
+
+  # run the ec2 and s3 scenarios at 10k and 100k resources
+  python tools/dev/perfbench.py run -s ec2 -s s3 -n 10000 -n 100000
+
+  # record a baseline, and later compare against it
+  python tools/dev/perfbench.py run -n 50000 --save baseline.json
+  python tools/dev/perfbench.py run -n 50000 --baseline baseline.json
+
+Generated data is kept (by default in ./perfbench-data) and reused
+across runs. Each scenario executes in its own interpreter so peak rss
+reflects only that scenario.
+"""
+from __future__ import print_function
+
+from collections import Counter
+import datetime
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import boto3
+import click
+from dateutil.tz import tzutc
+from placebo.serializer import deserialize, serialize
+
+from c7n.cache import ResourceSnapshot
+from c7n.config import Config
+from c7n.loader import PolicyLoader
+from c7n.reports.csvout import Formatter, fs_record_set
+
+PAGE_SIZE = 1000
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+EPOCH = datetime.datetime(2019, 1, 1, tzinfo=tzutc())
+
+
+class FakeHttpResponse(object):
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b''
+        self.raw = None
+
+
+class SyntheticPill(object):
+    """Serve placebo format responses from memory.
+
+    Responses for an operation are served in file index order and wrap
+    around once exhausted, as with placebo playback, but are read from
+    disk once and deserialized per call, so callers are free to mutate
+    them as they would a live response.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.responses = {}
+        self.index = Counter()
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kw):
+        session = boto3.Session(
+            region_name=REGION,
+            aws_access_key_id='AKIDBENCH', aws_secret_access_key='bench')
+        session.events.register(
+            'before-call.*.*', self.playback, unique_id='c7n-perfbench')
+        return session
+
+    def playback(self, model, **kwargs):
+        op = "%s.%s" % (model.service_model.endpoint_prefix, model.name)
+        with self.lock:
+            responses = self.get_responses(op)
+            response = responses[self.index[op] % len(responses)]
+            self.index[op] += 1
+            self.calls[op] += 1
+        response = json.loads(response, object_hook=deserialize)
+        return FakeHttpResponse(response['status_code']), response['data']
+
+    def get_responses(self, op):
+        responses = self.responses.get(op)
+        if responses is not None:
+            return responses
+        responses = []
+        while True:
+            path = os.path.join(
+                self.data_dir, "%s_%d.json" % (op, len(responses) + 1))
+            if not os.path.exists(path):
+                break
+            with open(path) as fh:
+                responses.append(fh.read())
+        if not responses:
+            raise RuntimeError("no synthetic responses for %s" % op)
+        self.responses[op] = responses
+        return responses
+
+
+def write_response(data_dir, op, index, data, status_code=200):
+    data.setdefault('ResponseMetadata', {'HTTPStatusCode': status_code})
+    with open(os.path.join(data_dir, '%s_%d.json' % (op, index)), 'w') as fh:
+        json.dump({'status_code': status_code, 'data': data}, fh, default=serialize)
+
+
+def write_pages(data_dir, op, key, items, token='NextToken', more=None):
+    pages = [items[i:i + PAGE_SIZE] for i in range(0, len(items), PAGE_SIZE)] or [[]]
+    for idx, page in enumerate(pages, 1):
+        data = {key: page}
+        if idx < len(pages):
+            data[token] = 'page-%d' % idx
+            if more:
+                data[more] = True
+        write_response(data_dir, op, idx, data)
+
+
+def make_tags(rng, idx):
+    tags = [{'Key': 'Name', 'Value': 'resource-%d' % idx}]
+    if rng.random() < 0.7:
+        tags.append({'Key': 'Owner', 'Value': rng.choice(['alice', 'bob', 'carol'])})
+    if rng.random() < 0.5:
+        tags.append({'Key': 'Team', 'Value': rng.choice(['web', 'data', 'ops'])})
+    return tags
+
+
+def make_security_group(rng, idx):
+    ports = rng.choice([22, 80, 443, 3389, 5432])
+    return {
+        'GroupId': 'sg-%017x' % idx,
+        'GroupName': idx == 0 and 'default' or 'group-%d' % idx,
+        'Description': 'synthetic group %d' % idx,
+        'OwnerId': ACCOUNT_ID,
+        'VpcId': 'vpc-%08x' % (idx % 20),
+        'IpPermissions': [{
+            'IpProtocol': 'tcp', 'FromPort': ports, 'ToPort': ports,
+            'IpRanges': [{'CidrIp': rng.choice(['0.0.0.0/0', '10.0.0.0/8'])}],
+            'Ipv6Ranges': [], 'PrefixListIds': [], 'UserIdGroupPairs': []}],
+        'IpPermissionsEgress': [{
+            'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}],
+            'Ipv6Ranges': [], 'PrefixListIds': [], 'UserIdGroupPairs': []}],
+        'Tags': make_tags(rng, idx)}
+
+
+def generate_ec2(data_dir, count, rng):
+    groups = [make_security_group(rng, i) for i in range(50)]
+    reservations = []
+    for idx in range(count):
+        group = rng.choice(groups)
+        launched = EPOCH - datetime.timedelta(minutes=rng.randint(0, 525600))
+        reservations.append({
+            'ReservationId': 'r-%017x' % idx,
+            'OwnerId': ACCOUNT_ID,
+            'Instances': [{
+                'InstanceId': 'i-%017x' % idx,
+                'ImageId': 'ami-%08x' % (idx % 100),
+                'InstanceType': rng.choice(['t3.micro', 'm5.large', 'c5.xlarge']),
+                'LaunchTime': launched,
+                'State': rng.choice([
+                    {'Code': 16, 'Name': 'running'}, {'Code': 80, 'Name': 'stopped'}]),
+                'Placement': {'AvailabilityZone': REGION + rng.choice('abc')},
+                'PrivateIpAddress': '10.%d.%d.%d' % (
+                    idx >> 16 & 255, idx >> 8 & 255, idx & 255),
+                'SubnetId': 'subnet-%08x' % (idx % 60),
+                'VpcId': group['VpcId'],
+                'Monitoring': {'State': 'disabled'},
+                'SecurityGroups': [
+                    {'GroupId': group['GroupId'], 'GroupName': group['GroupName']}],
+                'BlockDeviceMappings': [{
+                    'DeviceName': '/dev/xvda',
+                    'Ebs': {'VolumeId': 'vol-%017x' % idx, 'Status': 'attached',
+                            'AttachTime': launched, 'DeleteOnTermination': True}}],
+                'Tags': make_tags(rng, idx)}]})
+    write_pages(data_dir, 'ec2.DescribeInstances', 'Reservations', reservations)
+    write_response(data_dir, 'ec2.DescribeSecurityGroups', 1, {'SecurityGroups': groups})
+
+
+def generate_security_group(data_dir, count, rng):
+    write_pages(
+        data_dir, 'ec2.DescribeSecurityGroups', 'SecurityGroups',
+        [make_security_group(rng, i) for i in range(count)])
+
+
+def generate_iam_user(data_dir, count, rng):
+    users = [{
+        'UserName': 'user-%d' % idx,
+        'UserId': 'AIDA%016X' % idx,
+        'Arn': 'arn:aws:iam::%s:user/user-%d' % (ACCOUNT_ID, idx),
+        'Path': '/',
+        'CreateDate': EPOCH - datetime.timedelta(days=rng.randint(0, 1000))}
+        for idx in range(count)]
+    write_pages(
+        data_dir, 'iam.ListUsers', 'Users', users, token='Marker', more='IsTruncated')
+    # detail responses are shared by all users, so exclude identifying keys.
+    write_response(data_dir, 'iam.GetUser', 1, {'User': {
+        'PasswordLastUsed': EPOCH, 'Tags': make_tags(rng, 0)}})
+
+
+def generate_s3(data_dir, count, rng):
+    write_response(data_dir, 's3.ListBuckets', 1, {
+        'Owner': {'DisplayName': 'bench', 'ID': 'a' * 64},
+        'Buckets': [{
+            'Name': 'bucket-%d' % idx,
+            'CreationDate': EPOCH - datetime.timedelta(days=rng.randint(0, 1000))}
+            for idx in range(count)]})
+    owner = {'DisplayName': 'bench', 'ID': 'a' * 64}
+    for op, data in (
+            ('GetBucketLocation', {'LocationConstraint': None}),
+            ('GetBucketTagging', {'TagSet': make_tags(rng, 0)}),
+            ('GetBucketPolicy', {'Policy': json.dumps(
+                {'Version': '2012-10-17', 'Statement': []})}),
+            ('GetBucketAcl', {'Owner': owner, 'Grants': [{
+                'Grantee': {'Type': 'CanonicalUser', 'ID': owner['ID']},
+                'Permission': 'FULL_CONTROL'}]}),
+            ('GetBucketReplication', {'ReplicationConfiguration': {'Rules': []}}),
+            ('GetBucketVersioning', {'Status': 'Enabled'}),
+            ('GetBucketWebsite', {}),
+            ('GetBucketLogging', {}),
+            ('GetBucketNotificationConfiguration', {}),
+            ('GetBucketLifecycleConfiguration', {'Rules': []})):
+        write_response(data_dir, 's3.%s' % op, 1, data)
+
+
+SCENARIOS = {
+    'ec2': (generate_ec2, [
+        {'name': 'ec2-untagged-running',
+         'resource': 'ec2',
+         'filters': [{'tag:Owner': 'absent'}, {'State.Name': 'running'}]},
+        {'name': 'ec2-old-or-large',
+         'resource': 'ec2',
+         'filters': [{'or': [
+             {'type': 'value', 'key': 'InstanceType', 'op': 'in',
+              'value': ['m5.large', 'c5.xlarge']},
+             {'type': 'instance-age', 'days': 180}]}]},
+        {'name': 'ec2-default-sg',
+         'resource': 'ec2',
+         'filters': [{'type': 'security-group', 'key': 'GroupName',
+                      'value': 'default'}]}]),
+    's3': (generate_s3, [
+        {'name': 's3-unversioned',
+         'resource': 's3',
+         'filters': [{'type': 'value', 'key': 'Versioning.Status',
+                      'value': 'Enabled', 'op': 'ne'}]},
+        {'name': 's3-global-grants',
+         'resource': 's3',
+         'filters': [{'type': 'global-grants'}]}]),
+    'iam-user': (generate_iam_user, [
+        {'name': 'iam-user-old-untagged',
+         'resource': 'iam-user',
+         'filters': [{'tag:Team': 'absent'},
+                     {'type': 'value', 'key': 'CreateDate', 'value_type': 'age',
+                      'op': 'gt', 'value': 90}]}]),
+    'security-group': (generate_security_group, [
+        {'name': 'sg-ssh-open',
+         'resource': 'security-group',
+         'filters': [{'type': 'ingress', 'Ports': [22],
+                      'Cidr': {'value': '0.0.0.0/0'}}]},
+        {'name': 'sg-unowned',
+         'resource': 'security-group',
+         'filters': [{'tag:Owner': 'absent'}]}]),
+}
+
+
+def get_data_dir(data_root, scenario, count):
+    data_dir = os.path.join(data_root, '%s-%d' % (scenario, count))
+    marker = os.path.join(data_dir, '.complete')
+    if not os.path.exists(marker):
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+        os.makedirs(data_dir)
+        generate, _ = SCENARIOS[scenario]
+        generate(data_dir, count, random.Random(count))
+        open(marker, 'w').close()
+    return data_dir
+
+
+def execute_scenario(data_dir, scenario):
+    _, policies = SCENARIOS[scenario]
+    pill = SyntheticPill(data_dir)
+    output_dir = tempfile.mkdtemp(prefix='c7n-perfbench-')
+    config = Config.empty(
+        region=REGION, account_id=ACCOUNT_ID, output_dir=output_dir)
+    timings = Counter()
+    matched = {}
+
+    try:
+        t = time.time()
+        collection = PolicyLoader(config).load_data(
+            {'policies': policies}, 'perfbench://', session_factory=pill)
+        for p in collection:
+            p.validate()
+        timings['load'] = time.time() - t
+
+        with ResourceSnapshot():
+            for p in collection:
+                t = time.time()
+                matched[p.name] = len(p.run() or ())
+                timings['run'] += time.time() - t
+
+        t = time.time()
+        for p in collection:
+            formatter = Formatter(p.resource_manager.resource_type)
+            rows = formatter.to_csv(list(fs_record_set(p.ctx.log_dir, p.name)))
+            out = io.StringIO()
+            for row in rows:
+                out.write(",".join(map(str, row)))
+        timings['report'] = time.time() - t
+    finally:
+        shutil.rmtree(output_dir)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, osx bytes
+    rss_mb = sys.platform == 'darwin' and rss / 1048576.0 or rss / 1024.0
+    return {
+        'wall': sum(timings.values()),
+        'timings': dict(timings),
+        'api_calls': sum(pill.calls.values()),
+        'api_ops': dict(pill.calls),
+        'peak_rss_mb': rss_mb,
+        'matched': matched}
+
+
+def run_isolated(data_dir, scenario):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'execute',
+         '-d', data_dir, '-s', scenario],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = proc.communicate()
+    if proc.returncode != 0:
+        raise click.ClickException(
+            "scenario %s failed\n%s" % (scenario, stderr.decode('utf8')))
+    return json.loads(stdout.decode('utf8'))
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ('wall', 'peak_rss_mb', 'api_calls'):
+            if not base[metric]:
+                continue
+            ratio = result[metric] / float(base[metric])
+            flag = ratio > 1 + threshold and 'REGRESSION' or ''
+            click.echo("  %-24s %-12s %10.2f -> %10.2f (%+.1f%%) %s" % (
+                key, metric, base[metric], result[metric], (ratio - 1) * 100, flag))
+            if flag:
+                regressions.append((key, metric))
+    return regressions
+
+
+@click.group()
+def cli():
+    """Synthetic large scale policy execution benchmarks."""
+
+
+@cli.command()
+@click.option('-d', '--data-dir', default='perfbench-data', help="Generated data directory")
+@click.option('-s', '--scenario', multiple=True, type=click.Choice(sorted(SCENARIOS)))
+@click.option('-n', '--count', multiple=True, type=int, help="Resource counts")
+def generate(data_dir, scenario, count):
+    """Generate synthetic responses."""
+    for name in scenario or sorted(SCENARIOS):
+        for n in count or (10000,):
+            click.echo(get_data_dir(data_dir, name, n))
+
+
+@cli.command()
+@click.option('-d', '--data-dir', default='perfbench-data', help="Generated data directory")
+@click.option('-s', '--scenario', multiple=True, type=click.Choice(sorted(SCENARIOS)))
+@click.option('-n', '--count', multiple=True, type=int, help="Resource counts")
+@click.option('--save', type=click.Path(), help="Save results as a baseline")
+@click.option('--baseline', type=click.Path(exists=True), help="Compare to a baseline")
+@click.option('--threshold', default=0.1, help="Regression threshold ratio")
+def run(data_dir, scenario, count, save, baseline, threshold):
+    """Run benchmark scenarios."""
+    results = {}
+    for name in scenario or sorted(SCENARIOS):
+        for n in count or (10000,):
+            key = '%s-%d' % (name, n)
+            result = results[key] = run_isolated(get_data_dir(data_dir, name, n), name)
+            click.echo("%-24s wall:%8.2fs api:%8d rss:%8.1fmb %s" % (
+                key, result['wall'], result['api_calls'], result['peak_rss_mb'],
+                " ".join("%s:%0.2fs" % i for i in sorted(result['timings'].items()))))
+
+    if save:
+        with open(save, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+    if baseline:
+        with open(baseline) as fh:
+            click.echo("Baseline comparison")
+            if compare(results, json.load(fh), threshold):
+                sys.exit(1)
+
+
+@cli.command(hidden=True)
+@click.option('-d', '--data-dir', required=True)
+@click.option('-s', '--scenario', required=True, type=click.Choice(sorted(SCENARIOS)))
+def execute(data_dir, scenario):
+    """Execute a scenario in process, writing results to stdout."""
+    click.echo(json.dumps(execute_scenario(data_dir, scenario)))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,141 @@
+# Copyright 2019 Capital One Services, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure custodian process startup time.
+
+Each scenario runs in a fresh interpreter with ``-X importtime``, we
+report the median wall time across runs and the slowest imports by
+cumulative time from the last run.
+
+Scenarios
+
+- validate: ``custodian validate`` of the policy file.
+- org-worker: a c7n-org worker's startup, loading the resources
+  the policy file references and initializing its policies, without
+  executing them.
+
+ie::
+
+  python tools/dev/startupbench.py -p tools/dev/startupbench.yml -n 5
+"""
+from __future__ import print_function
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+
+SCENARIOS = {
+    'validate': """
+import sys
+from c7n.cli import main
+sys.argv = ['custodian', 'validate', {policy!r}]
+try:
+    main()
+except SystemExit as e:
+    if e.code:
+        raise
+""",
+    'org-worker': """
+import yaml
+from c7n.config import Config
+from c7n.policy import PolicyCollection
+from c7n_org.cli import load_policy_resources
+
+with open({policy!r}) as fh:
+    data = yaml.safe_load(fh)
+load_policy_resources(data)
+config = Config.empty(region='us-east-1', account_id='123456789012')
+for p in PolicyCollection.from_data(data, config):
+    p.validate()
+""",
+}
+
+IMPORT_LINE = re.compile(
+    r'^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<name>.*)$')
+
+
+def run_scenario(name, policy):
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    started = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c',
+         SCENARIOS[name].format(policy=os.path.abspath(policy))],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    _, stderr = proc.communicate()
+    elapsed = time.time() - started
+    if proc.returncode != 0:
+        raise click.ClickException(
+            "scenario %s failed\n%s" % (name, stderr.decode('utf8')))
+    return elapsed, parse_import_times(stderr.decode('utf8'))
+
+
+def parse_import_times(output):
+    imports = []
+    for line in output.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m:
+            name = m.group('name')
+            imports.append({
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip())) // 2,
+                'self': int(m.group('self')) / 1e6,
+                'cumulative': int(m.group('cumulative')) / 1e6})
+    return imports
+
+
+@click.command()
+@click.option('-p', '--policy', required=True, type=click.Path(exists=True),
+              help="Policy file to benchmark with")
+@click.option('-s', '--scenario', multiple=True, type=click.Choice(sorted(SCENARIOS)),
+              help="Scenarios to run (default all)")
+@click.option('-n', '--runs', default=3, help="Runs per scenario")
+@click.option('-t', '--top', default=15, help="Slowest top level imports to show")
+@click.option('--json', 'as_json', is_flag=True, help="Output results as json")
+def main(policy, scenario, runs, top, as_json):
+    """Benchmark custodian startup for a policy file."""
+    results = {}
+    for name in scenario or sorted(SCENARIOS):
+        times = []
+        for _ in range(runs):
+            elapsed, imports = run_scenario(name, policy)
+            times.append(elapsed)
+        results[name] = {
+            'runs': times,
+            'median': statistics.median(times),
+            'import_time': sum(i['cumulative'] for i in imports if i['depth'] == 0),
+            'imports': sorted(
+                [i for i in imports if i['depth'] <= 1],
+                key=lambda i: i['cumulative'], reverse=True)[:top]}
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+        return
+
+    for name, r in results.items():
+        click.echo("%s: median %0.3fs over %d runs, imports %0.3fs" % (
+            name, r['median'], len(r['runs']), r['import_time']))
+        for i in r['imports']:
+            click.echo("  %8.3fs %s%s" % (
+                i['cumulative'], '  ' * i['depth'], i['module']))
+
+
+if __name__ == '__main__':
+    main()